@@ -151,8 +151,11 @@ def update_dashboard(year, trimestre, ramo, companies, top_n, view_mode):
     if companies:
         params["companies"] = ",".join(companies) if isinstance(companies, list) else companies
 
-    # --- Fetch KPIs from API ---
-    kpis_response = api_get("/api/data/kpis", params)
+    # --- Fetch all widgets from API in one request ---
+    dashboard_response = api_get("/api/data/dashboard", {**params, "top_n": top_n}) or {}
+
+    # --- KPIs ---
+    kpis_response = dashboard_response.get("kpis")
     if kpis_response:
         # Map API response keys to keys expected by create_kpi_row()
         totals = {
@@ -173,9 +176,8 @@ def update_dashboard(year, trimestre, ramo, companies, top_n, view_mode):
     # Determine if we're viewing by ramo or subramo
     ramo_selected = ramo is not None and ramo != ""
 
-    # --- Fetch Company Ranking from API ---
-    ranking_params = {**params, "top_n": top_n}
-    ranking_response = api_get("/api/data/companies/ranking", ranking_params)
+    # --- Company Ranking ---
+    ranking_response = dashboard_response.get("ranking")
 
     if ranking_response and ranking_response.get("companies"):
         # Convert API response to DataFrame for chart
@@ -212,14 +214,13 @@ def update_dashboard(year, trimestre, ramo, companies, top_n, view_mode):
             color_palette="ramos",
         )
 
-    # --- Fetch Distribution from API ---
+    # --- Distribution (subramos when a ramo is selected) ---
+    dist_response = dashboard_response.get("distribution")
     if ramo_selected:
-        dist_response = api_get("/api/data/distribution/subramos", params)
         name_column = "subramo_nombre_corto"
         donut_palette = "subramos"
         donut_header = html.H5("SUBRAMOS", className="mb-0")
     else:
-        dist_response = api_get("/api/data/distribution/ramos", params)
         name_column = "ramo_nombre_corto"
         donut_palette = "ramos"
         donut_header = html.H5("RAMOS", className="mb-0")
@@ -1,11 +1,36 @@
-from typing import Optional
-from fastapi import Query
-from app.core.loader import get_data_loader
+import asyncio
+from typing import Optional, Union
+from fastapi import Depends, Query
+from app.core.dataset import DatasetSnapshot
+from app.core.duckdb_backend import DuckDBSubramos
+from app.core.loader import DataLoader, get_data_loader
+from app.logic.cube import RollupCube
 
+# Answers aggregate()/totals()/top_companies() for the data endpoints
+QueryEngine = Union[RollupCube, DuckDBSubramos]
 
-def get_loader():
-    """Dependency to get the data loader instance."""
-    return get_data_loader()
+
+async def get_loader() -> DataLoader:
+    """Dependency to get the data loader instance.
+
+    If the dataset is still loading, the request waits on the in-progress
+    load from a worker thread instead of blocking the event loop.
+    """
+    loader = get_data_loader()
+    if not loader.is_loaded:
+        await asyncio.to_thread(loader.ensure_loaded)
+    return loader
+
+
+# Period bounds: YYYYTT (202001), trimestre as in the data (not fiscal quarters)
+PERIOD_PATTERN = r"^\d{4}0[1-4]$"
+
+
+def parse_period(value: Optional[str]) -> Optional[int]:
+    """Convert a validated period string to its YYYYTT periodo integer."""
+    if not value:
+        return None
+    return int(value)
 
 
 # Common query parameters
@@ -15,9 +40,15 @@ class FilterParams:
     def __init__(
         self,
         year: Optional[str] = Query(None, description="Fiscal year (YYYY)"),
-        quarter: Optional[str] = Query(None, description="Quarter (01, 02, 03, 04)"),
+        quarter: Optional[str] = Query(None, pattern="^0[1-4]$", description="Quarter (01, 02, 03, 04)"),
         ramo: Optional[str] = Query(None, description="Ramo filter"),
         companies: Optional[str] = Query(None, description="Comma-separated company names"),
+        from_period: Optional[str] = Query(
+            None, pattern=PERIOD_PATTERN, description="First period, inclusive (YYYYTT)"
+        ),
+        to_period: Optional[str] = Query(
+            None, pattern=PERIOD_PATTERN, description="Last period, inclusive (YYYYTT)"
+        ),
         view_mode: str = Query("accumulated", description="Data view mode: 'accumulated' or 'current'"),
     ):
         # Convert year to int for filtering (data has int year column)
@@ -25,4 +56,52 @@ class FilterParams:
         self.quarter = quarter
         self.ramo = ramo
         self.companies = companies.split(",") if companies else None
+        self.from_period = parse_period(from_period)
+        self.to_period = parse_period(to_period)
         self.view_mode = view_mode
+
+
+async def get_snapshot(
+    filters: FilterParams = Depends(),
+    loader: DataLoader = Depends(get_loader),
+) -> DatasetSnapshot:
+    """Dependency to get the dataset snapshot covering the requested period.
+
+    The snapshot is fixed for the whole request, so a concurrent hot-swap
+    never changes the data mid-computation.
+    """
+    if loader.partitioned:
+        # Partitions may need to be read; keep that off the event loop
+        return await asyncio.to_thread(
+            loader.get_snapshot_for, filters.year, filters.quarter, filters.from_period, filters.to_period
+        )
+    return loader.get_snapshot()
+
+
+async def get_engine(
+    filters: FilterParams = Depends(),
+    loader: DataLoader = Depends(get_loader),
+) -> QueryEngine:
+    """Dependency to get the query engine for the configured QUERY_BACKEND.
+
+    With DuckDB, queries run as SQL over the source files; otherwise they
+    are answered from the rollup cube of the snapshot covering the period.
+    """
+    if loader.uses_duckdb:
+        return loader.get_duckdb()
+
+    snapshot = await get_snapshot(filters, loader)
+    return snapshot.derived("rollup_cube")
+
+
+async def get_history_engine(loader: DataLoader = Depends(get_loader)) -> QueryEngine:
+    """Dependency to get a query engine over every period, for endpoints spanning the history.
+
+    Year/quarter filters then select periods of the result instead of
+    limiting the data read, so growth rates can reach back past them.
+    """
+    if loader.uses_duckdb:
+        return loader.get_duckdb()
+
+    snapshot = await asyncio.to_thread(loader.get_snapshot)
+    return snapshot.derived("rollup_cube")
@@ -1,93 +1,250 @@
 from typing import Optional
+import numpy as np
+import pandas as pd
 from fastapi import APIRouter, Depends, Query
 
-from app.api.dependencies import get_loader, FilterParams
-from app.core.loader import DataLoader
-from app.logic.aggregations import (
-    filter_data,
-    aggregate_by_company,
-    aggregate_by_company_ramo,
-    aggregate_by_company_subramo,
-    aggregate_by_ramo,
-    aggregate_by_subramo,
-    get_totals,
-)
-from app.logic.rankings import get_top_n
+from app.api.dependencies import get_engine, get_history_engine, FilterParams, QueryEngine
+from app.core import config
+from app.logic.aggregations import get_aggregate_totals
+from app.logic.plan import PlanResult, QueryPlan
+from app.logic.rankings import RankTrajectories, market_concentration, top_positions
+from app.logic.ratios import RATIO_COLUMNS, totals_ratios
+from app.logic.timeseries import TimeSeries
 from app.models.responses import (
     KPIResponse,
     CompanyRankingResponse,
     CompanyRankingItem,
+    ConcentrationItem,
+    ConcentrationResponse,
     DistributionResponse,
     DistributionItem,
+    DashboardResponse,
+    MarketShareItem,
+    RankTrajectoryItem,
+    RankTrajectoryResponse,
+    TimeSeriesItem,
+    TimeSeriesResponse,
 )
 
 router = APIRouter()
 
+# Columns companies can be ranked by
+RANKING_COLUMNS = [*config.METRIC_COLUMNS, *RATIO_COLUMNS]
+
+# Entity column each time series can be split by (None: the market total)
+SERIES_COLUMNS = {
+    "total": None,
+    "ramo": "ramo_nombre_corto",
+    "subramo": "subramo_nombre_corto",
+    "company": "nombre_corto",
+}
 
-@router.get("/kpis", response_model=KPIResponse)
-async def get_kpis(
-    filters: FilterParams = Depends(),
-    loader: DataLoader = Depends(get_loader),
-):
-    """Get KPI totals based on filters."""
-    df = loader.load_subramos()
 
-    # Apply filters
-    filtered_df = filter_data(
-        df,
+def filter_kwargs(filters: FilterParams) -> dict:
+    """Request filters as keyword arguments for the query engine and filter_data."""
+    return dict(
         year=filters.year,
         trimestre=filters.quarter,
         ramo=filters.ramo,
         companies=filters.companies,
+        from_period=filters.from_period,
+        to_period=filters.to_period,
+    )
+
+
+def aggregate(engine: QueryEngine, filters: FilterParams, group_cols: list) -> pd.DataFrame:
+    """Filtered aggregate by group_cols, answered by the query engine."""
+    return engine.aggregate(group_cols, view_mode=filters.view_mode, **filter_kwargs(filters))
+
+
+def ranking_plan(engine: QueryEngine, filters: FilterParams) -> QueryPlan:
+    """Plan for the ranking: company bars plus company totals from one pass.
+
+    Bars are stacked by ramo, or by subramo when a ramo is selected.
+    """
+    return (
+        QueryPlan(engine, view_mode=filters.view_mode, **filter_kwargs(filters))
+        .add("bars", ["cod_cia", "nombre_corto", breakdown_column(filters)])
+        .add("companies", ["cod_cia", "nombre_corto"])
     )
 
-    # Calculate totals
-    totals = get_totals(filtered_df, view_mode=filters.view_mode)
 
+def ranked_companies(engine: QueryEngine, filters: FilterParams, sort_by: str, top_n: int) -> Optional[np.ndarray]:
+    """Top N company rows ranked ahead by the engine for the filters, if it has them."""
+    return engine.top_companies(sort_by, top_n, view_mode=filters.view_mode, **filter_kwargs(filters))
+
+
+def breakdown_column(filters: FilterParams) -> str:
+    """Dimension the charts break down by: subramo when a ramo is selected, else ramo."""
+    ramo_selected = filters.ramo is not None and filters.ramo != ""
+    return "subramo_nombre_corto" if ramo_selected else "ramo_nombre_corto"
+
+
+def history_periods(engine: QueryEngine) -> np.ndarray:
+    """Every periodo in the data, ascending: the time axis of all series."""
+    return engine.cached(
+        "history_periods",
+        lambda: np.unique(engine.aggregate(["periodo"])["periodo"].to_numpy()),
+    )
+
+
+def history_ramos(engine: QueryEngine) -> frozenset:
+    """Every ramo in the data."""
+    return engine.cached(
+        "history_ramos",
+        lambda: frozenset(engine.aggregate(["ramo_nombre_corto"])["ramo_nombre_corto"].tolist()),
+    )
+
+
+def timeseries(engine: QueryEngine, by: str, view_mode: str, ramo: Optional[str] = None) -> TimeSeries:
+    """Every period of every entity of a split, pivoted once per dataset version.
+
+    Only series of a ramo in the data are cached: any other ramo is empty,
+    built per request so arbitrary values cannot grow the cache.
+    """
+    entity_col = SERIES_COLUMNS[by]
+
+    def build() -> TimeSeries:
+        group_cols = ["periodo"] if entity_col is None else ["periodo", entity_col]
+        data = engine.aggregate(group_cols, view_mode=view_mode, ramo=ramo)
+        return TimeSeries.pivot(data, entity_col, history_periods(engine), accumulated=view_mode == "accumulated")
+
+    if ramo and ramo not in history_ramos(engine):
+        return build()
+    return engine.cached(f"timeseries:{by}:{view_mode}:{ramo or ''}", build)
+
+
+def build_timeseries(series: TimeSeries, metric: str, by: str) -> TimeSeriesResponse:
+    """Time series response for one metric."""
+    def by_entity(matrix: np.ndarray) -> list:
+        # One list per entity, NaN (no growth) as None
+        return np.where(np.isnan(matrix), None, matrix).T.tolist()
+
+    rates = series.rates[metric]
+    columns = zip(
+        series.entities,
+        series.values[metric].T.tolist(),
+        by_entity(rates["qoq"]),
+        by_entity(rates["yoy"]),
+    )
+    return TimeSeriesResponse(
+        periods=[str(p) for p in series.periods],
+        metric=metric,
+        by=by,
+        series=[
+            TimeSeriesItem(name=str(name), values=values, qoq=qoq, yoy=yoy)
+            for name, values, qoq, yoy in columns
+        ],
+    )
+
+
+def concentration(engine: QueryEngine, view_mode: str, metric: str):
+    """Shares and concentration of every (periodo, ramo) market, once per dataset version."""
+    def build():
+        data = engine.aggregate(["periodo", "ramo_nombre_corto", "cod_cia", "nombre_corto"], view_mode=view_mode)
+        return market_concentration(data, ["periodo", "ramo_nombre_corto"], metric=metric)
+
+    return engine.cached(f"concentration:{view_mode}:{metric}", build)
+
+
+def build_concentration(
+    markets: pd.DataFrame,
+    companies: pd.DataFrame,
+    metric: str,
+    top_n: int,
+    names: Optional[list] = None,
+) -> ConcentrationResponse:
+    """Concentration response with the top_n shares (of the named companies, if any) per market."""
+    name_col, values, shares = (
+        companies["nombre_corto"].to_numpy(dtype=object),
+        companies[metric].to_numpy(),
+        companies["market_share"].to_numpy(),
+    )
+    listed = np.ones(len(companies), dtype=bool) if names is None else np.isin(name_col, names)
+
+    items = []
+    for market in markets.itertuples(index=False):
+        rows = np.flatnonzero(listed[market.start:market.stop])[:top_n] + market.start
+        items.append(ConcentrationItem(
+            period=str(market.periodo),
+            ramo_nombre_corto=market.ramo_nombre_corto,
+            total=market.total,
+            companies=market.companies,
+            hhi=round(market.hhi, 2),
+            cr4=round(market.cr4, 2),
+            cr10=round(market.cr10, 2),
+            shares=[
+                MarketShareItem(nombre_corto=name_col[i], value=values[i], market_share=shares[i])
+                for i in rows
+            ],
+        ))
+    return ConcentrationResponse(metric=metric, items=items)
+
+
+def rank_trajectories(engine: QueryEngine, view_mode: str, metric: str) -> RankTrajectories:
+    """Company ranks in every period, overall and per ramo, once per dataset version."""
+    def build():
+        total = engine.aggregate(["periodo", "nombre_corto"], view_mode=view_mode)
+        by_ramo = engine.aggregate(["periodo", "ramo_nombre_corto", "nombre_corto"], view_mode=view_mode)
+        return RankTrajectories.build(total, by_ramo, metric, history_periods(engine))
+
+    return engine.cached(f"rank_trajectories:{view_mode}:{metric}", build)
+
+
+def build_rank_trajectory(
+    trajectories: RankTrajectories,
+    metric: str,
+    method: str,
+    ramo: Optional[str] = None,
+) -> RankTrajectoryResponse:
+    """Rank trajectory response for the single market of selected trajectories."""
+    ranks = trajectories.ranks[method][0]
+    return RankTrajectoryResponse(
+        periods=[str(p) for p in trajectories.periods],
+        metric=metric,
+        method=method,
+        ramo_nombre_corto=ramo or None,
+        companies=trajectories.sizes[0].tolist(),
+        series=[
+            RankTrajectoryItem(nombre_corto=str(name), ranks=company_ranks)
+            # Rank 0 (not in the market) as None
+            for name, company_ranks in zip(trajectories.companies, np.where(ranks > 0, ranks, None).tolist())
+        ],
+    )
+
+
+def build_kpis(totals: dict) -> KPIResponse:
+    """KPI response from a totals dict."""
     return KPIResponse(
         primas_emitidas=totals["primas_emitidas"],
         primas_devengadas=totals["primas_devengadas"],
         siniestros_devengados=totals["siniestros_devengados"],
         gastos_devengados=totals["gastos_devengados"],
         entities_count=totals["entities_count"],
+        **totals_ratios(totals),
     )
 
 
-@router.get("/companies/ranking", response_model=CompanyRankingResponse)
-async def get_companies_ranking(
-    filters: FilterParams = Depends(),
-    top_n: int = Query(15, ge=1, le=100, description="Number of top companies to return"),
-    loader: DataLoader = Depends(get_loader),
-):
-    """Get top N companies by primas_emitidas."""
-    df = loader.load_subramos()
-
-    # Apply filters
-    filtered_df = filter_data(
-        df,
-        year=filters.year,
-        trimestre=filters.quarter,
-        ramo=filters.ramo,
-        companies=filters.companies,
-    )
-
-    # Determine if we're viewing by ramo or subramo
-    ramo_selected = filters.ramo is not None and filters.ramo != ""
-
-    if ramo_selected:
-        # When a ramo is selected: group by company and subramo
-        bar_data = aggregate_by_company_subramo(filtered_df, view_mode=filters.view_mode)
-    else:
-        # Default: group by company and ramo
-        bar_data = aggregate_by_company_ramo(filtered_df, view_mode=filters.view_mode)
+def build_ranking(
+    result: PlanResult,
+    top_n: int,
+    sort_by: str = "primas_emitidas",
+    ranked: Optional[np.ndarray] = None,
+) -> CompanyRankingResponse:
+    """Top N ranking response from an executed ranking plan, ranked by sort_by.
 
-    # Get company totals for TOP-N selection
-    company_totals = aggregate_by_company(filtered_df, view_mode=filters.view_mode)
-    top_companies = get_top_n(company_totals, n=top_n)
-    top_company_names = top_companies["nombre_corto"].tolist()
+    ``ranked`` holds the company rows already ranked by the engine, if any;
+    otherwise they are selected from the company totals. Bars come grouped
+    by company in rank order, each with its company's rank and sort_by total.
+    """
+    company_totals = result["companies"]
+    if ranked is None:
+        ranked = top_positions(company_totals[sort_by].to_numpy(), top_n)
 
-    # Filter bar data to only include top N companies
-    bar_data_filtered = bar_data[bar_data["nombre_corto"].isin(top_company_names)]
+    # Keep only the bars of the top N companies, in rank order
+    rows, owners = result.positions_in("companies", ranked)
+    bar_data_filtered = result.finest.take(rows)
+    values = company_totals[sort_by].to_numpy()[ranked]
 
     # Convert to response model
     companies = [
@@ -96,8 +253,13 @@ async def get_companies_ranking(
             ramo_nombre_corto=row.get("ramo_nombre_corto"),
             subramo_nombre_corto=row.get("subramo_nombre_corto"),
             primas_emitidas=row["primas_emitidas"],
+            siniestralidad=row.get("siniestralidad"),
+            ratio_gastos=row.get("ratio_gastos"),
+            combined_ratio=row.get("combined_ratio"),
+            rank=int(owner) + 1,
+            value=values[owner],
         )
-        for _, row in bar_data_filtered.iterrows()
+        for (_, row), owner in zip(bar_data_filtered.iterrows(), owners)
     ]
 
     return CompanyRankingResponse(
@@ -106,69 +268,201 @@ async def get_companies_ranking(
     )
 
 
-@router.get("/distribution/ramos", response_model=DistributionResponse)
-async def get_ramos_distribution(
-    filters: FilterParams = Depends(),
-    loader: DataLoader = Depends(get_loader),
-):
-    """Get distribution by ramos."""
-    df = loader.load_subramos()
-
-    # Apply filters
-    filtered_df = filter_data(
-        df,
-        year=filters.year,
-        trimestre=filters.quarter,
-        ramo=filters.ramo,
-        companies=filters.companies,
-    )
-
-    # Aggregate by ramo
-    ramo_data = aggregate_by_ramo(filtered_df, view_mode=filters.view_mode)
-    total = ramo_data["primas_emitidas"].sum()
+def build_distribution(data: pd.DataFrame, name_col: str) -> DistributionResponse:
+    """Distribution response from metrics aggregated by name_col."""
+    total = data["primas_emitidas"].sum()
 
     # Convert to response model
     items = [
         DistributionItem(
-            name=row["ramo_nombre_corto"],
+            name=row[name_col],
             value=row["primas_emitidas"],
             percentage=(row["primas_emitidas"] / total * 100) if total > 0 else 0,
         )
-        for _, row in ramo_data.iterrows()
+        for _, row in data.iterrows()
     ]
 
     return DistributionResponse(items=items, total=total)
 
 
+@router.get("/kpis", response_model=KPIResponse)
+async def get_kpis(
+    filters: FilterParams = Depends(),
+    engine: QueryEngine = Depends(get_engine),
+):
+    """Get KPI totals based on filters."""
+    totals = engine.totals(view_mode=filters.view_mode, **filter_kwargs(filters))
+
+    return build_kpis(totals)
+
+
+@router.get("/companies/ranking", response_model=CompanyRankingResponse)
+async def get_companies_ranking(
+    filters: FilterParams = Depends(),
+    top_n: int = Query(15, ge=1, le=100, description="Number of top companies to return"),
+    sort_by: str = Query(
+        "primas_emitidas", pattern=f"^({'|'.join(RANKING_COLUMNS)})$", description="Metric or ratio to rank by"
+    ),
+    engine: QueryEngine = Depends(get_engine),
+):
+    """Get top N companies by primas_emitidas, or by any metric or ratio.
+
+    Bars carry the ratios precomputed for their cube cell; company ratios
+    come from the rolled-up metrics of the same plan. A single period (or
+    ramo within it) is ranked ahead by the cube; other selections pick the
+    top N by partial selection.
+    """
+    result = ranking_plan(engine, filters).execute()
+    return build_ranking(result, top_n, sort_by, ranked_companies(engine, filters, sort_by, top_n))
+
+
+@router.get("/distribution/ramos", response_model=DistributionResponse)
+async def get_ramos_distribution(
+    filters: FilterParams = Depends(),
+    engine: QueryEngine = Depends(get_engine),
+):
+    """Get distribution by ramos."""
+    ramo_data = aggregate(engine, filters, ["ramo_nombre_corto"])
+    return build_distribution(ramo_data, "ramo_nombre_corto")
+
+
 @router.get("/distribution/subramos", response_model=DistributionResponse)
 async def get_subramos_distribution(
     filters: FilterParams = Depends(),
-    loader: DataLoader = Depends(get_loader),
+    engine: QueryEngine = Depends(get_engine),
 ):
     """Get distribution by subramos."""
-    df = loader.load_subramos()
+    subramo_data = aggregate(engine, filters, ["subramo_nombre_corto"])
+    return build_distribution(subramo_data, "subramo_nombre_corto")
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    filters: FilterParams = Depends(),
+    top_n: int = Query(15, ge=1, le=100, description="Number of top companies to return"),
+    sort_by: str = Query(
+        "primas_emitidas", pattern=f"^({'|'.join(RANKING_COLUMNS)})$", description="Metric or ratio to rank by"
+    ),
+    engine: QueryEngine = Depends(get_engine),
+):
+    """Get KPIs, the top N ranking and the ramo/subramo distribution in one response.
 
-    # Apply filters
-    filtered_df = filter_data(
-        df,
+    The filters are applied once: every widget is rolled up from the same
+    company x ramo (or subramo) aggregate.
+    """
+    breakdown = breakdown_column(filters)
+    result = ranking_plan(engine, filters).add("distribution", [breakdown]).execute()
+
+    return DashboardResponse(
+        kpis=build_kpis(get_aggregate_totals(result["companies"])),
+        ranking=build_ranking(result, top_n, sort_by, ranked_companies(engine, filters, sort_by, top_n)),
+        distribution=build_distribution(result["distribution"], breakdown),
+        distribution_type="subramos" if breakdown == "subramo_nombre_corto" else "ramos",
+    )
+
+
+@router.get("/timeseries", response_model=TimeSeriesResponse)
+async def get_timeseries(
+    filters: FilterParams = Depends(),
+    by: str = Query("total", pattern="^(total|ramo|subramo|company)$", description="Split series by entity"),
+    metric: str = Query(
+        "primas_emitidas", pattern=f"^({'|'.join(config.METRIC_COLUMNS)})$", description="Metric to chart"
+    ),
+    engine: QueryEngine = Depends(get_history_engine),
+):
+    """Get a metric per period, for the market or split by ramo, subramo or company.
+
+    Each split is pivoted into a (period x entity) matrix with its QoQ and
+    YoY growth once per dataset version; requests slice it. Year, quarter
+    and period filters select periods, so growth still compares against
+    periods outside them. The companies filter selects company series, or
+    sums them for the total; with a ramo/subramo split it is applied to
+    the aggregate, which is not cached.
+    """
+    periods = dict(
         year=filters.year,
         trimestre=filters.quarter,
-        ramo=filters.ramo,
-        companies=filters.companies,
+        from_period=filters.from_period,
+        to_period=filters.to_period,
     )
 
-    # Aggregate by subramo
-    subramo_data = aggregate_by_subramo(filtered_df, view_mode=filters.view_mode)
-    total = subramo_data["primas_emitidas"].sum()
-
-    # Convert to response model
-    items = [
-        DistributionItem(
-            name=row["subramo_nombre_corto"],
-            value=row["primas_emitidas"],
-            percentage=(row["primas_emitidas"] / total * 100) if total > 0 else 0,
+    if filters.companies and by in ("total", "company"):
+        series = timeseries(engine, "company", filters.view_mode, filters.ramo)
+        if by == "total":
+            series = series.total(filters.companies)
+        else:
+            series = series.select(entities=filters.companies)
+    elif filters.companies:
+        data = engine.aggregate(
+            ["periodo", SERIES_COLUMNS[by]],
+            view_mode=filters.view_mode,
+            ramo=filters.ramo,
+            companies=filters.companies,
         )
-        for _, row in subramo_data.iterrows()
-    ]
+        series = TimeSeries.pivot(
+            data, SERIES_COLUMNS[by], history_periods(engine), accumulated=filters.view_mode == "accumulated"
+        )
+    else:
+        series = timeseries(engine, by, filters.view_mode, filters.ramo)
 
-    return DistributionResponse(items=items, total=total)
+    return build_timeseries(series.select(**periods), metric, by)
+
+
+@router.get("/concentration", response_model=ConcentrationResponse)
+async def get_concentration(
+    filters: FilterParams = Depends(),
+    metric: str = Query(
+        "primas_emitidas", pattern=f"^({'|'.join(config.METRIC_COLUMNS)})$", description="Metric shares are computed on"
+    ),
+    top_n: int = Query(10, ge=0, le=100, description="Market shares listed per ramo and period"),
+    engine: QueryEngine = Depends(get_history_engine),
+):
+    """Get HHI, CR4/CR10 and market shares per ramo for every period.
+
+    All (periodo, ramo) markets are computed together in one grouped pass
+    and cached per dataset version; year, quarter, period range and ramo
+    select markets, and companies limits the shares listed.
+    """
+    markets, companies = concentration(engine, filters.view_mode, metric)
+
+    periodo = markets["periodo"].to_numpy()
+    keep = np.ones(len(markets), dtype=bool)
+    if filters.year is not None:
+        keep &= periodo // 100 == filters.year
+    if filters.quarter is not None:
+        keep &= periodo % 100 == int(filters.quarter)
+    if filters.from_period is not None:
+        keep &= periodo >= filters.from_period
+    if filters.to_period is not None:
+        keep &= periodo <= filters.to_period
+    if filters.ramo:
+        keep &= (markets["ramo_nombre_corto"] == filters.ramo).to_numpy()
+
+    return build_concentration(markets[keep], companies, metric, top_n, filters.companies)
+
+
+@router.get("/companies/rank-trajectory", response_model=RankTrajectoryResponse)
+async def get_rank_trajectory(
+    filters: FilterParams = Depends(),
+    metric: str = Query(
+        "primas_emitidas", pattern=f"^({'|'.join(RANKING_COLUMNS)})$", description="Metric or ratio to rank by"
+    ),
+    method: str = Query("min", pattern="^(min|dense)$", description="Tie handling: 'min' or 'dense' ranks"),
+    engine: QueryEngine = Depends(get_history_engine),
+):
+    """Get every company's rank per period, in the whole market or within a ramo.
+
+    Ranks of all companies in every (period, ramo) market, and in every
+    period overall, come from one grouped rank pass each and are cached
+    per dataset version as compact rank arrays; year, quarter and period
+    range select periods, ramo the market and companies the series.
+    """
+    trajectories = rank_trajectories(engine, filters.view_mode, metric).select(
+        ramo=filters.ramo,
+        companies=filters.companies,
+        year=filters.year,
+        trimestre=filters.quarter,
+        from_period=filters.from_period,
+        to_period=filters.to_period,
+    )
+    return build_rank_trajectory(trajectories, metric, method, filters.ramo)
@@ -11,8 +11,8 @@ router = APIRouter()
 @router.get("/years", response_model=List[str])
 async def get_years(loader: DataLoader = Depends(get_loader)):
     """Get available years from the data."""
-    df = loader.load_subramos()
-    years = sorted(df["year"].dropna().unique().astype(str).tolist(), reverse=True)
+    options = loader.get_filter_options()
+    years = [str(year) for year in options["years"]]
     return years
 
 
@@ -25,28 +25,28 @@ async def get_quarters():
 @router.get("/ramos", response_model=List[str])
 async def get_ramos(loader: DataLoader = Depends(get_loader)):
     """Get available ramos from the data."""
-    df = loader.load_subramos()
-    ramos = sorted(df["ramo_nombre_corto"].dropna().unique().tolist())
+    options = loader.get_filter_options()
+    ramos = list(options["ramos"])
     return ramos
 
 
 @router.get("/companies", response_model=List[str])
 async def get_companies(loader: DataLoader = Depends(get_loader)):
     """Get available company names from the data."""
-    df = loader.load_subramos()
-    companies = sorted(df["nombre_corto"].dropna().unique().tolist())
+    options = loader.get_filter_options()
+    companies = list(options["companies"])
     return companies
 
 
 @router.get("", response_model=FiltersResponse)
 async def get_all_filters(loader: DataLoader = Depends(get_loader)):
     """Get all available filter options in a single response."""
-    df = loader.load_subramos()
+    options = loader.get_filter_options()
 
-    years = sorted(df["year"].dropna().unique().astype(str).tolist(), reverse=True)
+    years = [str(year) for year in options["years"]]
     quarters = ["01", "02", "03", "04"]
-    ramos = sorted(df["ramo_nombre_corto"].dropna().unique().tolist())
-    companies = sorted(df["nombre_corto"].dropna().unique().tolist())
+    ramos = list(options["ramos"])
+    companies = list(options["companies"])
 
     return FiltersResponse(
         years=years,
@@ -0,0 +1,104 @@
+import os
+import hashlib
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from app.core import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prepared frame or cached cube layout changes so stale cache files are ignored
+CACHE_FORMAT_VERSION = 5
+
+
+def cache_key(source: str, stamp: str, columns: Optional[list] = None) -> str:
+    """Build a cache key from the source location and its size/mtime/ETag stamp."""
+    parts = [str(CACHE_FORMAT_VERSION), source, stamp, ",".join(columns or ["*"])]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def cache_path(name: str, key: str) -> Path:
+    """Location of the cached Arrow file for a dataset name and key."""
+    return Path(config.CACHE_DIR) / f"{name}-{key}.arrow"
+
+
+@contextmanager
+def build_lock(name: str):
+    """Exclusive cross-process lock around building a dataset's cache file.
+
+    With several uvicorn/gunicorn workers the first one to get the lock
+    loads and writes the file; the others block, then memory-map it.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    cache_dir = Path(config.CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / f"{name}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_cached(path: Path) -> Optional[pd.DataFrame]:
+    """Memory-map a cached Arrow file, returning None if it is missing or unreadable.
+
+    Numeric columns are zero-copy views over the mapped file, so their pages
+    are shared through the OS page cache and the arrays are read-only.
+    """
+    if not path.exists():
+        return None
+
+    try:
+        source = pa.memory_map(str(path), "r")
+        table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+        logger.info(f"Memory-mapped cached dataset: {path} ({len(df)} rows)")
+        return df
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def write_cached(df: pd.DataFrame, path: Path) -> bool:
+    """Persist a prepared frame as an uncompressed Arrow IPC file.
+
+    The file is written next to its final location and renamed into place,
+    so readers never see a partial file. Older files for the same dataset
+    are removed. Returns whether the file was written.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote dataset cache: {path}")
+    except Exception as e:
+        logger.warning(f"Could not write cache file {path}: {e}")
+        return False
+
+    name = path.name.rsplit("-", 1)[0]
+    for stale in path.parent.glob(f"{name}-*.arrow"):
+        if stale != path:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+    return True
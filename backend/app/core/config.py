@@ -9,6 +9,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # Data source configuration
 DATA_SOURCE = os.getenv("DATA_SOURCE", "local")  # "local" or "s3"
+# Query backend: "pandas" (in-memory frame) or "duckdb" (SQL over the source files)
+QUERY_BACKEND = os.getenv("QUERY_BACKEND", "pandas")
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "")  # e.g. "1GB"; spills to CACHE_DIR beyond it
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0"))  # 0 = all cores
 
 # Local data paths - configurable via environment variable for Docker
 _default_data_dir = BASE_DIR.parent / "data"
@@ -16,17 +20,64 @@ LOCAL_DATA_DIR = Path(os.getenv("LOCAL_DATA_DIR", str(_default_data_dir)))
 SUBRAMOS_FILE = "subramos_historico.parquet"
 OTROS_CONCEPTOS_FILE = "otros_conceptos_historico.parquet"
 
+# Prebuilt serving artifact (python -m app.build_artifact); served instead of
+# SUBRAMOS_FILE when present, skipping preparation
+SUBRAMOS_ARTIFACT_FILE = os.getenv("SUBRAMOS_ARTIFACT_FILE", "subramos_serving.parquet")
+ARTIFACT_ROW_GROUP_SIZE = int(os.getenv("ARTIFACT_ROW_GROUP_SIZE", "100000"))
+
+# CSV sources are streamed through the pyarrow parser in blocks of this many bytes
+CSV_BLOCK_SIZE = int(os.getenv("CSV_BLOCK_SIZE", str(16 * 1024 * 1024)))
+
+# Data layout: "file" (single SUBRAMOS_FILE) or "partitioned" (Hive-partitioned
+# SUBRAMOS_DATASET directory: year=YYYY/trimestre=TT/*.parquet)
+DATA_LAYOUT = os.getenv("DATA_LAYOUT", "file")
+SUBRAMOS_DATASET = os.getenv("SUBRAMOS_DATASET", "subramos_historico")
+PARTITION_CACHE_SIZE = int(os.getenv("PARTITION_CACHE_SIZE", "8"))  # Resident (year, trimestre) partitions
+
+# Column projection - only these subramos columns are read from the source file
+PROJECT_COLUMNS = os.getenv("PROJECT_COLUMNS", "true").lower() == "true"
+METRIC_COLUMNS = [
+    "primas_emitidas", "primas_devengadas",
+    "siniestros_devengados", "gastos_devengados",
+]
+# Dimension columns held as categoricals (integer codes + shared dictionary)
+DIMENSION_COLUMNS = ["nombre_corto", "ramo_nombre_corto", "subramo_nombre_corto"]
+SUBRAMOS_COLUMNS = [
+    "periodo", "cod_cia", "nombre_corto",
+    "ramo_nombre_corto", "subramo_nombre_corto",
+    *METRIC_COLUMNS,
+    *[f"{col}_current" for col in METRIC_COLUMNS],
+]
+# Fiscal year starts in July: trimestre 03 (September) closes its first quarter.
+# Accumulated metrics restart there; missing _current metrics are derived from them.
+FISCAL_YEAR_START_TRIMESTRE = 3
+
+# Local Arrow cache of the prepared dataset (memory-mapped on warm restarts)
+SNAPSHOT_CACHE = os.getenv("SNAPSHOT_CACHE", "true").lower() == "true"
+CACHE_DIR = Path(os.getenv("CACHE_DIR", str(BASE_DIR / ".cache")))
+
+# Poll the source for a new version every N seconds and hot-swap it (0 = disabled)
+RELOAD_POLL_SECONDS = float(os.getenv("RELOAD_POLL_SECONDS", "300"))
+
 # S3 configuration
 S3_BUCKET = os.getenv("S3_BUCKET", "")
 S3_PREFIX = os.getenv("S3_PREFIX", "data/")  # Folder prefix in bucket
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # Custom endpoint (MinIO, moto) for local testing
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))  # Parallel row-group requests
+
+# Load otros_conceptos alongside subramos at startup; no data endpoint serves it,
+# so by default it is only loaded on first use
+PRELOAD_OTROS_CONCEPTOS = os.getenv("PRELOAD_OTROS_CONCEPTOS", "false").lower() == "true"
 
 # API configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+# Worker processes (uvicorn reads the same variable for --workers)
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
 
 # CORS settings - includes React dev (5173), Dash test (8051), and production
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173,http://localhost:8050,http://localhost:8051,http://localhost").split(",")
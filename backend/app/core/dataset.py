@@ -0,0 +1,156 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Structures derived from a prepared frame, built for every new snapshot
+_DERIVED_BUILDERS: Dict[str, Callable[[pd.DataFrame], Any]] = {}
+# Optional incremental updates: (previous structure, appended frame, first new row) -> structure
+_DERIVED_EXTENDERS: Dict[str, Callable[[Any, pd.DataFrame, int], Any]] = {}
+
+
+def register_derived(
+    name: str,
+    build: Callable[[pd.DataFrame], Any],
+    extend: Optional[Callable[[Any, pd.DataFrame, int], Any]] = None,
+) -> None:
+    """Register a derived structure to build (and cache) for every snapshot.
+
+    ``extend`` updates the structure of a snapshot for rows appended to its
+    frame, so appending a period does not rebuild it from scratch.
+    """
+    _DERIVED_BUILDERS[name] = build
+    if extend is not None:
+        _DERIVED_EXTENDERS[name] = extend
+
+
+def append_rows(df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """New frame with rows appended to df, column by column.
+
+    Categorical columns get the sorted union of both sides' categories, so
+    groupby output stays in alphabetical order; existing codes are remapped
+    through a small lookup table (a no-op gather when no category is new).
+    Other columns are cast to df's dtypes. Neither input is modified.
+    """
+    columns = {}
+    for col in df.columns:
+        old, new = df[col], rows[col]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            categories = old.cat.categories.union(pd.Index(new.dropna().unique()))
+            dtype = pd.CategoricalDtype(categories)
+            codes = old.cat.codes.to_numpy()
+            if not categories.equals(old.cat.categories):
+                # Trailing -1 keeps missing codes missing
+                remap = np.append(categories.get_indexer(old.cat.categories), -1)
+                codes = remap[codes]
+            new_codes = pd.Categorical(new, dtype=dtype).codes
+            columns[col] = pd.Categorical.from_codes(np.concatenate([codes, new_codes]), dtype=dtype)
+        else:
+            columns[col] = np.concatenate([old.to_numpy(), new.to_numpy().astype(old.dtype, copy=False)])
+    return pd.DataFrame(columns)
+
+
+def concat_rows(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Frames with the same columns stacked in order, column by column.
+
+    Categorical columns get the sorted union of every frame's categories,
+    as append_rows gives; a single frame is returned as is, without a copy.
+    """
+    if len(frames) == 1:
+        return frames[0]
+
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = union_categoricals(parts, sort_categories=True)
+        else:
+            columns[col] = np.concatenate([part.to_numpy() for part in parts])
+    return pd.DataFrame(columns)
+
+
+@dataclass
+class DatasetSnapshot:
+    """Versioned, read-only view of the prepared subramos dataset.
+
+    The loader swaps whole snapshots instead of mutating a frame in place,
+    so a request that grabbed a snapshot keeps reading it until it finishes.
+    Structures derived from the frame are cached on the snapshot itself,
+    which means swapping in a new version drops them all at once.
+    """
+
+    df: pd.DataFrame
+    version: str
+    source_stamp: str
+    warm_start: bool = False  # Served from the local Arrow cache
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    _cache: Dict[str, Any] = field(default_factory=dict, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def cached(self, name: str, build: Callable[[pd.DataFrame], Any]) -> Any:
+        """Return a derived structure, building it once per snapshot."""
+        if name in self._cache:
+            return self._cache[name]
+
+        with self._lock:
+            if name not in self._cache:
+                self._cache[name] = build(self.df)
+            return self._cache[name]
+
+    def derived(self, name: str) -> Any:
+        """Return a registered derived structure, building it once per snapshot."""
+        return self.cached(name, _DERIVED_BUILDERS[name])
+
+    def warm(self) -> None:
+        """Build every registered derived structure ahead of the first request."""
+        for name in list(_DERIVED_BUILDERS):
+            self.derived(name)
+
+    def appended(self, df: pd.DataFrame, start: int, version: str) -> "DatasetSnapshot":
+        """Snapshot of df, this snapshot's frame with rows from ``start`` appended.
+
+        Derived structures that registered an ``extend`` are updated for the
+        new rows only; the rest are rebuilt on first use (or by ``warm``).
+        The source stamp is kept, so a later change to the source file still
+        triggers a full reload.
+        """
+        snapshot = DatasetSnapshot(df=df, version=version, source_stamp=self.source_stamp)
+        for name, structure in list(self._cache.items()):
+            if name in _DERIVED_EXTENDERS:
+                snapshot._cache[name] = _DERIVED_EXTENDERS[name](structure, df, start)
+        return snapshot
+
+    @property
+    def cached_names(self) -> list:
+        """Names of the derived structures built so far."""
+        return sorted(self._cache)
+
+
+@dataclass
+class LoadStatus:
+    """Progress of the dataset load, reported by the readiness endpoint."""
+
+    state: str = "idle"  # idle | loading | ready | error
+    stage: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    def begin(self, stage: str) -> None:
+        """Mark a load as started."""
+        self.state = "loading"
+        self.stage = stage
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.error = None
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        """Mark the load as finished, successfully or with an error."""
+        self.state = "error" if error else "ready"
+        self.stage = None
+        self.finished_at = datetime.now(timezone.utc)
+        self.error = str(error) if error else None
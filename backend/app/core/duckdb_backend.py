@@ -0,0 +1,258 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core import config
+from app.logic.ratios import add_ratios
+
+logger = logging.getLogger(__name__)
+
+
+class DuckDBSubramos:
+    """Subramos queried in place with in-process DuckDB.
+
+    The source file (or Hive-partitioned directory) is exposed as a view
+    that applies the loader's preparation in SQL: periodo/year/trimestre,
+    numeric metrics with missing values as 0 and "Sin nombre" for missing
+    company names. Aggregations run as multi-threaded scans over the files
+    and spill to ``CACHE_DIR`` past ``DUCKDB_MEMORY_LIMIT``, so the dataset
+    never has to fit in memory. Results have the columns, row order and
+    values of the in-memory rollup cube, so the API output is identical.
+
+    ``source`` resolves the location to serve and its stamp; it is called
+    again on every refresh, so a new location (e.g. an artifact going
+    stale) or a changed schema recreates the view.
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], Tuple[str, str]],
+        partitioned: bool = False,
+        filesystem=None,
+    ):
+        import duckdb
+
+        self.location, stamp = source()
+        self.partitioned = partitioned
+        self._source = source
+        self._stamp: Optional[str] = None
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        settings = {"temp_directory": str(Path(config.CACHE_DIR) / "duckdb")}
+        if config.DUCKDB_MEMORY_LIMIT:
+            settings["memory_limit"] = config.DUCKDB_MEMORY_LIMIT
+        if config.DUCKDB_THREADS > 0:
+            settings["threads"] = config.DUCKDB_THREADS
+
+        self._con = duckdb.connect(config=settings)
+        if filesystem is not None:
+            self._con.register_filesystem(filesystem)
+
+        self.columns = self._create_view()
+        self._stamp = stamp
+        logger.info(f"Querying subramos with DuckDB over {self.location}")
+
+    def _source_sql(self) -> str:
+        """Table function reading the source files."""
+        location = self.location
+        if self.partitioned:
+            path = f"{location.rstrip('/')}/**/*.parquet"
+            if "://" not in path and not path.startswith("/"):
+                path = f"s3://{path}"  # Bucket-relative partition location
+            return f"read_parquet({_quote(path)}, hive_partitioning = true)"
+        if location.endswith(".csv"):
+            return f"read_csv({_quote(location)}, header = true)"
+        return f"read_parquet({_quote(location)})"
+
+    def _create_view(self) -> List[str]:
+        """Create the prepared ``subramos`` view. Returns its metric columns."""
+        source = self._source_sql()
+        available = [row[0] for row in self._con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+
+        if "periodo" in available:
+            periodo = "CAST(periodo AS BIGINT)"
+        else:
+            periodo = "CAST(year AS BIGINT) * 100 + CAST(trimestre AS BIGINT)"
+        # Hive partition columns are used as-is so year/trimestre filters prune files
+        year = "year" if self.partitioned and "year" in available else f"{periodo} // 100"
+        trimestre = "trimestre" if self.partitioned and "trimestre" in available else f"{periodo} % 100"
+
+        select = [
+            f"{periodo} AS periodo",
+            f"CAST({year} AS SMALLINT) AS year",
+            f"CAST({trimestre} AS TINYINT) AS trimestre",
+            "CAST(cod_cia AS BIGINT) AS cod_cia",
+            "COALESCE(CAST(nombre_corto AS VARCHAR), 'Sin nombre') AS nombre_corto",
+            "CAST(ramo_nombre_corto AS VARCHAR) AS ramo_nombre_corto",
+            "CAST(subramo_nombre_corto AS VARCHAR) AS subramo_nombre_corto",
+        ]
+        metrics = [
+            col for col in [*config.METRIC_COLUMNS, *[f"{m}_current" for m in config.METRIC_COLUMNS]]
+            if col in available
+        ]
+        select += [f"COALESCE(TRY_CAST({col} AS DOUBLE), 0) AS {col}" for col in metrics]
+
+        derived = [
+            col for col in config.METRIC_COLUMNS
+            if col in available and f"{col}_current" not in available
+        ]
+        if not derived:
+            self._con.execute(f"CREATE OR REPLACE VIEW subramos AS SELECT {', '.join(select)} FROM {source}")
+            return metrics
+
+        # Missing current metrics: the within-fiscal-year difference of accumulated
+        # values, as the loader derives them
+        self._con.execute(f"CREATE OR REPLACE VIEW subramos_source AS SELECT {', '.join(select)} FROM {source}")
+        fiscal_year = f"year - CASE WHEN trimestre < {config.FISCAL_YEAR_START_TRIMESTRE} THEN 1 ELSE 0 END"
+        window = (
+            f"PARTITION BY cod_cia, ramo_nombre_corto, subramo_nombre_corto, {fiscal_year} "
+            "ORDER BY periodo"
+        )
+        currents = [f"{col} - COALESCE(LAG({col}) OVER ({window}), 0) AS {col}_current" for col in derived]
+        self._con.execute(
+            f"CREATE OR REPLACE VIEW subramos AS SELECT *, {', '.join(currents)} FROM subramos_source"
+        )
+        return [*metrics, *[f"{col}_current" for col in derived]]
+
+    def _query(self, sql: str, params: Optional[list] = None):
+        """Run a query on its own cursor, so concurrent requests do not share state."""
+        return self._con.cursor().execute(sql, params or [])
+
+    @property
+    def version(self) -> Optional[str]:
+        """Stamp of the source files last seen."""
+        return self._stamp
+
+    def refresh(self) -> bool:
+        """Recreate the view over the current source if it changed. Returns whether it did.
+
+        Queries always read the files, so besides the view (whose location
+        or columns may have changed) only derived values need dropping.
+        """
+        location, stamp = self._source()
+        with self._lock:
+            if location == self.location and stamp == self._stamp:
+                return False
+            if location != self.location:
+                logger.info(f"Subramos source moved to {location}")
+            self.location = location
+            self.columns = self._create_view()
+            self._stamp = stamp
+            self._derived.clear()
+        return True
+
+    def cached(self, name: str, build: Callable[[], Any]) -> Any:
+        """Cache a value derived from the source until the files change."""
+        if name not in self._derived:
+            self._derived[name] = build()
+        return self._derived[name]
+
+    def _metric_columns(self, view_mode: str) -> List[Tuple[str, str]]:
+        """(source column, standard name) pairs for the view mode."""
+        suffix = "_current" if view_mode == "current" else ""
+        return [(f"{col}{suffix}", col) for col in config.METRIC_COLUMNS if f"{col}{suffix}" in self.columns]
+
+    def _where(
+        self,
+        year: Optional[int] = None,
+        trimestre=None,
+        ramo: Optional[str] = None,
+        companies: Optional[List[str]] = None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> Tuple[str, list]:
+        """WHERE clause and parameters for the request filters."""
+        conditions, params = ["TRUE"], []
+        if year is not None:
+            conditions.append("year = ?")
+            params.append(int(year))
+        if trimestre is not None:
+            conditions.append("trimestre = ?")
+            params.append(int(trimestre))
+        if ramo:
+            conditions.append("ramo_nombre_corto = ?")
+            params.append(ramo)
+        if companies:
+            conditions.append(f"nombre_corto IN ({', '.join('?' for _ in companies)})")
+            params.extend(companies)
+        if from_period is not None:
+            conditions.append("periodo >= ?")
+            params.append(int(from_period))
+        if to_period is not None:
+            conditions.append("periodo <= ?")
+            params.append(int(to_period))
+        return " AND ".join(conditions), params
+
+    def aggregate(
+        self, group_cols: List[str], view_mode: str = "accumulated", dropna: bool = True, **filters
+    ) -> pd.DataFrame:
+        """Same result as aggregate_by over the filtered frame, computed in SQL, plus ratios.
+
+        With ``dropna`` False, rows with a missing key are grouped too (nulls sort last).
+        """
+        where, params = self._where(**filters)
+        keys = ", ".join(group_cols)
+        # Compensated sums: results do not depend on how threads split the scan
+        sums = ", ".join(f"FSUM({src}) AS {name}" for src, name in self._metric_columns(view_mode))
+        if dropna:
+            # Rows with a missing key belong to no group, as in a pandas groupby
+            where = " AND ".join([where, *(f"{col} IS NOT NULL" for col in group_cols)])
+
+        sql = (
+            f"SELECT {keys}, {sums} FROM subramos "
+            f"WHERE {where} GROUP BY {keys} ORDER BY {keys}"
+        )
+        return add_ratios(self._query(sql, params).df())
+
+    def top_companies(self, column: str, n: Optional[int] = None, view_mode: str = "accumulated", **filters):
+        """Nothing is ranked ahead here: callers select the top companies from the aggregate."""
+        return None
+
+    def totals(self, view_mode: str = "accumulated", **filters) -> dict:
+        """Same result as get_totals over the filtered frame, computed in SQL."""
+        where, params = self._where(**filters)
+        metrics = self._metric_columns(view_mode)
+        sums = ", ".join(f"COALESCE(FSUM({src}), 0)" for src, _ in metrics)
+
+        row = self._query(
+            f"SELECT {sums}, COUNT(DISTINCT cod_cia) FROM subramos WHERE {where}", params
+        ).fetchone()
+
+        totals = {col: 0 for col in config.METRIC_COLUMNS}
+        totals.update({name: value for (_, name), value in zip(metrics, row)})
+        totals["entities_count"] = row[-1]
+        return totals
+
+    def periods(self) -> List[Tuple[int, int]]:
+        """(year, trimestre) of every period, ascending."""
+        rows = self._query("SELECT DISTINCT year, trimestre FROM subramos ORDER BY year, trimestre").fetchall()
+        return [(int(year), int(trimestre)) for year, trimestre in rows]
+
+    def row_count(self) -> int:
+        """Rows in the source."""
+        return self._query("SELECT COUNT(*) FROM subramos").fetchone()[0]
+
+    def filter_options(self) -> dict:
+        """Unique values for all filter dropdowns."""
+        periods = self.periods()
+
+        def values(col):
+            rows = self._query(f"SELECT DISTINCT {col} FROM subramos WHERE {col} IS NOT NULL").fetchall()
+            return sorted(row[0] for row in rows)
+
+        return {
+            "years": sorted({year for year, _ in periods}, reverse=True),
+            "trimestres": [f"{t:02d}" for t in sorted({t for _, t in periods})],
+            "ramos": values("ramo_nombre_corto"),
+            "subramos": values("subramo_nombre_corto"),
+            "companies": values("nombre_corto"),
+        }
+
+
+def _quote(value: str) -> str:
+    """SQL string literal."""
+    return "'" + value.replace("'", "''") + "'"
@@ -1,42 +1,202 @@
 import os
+import csv
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from app.core import config
+from app.core import config, arrow_cache
+from app.core.dataset import DatasetSnapshot, LoadStatus, append_rows, register_derived
+from app.core.duckdb_backend import DuckDBSubramos
+from app.core.partitions import PartitionedSubramos
+from app.logic.cube import RollupCube
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Registered with the loader, so every snapshot it builds (for the app, a
+# script or build_artifact) warms the cube whatever else was imported
+register_derived("rollup_cube", RollupCube, extend=RollupCube.appended)
+
+# Explicit CSV schema: dimensions arrive dictionary-encoded, metrics as float64
+_CSV_COLUMN_TYPES = {
+    "periodo": pa.int64(),
+    "cod_cia": pa.int64(),
+    **{col: pa.dictionary(pa.int32(), pa.string()) for col in config.DIMENSION_COLUMNS},
+    **{col: pa.float64() for col in config.METRIC_COLUMNS},
+    **{f"{col}_current": pa.float64() for col in config.METRIC_COLUMNS},
+}
+
 
 class DataLoader:
     """Handles loading data from local files or S3."""
 
     def __init__(self):
         self.data_source = config.DATA_SOURCE
-        self._subramos_df: Optional[pd.DataFrame] = None
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._reload_lock = threading.Lock()
+        self._otros_lock = threading.Lock()
+        self.status = LoadStatus()
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_stop = threading.Event()
+        self._partitions: Optional[PartitionedSubramos] = None
+        self._duckdb: Optional[DuckDBSubramos] = None
         self._otros_conceptos_df: Optional[pd.DataFrame] = None
         self._s3_fs = None
+        self._artifact_checks: dict = {}  # (artifact stamp, source stamp) -> artifact is current
 
-        logger.info(f"DataLoader initialized with data_source: {self.data_source}")
+        logger.info(
+            f"DataLoader initialized with data_source: {self.data_source}, "
+            f"query_backend: {config.QUERY_BACKEND}"
+        )
         if self.data_source == "s3":
             logger.info(f"S3 bucket: {config.S3_BUCKET}, prefix: {config.S3_PREFIX}")
+        if config.WORKERS > 1 and not config.SNAPSHOT_CACHE:
+            logger.warning(
+                f"Running {config.WORKERS} workers with SNAPSHOT_CACHE disabled: "
+                "each worker holds its own copy of the dataset"
+            )
 
     def _get_s3_fs(self):
         """Get or create S3 filesystem connection."""
         if self._s3_fs is None:
             import s3fs
 
+            client_kwargs = {"region_name": config.AWS_REGION}
+            if config.S3_ENDPOINT_URL:
+                client_kwargs["endpoint_url"] = config.S3_ENDPOINT_URL
+
             self._s3_fs = s3fs.S3FileSystem(
                 key=config.AWS_ACCESS_KEY_ID,
                 secret=config.AWS_SECRET_ACCESS_KEY,
-                client_kwargs={"region_name": config.AWS_REGION}
+                client_kwargs=client_kwargs,
             )
             logger.info("S3 filesystem connection established")
         return self._s3_fs
 
+    @property
+    def partitioned(self) -> bool:
+        """Whether subramos is a Hive-partitioned dataset loaded per period."""
+        return config.DATA_LAYOUT == "partitioned"
+
+    def get_partitions(self) -> PartitionedSubramos:
+        """Get or create the partitioned subramos dataset."""
+        if self._partitions is None:
+            if self.data_source == "s3":
+                location = f"{config.S3_BUCKET}/{config.S3_PREFIX}{config.SUBRAMOS_DATASET}"
+                filesystem = self._get_s3_fs()
+            else:
+                location = os.path.join(config.LOCAL_DATA_DIR, config.SUBRAMOS_DATASET)
+                filesystem = None
+
+            logger.info(f"Using partitioned subramos dataset: {location}")
+            self._partitions = PartitionedSubramos(
+                location,
+                prepare=self._prepare_subramos,
+                columns=self._subramos_columns(),
+                filesystem=filesystem,
+            )
+        return self._partitions
+
+    @property
+    def uses_duckdb(self) -> bool:
+        """Whether queries run as SQL over the source files instead of an in-memory frame."""
+        return config.QUERY_BACKEND == "duckdb"
+
+    def get_duckdb(self) -> DuckDBSubramos:
+        """Get or create the DuckDB view over the subramos source."""
+        if self._duckdb is None:
+            with self._reload_lock:
+                if self._duckdb is None:
+                    self._duckdb = self._create_duckdb()
+        return self._duckdb
+
+    def _create_duckdb(self) -> DuckDBSubramos:
+        """Open DuckDB over the partitioned dataset or the (artifact or raw) subramos file."""
+        filesystem = self._get_s3_fs() if self.data_source == "s3" else None
+        if self.partitioned:
+            partitions = self.get_partitions()
+            return DuckDBSubramos(
+                lambda: (partitions.location, partitions.stamp()), partitioned=True, filesystem=filesystem
+            )
+
+        # Resolved on every refresh, so a stale artifact gives way to the source
+        return DuckDBSubramos(lambda: self._source_stamp(self._subramos_filename()), filesystem=filesystem)
+
+    def _s3_path(self, filename: str) -> str:
+        """Full S3 URL for a dataset file."""
+        return f"s3://{config.S3_BUCKET}/{config.S3_PREFIX}{filename}"
+
+    def _subramos_filename(self) -> str:
+        """Subramos file to serve: the prebuilt serving artifact if present and current.
+
+        The artifact records the stamp of the source it was built from. When
+        the source is present with a different stamp, the artifact is stale
+        and the source is served instead, so new quarters are never hidden
+        behind an old artifact.
+        """
+        artifact = config.SUBRAMOS_ARTIFACT_FILE
+        if self.data_source == "s3":
+            exists = self._get_s3_fs().exists(self._s3_path(artifact))
+        else:
+            exists = os.path.exists(os.path.join(config.LOCAL_DATA_DIR, artifact))
+        if not exists:
+            return config.SUBRAMOS_FILE
+
+        try:
+            _, source_stamp = self._source_stamp(config.SUBRAMOS_FILE)
+        except FileNotFoundError:
+            return artifact  # Only the artifact is deployed
+
+        _, artifact_stamp = self._source_stamp(artifact)
+        key = (artifact_stamp, source_stamp)
+        if key not in self._artifact_checks:
+            built_from = self._artifact_source_stamp(artifact)
+            current = built_from == source_stamp
+            if not current:
+                logger.warning(
+                    f"Serving artifact {artifact} was built from source version {built_from}, "
+                    f"but {config.SUBRAMOS_FILE} is now {source_stamp}: serving the source instead. "
+                    "Rebuild the artifact with python -m app.build_artifact"
+                )
+            self._artifact_checks = {key: current}
+        return artifact if self._artifact_checks[key] else config.SUBRAMOS_FILE
+
+    def _artifact_source_stamp(self, artifact: str) -> Optional[str]:
+        """Source stamp recorded in a serving artifact's metadata (None if not recorded)."""
+        if self.data_source == "s3":
+            with self._get_s3_fs().open(self._s3_path(artifact), "rb") as f:
+                metadata = pq.read_schema(f).metadata
+        else:
+            metadata = pq.read_schema(os.path.join(config.LOCAL_DATA_DIR, artifact)).metadata
+        stamp = (metadata or {}).get(b"source_stamp")
+        return stamp.decode() if stamp else None
+
+    def _source_stamp(self, filename: str) -> Tuple[str, str]:
+        """Return (location, stamp) identifying the current version of a source file.
+
+        The stamp is size + mtime for local files and the ETag for S3 objects.
+        """
+        if self.data_source == "s3":
+            s3_path = self._s3_path(filename)
+            info = self._get_s3_fs().info(s3_path)
+            stamp = info.get("ETag") or f"{info.get('size')}-{info.get('LastModified')}"
+            return s3_path, str(stamp)
+
+        if filename == config.SUBRAMOS_ARTIFACT_FILE:
+            filepath = os.path.join(config.LOCAL_DATA_DIR, filename)
+        else:
+            filepath = self._get_local_path(filename)
+        stat = os.stat(filepath)
+        return filepath, f"{stat.st_size}-{stat.st_mtime_ns}"
+
     def _get_local_path(self, filename: str) -> str:
         """Get full path for local file, checking parquet then csv."""
         base_name = filename.replace(".parquet", "").replace(".csv", "")
@@ -61,28 +221,91 @@ class DataLoader:
 
         raise FileNotFoundError(f"No data file found for {filename}")
 
-    def _load_file(self, filepath: str) -> pd.DataFrame:
+    def _subramos_columns(self) -> Optional[List[str]]:
+        """Columns to read for subramos (None = all columns)."""
+        return config.SUBRAMOS_COLUMNS if config.PROJECT_COLUMNS else None
+
+    def _read_parquet(self, source, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a parquet file through pyarrow, projecting to the requested columns.
+
+        Dimension columns are read as dictionaries, so files that store them
+        dictionary-encoded come back as categoricals without decoding strings.
+        """
+        parquet_file = pq.ParquetFile(source, read_dictionary=config.DIMENSION_COLUMNS)
+        if columns is not None:
+            available = set(parquet_file.schema_arrow.names)
+            columns = [c for c in columns if c in available]
+        table = parquet_file.read(columns=columns)
+        # Release arrow buffers while converting to keep peak memory low
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _read_csv(self, source, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Stream a csv through the pyarrow parser in fixed-size blocks.
+
+        Known columns get an explicit schema, so each block is parsed, typed and
+        dictionary-encoded as it is read and only the compact encoded batches
+        are kept. Falls back to pandas if a value does not fit the schema.
+        """
+        header = self._csv_header(source)
+        include = [c for c in header if columns is None or c in columns]
+
+        try:
+            reader = pacsv.open_csv(
+                source,
+                read_options=pacsv.ReadOptions(block_size=config.CSV_BLOCK_SIZE),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={c: t for c, t in _CSV_COLUMN_TYPES.items() if c in include},
+                    include_columns=include,
+                    strings_can_be_null=True,
+                ),
+            )
+            batches = list(reader)
+        except pa.ArrowInvalid as e:
+            logger.warning(f"Typed csv parse failed ({e}); falling back to pandas")
+            self._rewind(source)
+            return pd.read_csv(source, usecols=include)
+
+        table = pa.Table.from_batches(batches, schema=reader.schema).unify_dictionaries()
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _csv_header(self, source) -> List[str]:
+        """Column names from the first line of a csv path or file object."""
+        if isinstance(source, str):
+            with open(source, newline="", encoding="utf-8") as f:
+                line = f.readline()
+        else:
+            line = source.readline()
+            self._rewind(source)
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+        return next(csv.reader([line]), [])
+
+    def _rewind(self, source) -> None:
+        """Seek a file object back to the start (paths need nothing)."""
+        if not isinstance(source, str):
+            source.seek(0)
+
+    def _load_file(self, filepath: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """Load a single file (parquet or csv)."""
         logger.info(f"Loading local file: {filepath}")
         if filepath.endswith(".parquet"):
-            return pd.read_parquet(filepath)
+            return self._read_parquet(filepath, columns)
         else:
-            return pd.read_csv(filepath)
+            return self._read_csv(filepath, columns)
 
-    def _load_from_s3(self, filename: str) -> pd.DataFrame:
+    def _load_from_s3(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """Load file from S3 bucket."""
-        s3_path = f"s3://{config.S3_BUCKET}/{config.S3_PREFIX}{filename}"
+        s3_path = self._s3_path(filename)
         logger.info(f"Loading from S3: {s3_path}")
 
         fs = self._get_s3_fs()
 
         try:
             if filename.endswith(".parquet"):
-                with fs.open(s3_path, "rb") as f:
-                    df = pd.read_parquet(f)
+                df = self._read_parquet_s3(s3_path, columns)
             else:
                 with fs.open(s3_path, "rb") as f:
-                    df = pd.read_csv(f)
+                    df = self._read_csv(f, columns)
 
             logger.info(f"Successfully loaded {len(df)} rows from S3")
             return df
@@ -90,67 +313,507 @@ class DataLoader:
             logger.error(f"Error loading from S3: {e}")
             raise
 
+    def _read_parquet_s3(self, s3_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read an S3 parquet object, fetching its row groups concurrently.
+
+        The footer is read once; row groups are then requested in parallel by a
+        pool bounded by S3_MAX_CONCURRENCY, each with its own file handle, and
+        concatenated in file order.
+        """
+        fs = self._get_s3_fs()
+        with fs.open(s3_path, "rb") as f:
+            metadata = pq.ParquetFile(f).metadata
+        read_dictionary = config.DIMENSION_COLUMNS
+
+        if columns is not None:
+            available = set(metadata.schema.to_arrow_schema().names)
+            columns = [c for c in columns if c in available]
+
+        def read_row_group(index: int) -> pa.Table:
+            with fs.open(s3_path, "rb") as f:
+                parquet_file = pq.ParquetFile(f, metadata=metadata, read_dictionary=read_dictionary)
+                return parquet_file.read_row_group(index, columns=columns)
+
+        workers = max(1, min(config.S3_MAX_CONCURRENCY, metadata.num_row_groups))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            tables = list(pool.map(read_row_group, range(metadata.num_row_groups)))
+
+        if tables:
+            table = pa.concat_tables(tables).unify_dictionaries()
+        else:
+            table = metadata.schema.to_arrow_schema().empty_table()
+            if columns is not None:
+                table = table.select(columns)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
     def load_subramos(self, force_reload: bool = False) -> pd.DataFrame:
         """Load subramos historico dataset."""
-        if self._subramos_df is None or force_reload:
-            if self.data_source == "s3":
-                self._subramos_df = self._load_from_s3(config.SUBRAMOS_FILE)
-            else:
-                filepath = self._get_local_path(config.SUBRAMOS_FILE)
-                self._subramos_df = self._load_file(filepath)
+        return self.get_snapshot(force_reload).df
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether requests can be served without waiting for a load."""
+        if self.uses_duckdb:
+            return self._duckdb is not None
+        if self.partitioned:
+            return self._partitions is not None
+        return self._snapshot is not None
+
+    def ensure_loaded(self) -> None:
+        """Block until the dataset is available, joining any load in progress."""
+        if self.uses_duckdb:
+            self.get_duckdb()
+        elif self.partitioned:
+            self.get_partitions().dataset()
+        else:
+            self.get_snapshot()
+
+    def get_snapshot(self, force_reload: bool = False) -> DatasetSnapshot:
+        """Current versioned snapshot of the subramos dataset.
+
+        Loads are single-flight: concurrent callers wait on the lock and
+        receive the snapshot built by whichever caller got there first.
+        """
+        if self.partitioned:
+            if force_reload:
+                self.get_partitions().refresh()
+            return self.get_partitions().get()
+
+        if self._snapshot is None or force_reload:
+            with self._reload_lock:
+                if self._snapshot is None or force_reload:
+                    self._snapshot = self._build_snapshot()
+        return self._snapshot
+
+    def get_snapshot_for(
+        self,
+        year: Optional[int] = None,
+        trimestre=None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> DatasetSnapshot:
+        """Snapshot covering the requested period and period range.
+
+        In the partitioned layout only the matching partitions are loaded;
+        otherwise this is the full dataset.
+        """
+        if not self.partitioned:
+            return self.get_snapshot()
+
+        trimestre = int(trimestre) if trimestre is not None else None
+        return self.get_partitions().get(year, trimestre, from_period, to_period)
+
+    def refresh_if_changed(self) -> bool:
+        """Reload subramos if its source changed, swapping in a new snapshot.
+
+        The new frame is built off to the side and published with a single
+        reference assignment; readers holding the old snapshot are unaffected.
+        """
+        if self.uses_duckdb:
+            # Queries always read the files; only cached results are dropped
+            return self.get_duckdb().refresh()
+
+        if self.partitioned:
+            # Resident partitions are dropped and reloaded lazily on demand
+            return self.get_partitions().refresh()
+
+        with self._reload_lock:
+            location, stamp = self._source_stamp(self._subramos_filename())
+            current = self._snapshot
+            if current is not None and current.source_stamp == stamp:
+                return False
+
+            snapshot = self._build_snapshot(location, stamp)
+            self._snapshot = snapshot
+
+        logger.info(f"Swapped in subramos version {snapshot.version} ({len(snapshot.df)} rows)")
+        return True
+
+    def ingest_period(self, source: str) -> DatasetSnapshot:
+        """Append a file holding one new period to the in-memory dataset.
+
+        ``source`` is a local path or an ``s3://`` URL of a parquet or csv
+        file with the columns of subramos, for a period later than any
+        loaded. Only that file is read and prepared, and the indexes and
+        rollups are extended with its rows instead of rebuilt. The result
+        is published as a new snapshot, so readers are never blocked and
+        requests in flight finish on the previous one.
+
+        The appended period lives in this process only: a full reload (a
+        source change picked up by the watcher, or a restart) replaces it
+        with the contents of the source file.
+        """
+        if self.uses_duckdb or self.partitioned:
+            raise ValueError(
+                "ingest_period appends to the in-memory dataset; with DuckDB or the "
+                "partitioned layout add the period's file to the source instead"
+            )
+
+        raw = self._read_period_file(source)
+        self.get_snapshot()
+        with self._reload_lock:
+            current = self._snapshot
+            df = current.df
+            # Missing current metrics are derived against the fiscal year loaded so far
+            rows = self._prepare_subramos(raw, history=self._fiscal_year_rows(df, raw))
+            periods = rows["periodo"].unique()
+            if len(periods) != 1:
+                raise ValueError(f"{source} must hold exactly one period, found {sorted(periods)}")
+            periodo = int(periods[0])
+
+            if len(df) and periodo <= df["periodo"].iloc[-1]:
+                raise ValueError(f"Period {periodo} is not later than the loaded data ({df['periodo'].iloc[-1]})")
+            missing = set(df.columns) - set(rows.columns)
+            if missing:
+                raise ValueError(f"{source} is missing columns {sorted(missing)}")
+
+            # Rows stay sorted by periodo, so the new period is a tail slice
+            snapshot = current.appended(append_rows(df, rows), len(df), version=f"{current.version}+{periodo}")
+            snapshot.warm()
+            self._snapshot = snapshot
+
+        logger.info(f"Appended period {periodo} ({len(rows)} rows) as version {snapshot.version}")
+        return snapshot
+
+    def _fiscal_year_rows(self, df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+        """Rows of the periodo-sorted df in the fiscal year of the latest period of rows."""
+        if "periodo" in rows.columns:
+            periodo = pd.to_numeric(rows["periodo"])
+        else:
+            periodo = pd.to_numeric(rows["year"]) * 100 + pd.to_numeric(rows["trimestre"])
+        year, trimestre = divmod(int(periodo.max()), 100)
+        start_year = year if trimestre >= config.FISCAL_YEAR_START_TRIMESTRE else year - 1
+        start = start_year * 100 + config.FISCAL_YEAR_START_TRIMESTRE
+        return df.iloc[int(np.searchsorted(df["periodo"].to_numpy(), start)):]
+
+    def _read_period_file(self, source: str) -> pd.DataFrame:
+        """Read a single-period subramos file from a local path or S3 URL."""
+        columns = self._subramos_columns()
+        if not source.startswith("s3://"):
+            return self._load_file(source, columns)
+        if source.endswith(".parquet"):
+            return self._read_parquet_s3(source, columns)
+        with self._get_s3_fs().open(source, "rb") as f:
+            return self._read_csv(f, columns)
+
+    def start_watcher(self, interval: Optional[float] = None) -> None:
+        """Poll the source in a background thread and hot-swap new versions."""
+        if interval is None:
+            interval = config.RELOAD_POLL_SECONDS
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while not self._watcher_stop.wait(interval):
+                try:
+                    self.refresh_if_changed()
+                except Exception as e:
+                    logger.error(f"Dataset refresh failed: {e}")
+
+        self._watcher_stop.clear()
+        self._watcher = threading.Thread(target=watch, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching subramos source every {interval}s")
+
+    def stop_watcher(self) -> None:
+        """Stop the background source watcher."""
+        if self._watcher is not None:
+            self._watcher_stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _build_snapshot(self, location: Optional[str] = None, stamp: Optional[str] = None) -> DatasetSnapshot:
+        """Load and prepare subramos into a new snapshot."""
+        if location is None or stamp is None:
+            location, stamp = self._source_stamp(self._subramos_filename())
+        columns = self._subramos_columns()
+        version = arrow_cache.cache_key(location, stamp, columns)
+
+        df, warm_start = self._load_prepared_subramos(location, version, columns)
+        snapshot = DatasetSnapshot(df=df, version=version, source_stamp=stamp, warm_start=warm_start)
+
+        # Build indexes and rollups before the snapshot is published
+        self.status.stage = "warming caches"
+        if config.SNAPSHOT_CACHE:
+            snapshot.cached("rollup_cube", lambda df: self._load_shared_cube(df, version))
+        snapshot.warm()
+        return snapshot
+
+    def _load_prepared_subramos(
+        self, location: str, key: str, columns: Optional[List[str]]
+    ) -> Tuple[pd.DataFrame, bool]:
+        """Load and prepare subramos, going through the local Arrow cache when enabled.
+
+        With the cache enabled the dataset is built once under a cross-process
+        lock and every worker serves it from the same memory-mapped file, so
+        running N workers does not hold N private copies. Returns the frame and
+        whether it came from the cache.
+        """
+        if not config.SNAPSHOT_CACHE:
+            return self._read_subramos(location, columns), False
+
+        cache_file = arrow_cache.cache_path("subramos", key)
+
+        self.status.stage = "reading cache"
+        with arrow_cache.build_lock("subramos"):
+            df = arrow_cache.read_cached(cache_file)
+            if df is not None:
+                return df, True
+
+            df = self._read_subramos(location, columns)
+            self.status.stage = "writing cache"
+            if arrow_cache.write_cached(df, cache_file):
+                # Serve from the mapped file so this worker shares pages too
+                mapped = arrow_cache.read_cached(cache_file)
+                if mapped is not None:
+                    df = mapped
+
+        return df, False
+
+    def _load_shared_cube(self, df: pd.DataFrame, key: str) -> RollupCube:
+        """Rollup cube of df over tables shared through the local Arrow cache.
+
+        The first worker builds the cube and writes its rollups and rankings
+        under the same kind of lock as the frame; every worker then
+        memory-maps them, so only the indexes over them are private.
+        """
+        paths = {name: arrow_cache.cache_path(f"rollup_cube_{name}", key) for name in RollupCube.TABLES}
+
+        def read_tables() -> Optional[Dict[str, pd.DataFrame]]:
+            tables = {name: arrow_cache.read_cached(path) for name, path in paths.items()}
+            return None if any(table is None for table in tables.values()) else tables
+
+        with arrow_cache.build_lock("rollup_cube"):
+            tables = read_tables()
+            if tables is not None:
+                return RollupCube.from_tables(df, tables)
+
+            cube = RollupCube(df)
+            written = [arrow_cache.write_cached(table, paths[name]) for name, table in cube.tables().items()]
+            if all(written):
+                # Serve from the mapped files so this worker shares pages too
+                tables = read_tables()
+                if tables is not None:
+                    return RollupCube.from_tables(df, tables)
+        return cube
+
+    def _read_subramos(self, location: str, columns: Optional[List[str]]) -> pd.DataFrame:
+        """Read subramos from its source and prepare it.
+
+        A serving artifact is already prepared, so only its categories are
+        normalized.
+        """
+        filename = os.path.basename(location)
+        is_artifact = filename == config.SUBRAMOS_ARTIFACT_FILE
+        if is_artifact:
+            # Built from the projected columns plus the derived ones
+            columns = None
+
+        self.status.stage = "reading source"
+        if self.data_source == "s3":
+            df = self._load_from_s3(filename, columns)
+        else:
+            df = self._load_file(location, columns)
 
-            # Ensure proper types
-            self._subramos_df = self._prepare_subramos(self._subramos_df)
+        if is_artifact:
+            logger.info("Serving prebuilt artifact, skipping preparation")
+            return self._derive_current_metrics(self._sort_by_period(self._encode_dimensions(df)))
 
-        return self._subramos_df
+        # Ensure proper types
+        self.status.stage = "preparing"
+        return self._prepare_subramos(df)
+
+    def read_source_subramos(self) -> pd.DataFrame:
+        """Read and prepare the raw subramos source, bypassing artifact and cache."""
+        location, _ = self._source_stamp(config.SUBRAMOS_FILE)
+        return self._read_subramos(location, self._subramos_columns())
 
     def load_otros_conceptos(self, force_reload: bool = False) -> pd.DataFrame:
         """Load otros conceptos historico dataset."""
         if self._otros_conceptos_df is None or force_reload:
-            if self.data_source == "s3":
-                self._otros_conceptos_df = self._load_from_s3(config.OTROS_CONCEPTOS_FILE)
-            else:
-                filepath = self._get_local_path(config.OTROS_CONCEPTOS_FILE)
-                self._otros_conceptos_df = self._load_file(filepath)
+            with self._otros_lock:
+                if self._otros_conceptos_df is None or force_reload:
+                    if self.data_source == "s3":
+                        self._otros_conceptos_df = self._load_from_s3(config.OTROS_CONCEPTOS_FILE)
+                    else:
+                        filepath = self._get_local_path(config.OTROS_CONCEPTOS_FILE)
+                        self._otros_conceptos_df = self._load_file(filepath)
 
         return self._otros_conceptos_df
 
-    def _prepare_subramos(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Prepare subramos dataframe with proper types and derived columns."""
-        df = df.copy()
+    def _prepare_subramos(self, df: pd.DataFrame, history: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Prepare subramos dataframe with proper types and derived columns.
+
+        Works in place: the frame comes straight from the reader and is not
+        shared, so no intermediate copy is made. Dimensions are stored as
+        categoricals and year/trimestre as small ints, so filters and groupbys
+        run on integer codes; names are only decoded when building responses.
+        Missing ``_current`` metrics are derived, against ``history`` (earlier
+        prepared rows) when given.
+        """
+        # Partition files may omit periodo; rebuild it from the partition keys
+        if "periodo" not in df.columns:
+            df["periodo"] = df["year"].astype("int64") * 100 + df["trimestre"].astype("int64")
 
         # Extract year and trimestre from periodo (format: YYYYTT where TT is 01, 02, 03, 04)
-        periodo_str = df["periodo"].astype(str)
-        df["year"] = periodo_str.str[:4].astype(int)
-        df["trimestre"] = periodo_str.str[-2:]  # Last 2 digits: 01, 02, 03, 04
+        if not pd.api.types.is_integer_dtype(df["periodo"]):
+            df["periodo"] = pd.to_numeric(df["periodo"]).astype("int64")
+        periodo = df["periodo"].to_numpy()
+        df["year"] = (periodo // 100).astype(np.int16)
+        df["trimestre"] = (periodo % 100).astype(np.int8)  # 1, 2, 3, 4
 
         # Ensure numeric columns
-        numeric_cols = [
-            "primas_emitidas", "primas_devengadas",
-            "siniestros_devengados", "gastos_devengados"
-        ]
-        for col in numeric_cols:
+        for col in config.METRIC_COLUMNS:
             if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = pd.to_numeric(df[col], errors="coerce")
+                if df[col].hasnans:
+                    df[col] = df[col].fillna(0)
 
         # Fill missing company names
         if "nombre_corto" in df.columns:
-            df["nombre_corto"] = df["nombre_corto"].fillna("Sin nombre")
+            names = df["nombre_corto"]
+            if names.hasnans:
+                if isinstance(names.dtype, pd.CategoricalDtype) and "Sin nombre" not in names.cat.categories:
+                    names = names.cat.add_categories("Sin nombre")
+                df["nombre_corto"] = names.fillna("Sin nombre")
+
+        return self._derive_current_metrics(self._sort_by_period(self._encode_dimensions(df)), history)
+
+    def _derive_current_metrics(self, df: pd.DataFrame, history: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Add any missing ``_current`` metric as a difference of accumulated values.
+
+        Accumulated metrics restart every fiscal year, so the current value is
+        the accumulated one minus the previous period's of the same company,
+        ramo and subramo within the fiscal year (the accumulated value itself
+        in its first quarter). Rows are grouped with one stable ``lexsort`` on
+        the key codes of the periodo-sorted frame, which keeps each group in
+        period order, and shifted by one position. ``history`` holds prepared
+        rows of earlier periods to difference against when df starts
+        mid-year (an appended period).
+        """
+        missing = [
+            col for col in config.METRIC_COLUMNS
+            if col in df.columns and f"{col}_current" not in df.columns
+        ]
+        if not missing:
+            return df
+
+        keys = [c for c in ("cod_cia", "ramo_nombre_corto", "subramo_nombre_corto") if c in df.columns]
+        frame = df
+        if history is not None and len(history):
+            columns = [*keys, "periodo", *missing]
+            frame = append_rows(history[columns], df[columns])
+
+        periodo = frame["periodo"].to_numpy()
+        fiscal_year = periodo // 100 - (periodo % 100 < config.FISCAL_YEAR_START_TRIMESTRE)
+        codes = [
+            frame[c].cat.codes.to_numpy() if isinstance(frame[c].dtype, pd.CategoricalDtype) else frame[c].to_numpy()
+            for c in keys
+        ]
+        # lexsort is stable and sorts by its last key first
+        order = np.lexsort([fiscal_year, *reversed(codes)])
+
+        # Whether each sorted row continues the group of the row before it
+        same = fiscal_year[order][1:] == fiscal_year[order][:-1]
+        for key in codes:
+            ordered = key[order]
+            same &= ordered[1:] == ordered[:-1]
+
+        offset = len(frame) - len(df)
+        for col in missing:
+            accumulated = frame[col].to_numpy()[order]
+            current = accumulated.copy()
+            current[1:] -= np.where(same, accumulated[:-1], 0)
+            values = np.empty_like(current)
+            values[order] = current
+            df[f"{col}_current"] = values[offset:]
+
+        logger.info(f"Derived current metrics from accumulated ones: {', '.join(missing)}")
+        return df
+
+    def _sort_by_period(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Keep rows physically ordered by periodo (stable; no-op if already sorted).
+
+        Period ranges then map to contiguous row slices found by binary
+        search instead of a full-column mask.
+        """
+        if df["periodo"].is_monotonic_increasing:
+            return df
+        order = np.argsort(df["periodo"].to_numpy(), kind="stable")
+        return df.take(order).reset_index(drop=True)
+
+    def _encode_dimensions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Dictionary-encode dimensions with categories in sorted order.
+
+        Sorted categories keep groupby output in the alphabetical order of
+        plain strings.
+        """
+        for col in config.DIMENSION_COLUMNS:
+            if col in df.columns:
+                values = df[col].astype("category")
+                categories = values.cat.categories
+                if not categories.is_monotonic_increasing:
+                    values = values.cat.set_categories(categories.sort_values())
+                df[col] = values
 
         return df
 
     def get_filter_options(self) -> dict:
-        """Get unique values for all filter dropdowns."""
-        df = self.load_subramos()
+        """Get unique values for all filter dropdowns (cached per dataset version)."""
+        if self.uses_duckdb:
+            duckdb = self.get_duckdb()
+            return duckdb.cached("filter_options", duckdb.filter_options)
+
+        if self.partitioned:
+            return self.get_partitions().cached("filter_options", self._get_partitioned_filter_options)
+
+        return self.get_snapshot().cached("filter_options", self._filter_options_from)
 
+    def _filter_options_from(self, df: pd.DataFrame) -> dict:
+        """Unique values for all filter dropdowns from a prepared frame."""
         return {
             "years": sorted(df["year"].unique(), reverse=True),
-            "trimestres": sorted(df["trimestre"].unique()),  # 01, 02, 03, 04
+            "trimestres": [f"{t:02d}" for t in sorted(df["trimestre"].unique())],  # 01, 02, 03, 04
             "ramos": sorted(df["ramo_nombre_corto"].dropna().unique()),
             "subramos": sorted(df["subramo_nombre_corto"].dropna().unique()),
             "companies": sorted(df["nombre_corto"].dropna().unique()),
         }
 
+    def get_periods(self) -> List[Tuple[int, int]]:
+        """Available (year, trimestre) periods in ascending order."""
+        if self.uses_duckdb:
+            return self.get_duckdb().periods()
+
+        if self.partitioned:
+            return self.get_partitions().periods()
+
+        periodos = np.unique(self.load_subramos()["periodo"].to_numpy())
+        return [(int(p // 100), int(p % 100)) for p in periodos]
+
+    def _get_partitioned_filter_options(self) -> dict:
+        """Filter options for the partitioned layout, without loading metric data.
+
+        Periods come from the partition paths; dimension values from a
+        projected scan of just those columns.
+        """
+        partitions = self.get_partitions()
+        periods = partitions.periods()
+        dims = partitions.read_columns(config.DIMENSION_COLUMNS)
+        if "nombre_corto" in dims.columns:
+            dims["nombre_corto"] = dims["nombre_corto"].fillna("Sin nombre")
+
+        def values(col):
+            return sorted(dims[col].dropna().unique()) if col in dims.columns else []
+
+        return {
+            "years": sorted({year for year, _ in periods}, reverse=True),
+            "trimestres": [f"{t:02d}" for t in sorted({t for _, t in periods})],
+            "ramos": values("ramo_nombre_corto"),
+            "subramos": values("subramo_nombre_corto"),
+            "companies": values("nombre_corto"),
+        }
+
     def get_subramos_for_ramos(self, ramos: list) -> list:
         """Get subramos filtered by selected ramos (for cascading filter)."""
         df = self.load_subramos()
@@ -164,12 +827,15 @@ class DataLoader:
 
 # Singleton instance
 _data_loader = None
+_data_loader_lock = threading.Lock()
 
 def get_data_loader() -> DataLoader:
     """Get or create singleton DataLoader instance."""
     global _data_loader
     if _data_loader is None:
-        _data_loader = DataLoader()
+        with _data_loader_lock:
+            if _data_loader is None:
+                _data_loader = DataLoader()
     return _data_loader
 
 
@@ -177,17 +843,38 @@ def preload_data() -> None:
     """Preload all data into memory at startup for faster first requests."""
     logger.info("Starting data preload...")
     loader = get_data_loader()
+    loader.status.begin("resolving source")
+
+    def load_main() -> int:
+        # Main dataset (latest period only when partitioned; nothing resident with DuckDB)
+        if loader.uses_duckdb:
+            return loader.get_duckdb().row_count()
+        if loader.partitioned:
+            periods = loader.get_periods()
+            year, trimestre = periods[-1] if periods else (None, None)
+            return len(loader.get_snapshot_for(year, trimestre).df)
+        return len(loader.load_subramos())
 
     try:
-        # Load main dataset
-        df = loader.load_subramos()
-        logger.info(f"Preloaded subramos: {len(df)} rows")
-
-        # Optionally load otros conceptos
-        # otros_df = loader.load_otros_conceptos()
-        # logger.info(f"Preloaded otros_conceptos: {len(otros_df)} rows")
-
+        # Fetch both datasets concurrently
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            subramos = pool.submit(load_main)
+            otros = pool.submit(loader.load_otros_conceptos) if config.PRELOAD_OTROS_CONCEPTOS else None
+
+            rows = subramos.result()
+            logger.info(f"Preloaded subramos: {rows} rows")
+
+            if otros is not None:
+                try:
+                    otros_df = otros.result()
+                    logger.info(f"Preloaded otros_conceptos: {len(otros_df)} rows")
+                except FileNotFoundError as e:
+                    # Optional dataset - the API does not serve it yet
+                    logger.warning(f"Skipping otros_conceptos preload: {e}")
+
+        loader.status.finish()
         logger.info("Data preload completed successfully")
     except Exception as e:
+        loader.status.finish(e)
         logger.error(f"Error during data preload: {e}")
         raise
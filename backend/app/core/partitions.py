@@ -0,0 +1,258 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from app.core import config
+from app.core.dataset import DatasetSnapshot, concat_rows
+
+logger = logging.getLogger(__name__)
+
+Partition = Tuple[int, int]  # (year, trimestre)
+
+
+class PartitionedSubramos:
+    """Hive-partitioned subramos dataset (``year=YYYY/trimestre=TT/``).
+
+    Partitions are read lazily, only when a request asks for their period.
+    Each is prepared once into its own frame and kept in an LRU bounded by
+    ``PARTITION_CACHE_SIZE`` partitions, so memory follows the active
+    periods rather than the whole archive. A selection (a year, quarter or
+    period range) is stacked from its resident partitions, scanning only
+    the missing ones. Snapshots of the selections, with their warm caches,
+    are kept only while all their partitions are resident, and together
+    hold at most as many partitions as the LRU.
+    """
+
+    def __init__(
+        self,
+        location: str,
+        prepare: Callable[[pd.DataFrame], pd.DataFrame],
+        columns: Optional[List[str]] = None,
+        filesystem=None,
+        max_resident: Optional[int] = None,
+    ):
+        self.location = location
+        self.filesystem = filesystem
+        self.max_resident = max_resident if max_resident is not None else config.PARTITION_CACHE_SIZE
+        self._prepare = prepare
+        self._columns = columns
+        self._resident: "OrderedDict[Partition, pd.DataFrame]" = OrderedDict()
+        self._selections: "OrderedDict[Tuple[Partition, ...], DatasetSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dataset: Optional[ds.Dataset] = None
+        self._stamp: Optional[str] = None
+        self._derived: Dict[str, Any] = {}
+
+    def stamp(self) -> str:
+        """Fingerprint of the partition files (paths + sizes + mtimes/ETags)."""
+        if self.filesystem is not None:
+            files = self.filesystem.find(self.location, detail=True)
+            entries = sorted(
+                f"{path}:{info.get('ETag') or info.get('size')}"
+                for path, info in files.items()
+            )
+        else:
+            entries = []
+            for root, _, names in os.walk(self.location):
+                for name in names:
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append(f"{os.path.join(root, name)}:{stat.st_size}-{stat.st_mtime_ns}")
+            entries.sort()
+        return hashlib.sha1("\n".join(entries).encode()).hexdigest()[:16]
+
+    @property
+    def version(self) -> Optional[str]:
+        """Fingerprint of the partition listing being served, once opened."""
+        return self._stamp
+
+    @property
+    def resident(self) -> List[Partition]:
+        """Partitions held in memory, least recently used first."""
+        return list(self._resident)
+
+    @property
+    def rows(self) -> int:
+        """Rows held in the resident partitions."""
+        return sum(len(df) for df in self._resident.values())
+
+    @property
+    def selections(self) -> Dict[Tuple[Partition, ...], DatasetSnapshot]:
+        """Snapshots of the selections kept warm, least recently used first."""
+        return dict(self._selections)
+
+    def refresh(self, stamp: Optional[str] = None) -> bool:
+        """Drop resident partitions if the files changed. Returns whether they did."""
+        stamp = stamp or self.stamp()
+        with self._lock:
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            self._dataset = None
+            self._resident.clear()
+            self._selections.clear()
+            self._derived.clear()
+        return True
+
+    def cached(self, name: str, build: Callable[[], Any]) -> Any:
+        """Cache a value derived from the whole dataset until the files change."""
+        if name not in self._derived:
+            self._derived[name] = build()
+        return self._derived[name]
+
+    def dataset(self) -> ds.Dataset:
+        """Open (or reuse) the pyarrow dataset over the partition files."""
+        if self._dataset is None:
+            if self._stamp is None:
+                self._stamp = self.stamp()
+            self._dataset = ds.dataset(
+                self.location,
+                filesystem=self.filesystem,
+                format="parquet",
+                partitioning="hive",
+            )
+        return self._dataset
+
+    def periods(self) -> List[Partition]:
+        """(year, trimestre) of every partition, discovered from the paths only."""
+        dataset = self.dataset()
+
+        def discover() -> List[Partition]:
+            found = set()
+            for fragment in dataset.get_fragments():
+                keys = ds.get_partition_keys(fragment.partition_expression)
+                if "year" in keys and "trimestre" in keys:
+                    found.add((int(keys["year"]), int(keys["trimestre"])))
+            return sorted(found)
+
+        return self.cached("periods", discover)
+
+    def get(
+        self,
+        year: Optional[int] = None,
+        trimestre: Optional[int] = None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> DatasetSnapshot:
+        """Snapshot for the requested period and range, loading its missing partitions."""
+        partitions = tuple(
+            (y, t) for y, t in self.periods()
+            if (year is None or y == year)
+            and (trimestre is None or t == trimestre)
+            and (from_period is None or y * 100 + t >= from_period)
+            and (to_period is None or y * 100 + t <= to_period)
+        )
+        with self._lock:
+            snapshot = self._selections.get(partitions)
+            if snapshot is not None:
+                self._selections.move_to_end(partitions)
+                for partition in partitions:
+                    self._resident.move_to_end(partition)
+                return snapshot
+
+            df = concat_rows(self._frames(partitions)) if partitions else self._scan(())
+            version = hashlib.sha1(f"{self._stamp}|{partitions}".encode()).hexdigest()[:16]
+            snapshot = DatasetSnapshot(df=df, version=version, source_stamp=self._stamp or "")
+            snapshot.warm()
+
+            if all(partition in self._resident for partition in partitions):
+                self._selections[partitions] = snapshot
+                # Selections hold copies of their partitions: bound them like the partitions
+                while sum(len(key) for key in self._selections) > max(self.max_resident, 1):
+                    self._selections.popitem(last=False)
+            return snapshot
+
+    def read_columns(self, columns: List[str]) -> pd.DataFrame:
+        """Read a few columns across all partitions (e.g. for filter options)."""
+        dataset = self.dataset()
+        columns = [c for c in columns if c in dataset.schema.names]
+        return dataset.to_table(columns=columns).to_pandas()
+
+    def _frames(self, partitions: Tuple[Partition, ...]) -> List[pd.DataFrame]:
+        """Prepared frames of the partitions, in order, scanning the missing ones. Call under the lock."""
+        missing = [partition for partition in partitions if partition not in self._resident]
+        loaded = self._load(missing) if missing else {}
+
+        frames = []
+        for partition in partitions:
+            if partition in loaded:
+                self._resident[partition] = loaded[partition]
+            self._resident.move_to_end(partition)
+            frames.append(self._resident[partition])
+
+        while len(self._resident) > max(self.max_resident, 1):
+            evicted, _ = self._resident.popitem(last=False)
+            # A selection is kept only while all its partitions are resident
+            for key in [key for key in self._selections if evicted in key]:
+                del self._selections[key]
+            logger.info(f"Evicted partition year={evicted[0]} trimestre={evicted[1]:02d}")
+        return frames
+
+    def _load(self, partitions: List[Partition]) -> Dict[Partition, pd.DataFrame]:
+        """Scan the partitions in one pass and prepare each into its own frame."""
+        names = self.dataset().schema.names
+        scanned = set(partitions)
+
+        # Current metrics derived at prepare time need the fiscal year's earlier periods
+        if any(col in names and f"{col}_current" not in names for col in config.METRIC_COLUMNS):
+            starts = {partition: fiscal_year_start(partition[0] * 100 + partition[1]) for partition in partitions}
+            scanned.update(
+                (y, t) for y, t in self.periods()
+                for (year, trimestre), start in starts.items()
+                if start <= y * 100 + t < year * 100 + trimestre
+            )
+
+        df = self._scan(tuple(sorted(scanned)))
+        periodo = df["periodo"].to_numpy()
+        frames = {}
+        for year, trimestre in partitions:
+            first, last = np.searchsorted(periodo, year * 100 + trimestre, side="left"), np.searchsorted(
+                periodo, year * 100 + trimestre, side="right"
+            )
+            frames[(year, trimestre)] = without_unused_categories(df.iloc[first:last].reset_index(drop=True))
+        logger.info(f"Loaded {len(partitions)} partitions ({len(scanned)} scanned): {len(df)} rows")
+        return frames
+
+    def _scan(self, partitions: Tuple[Partition, ...]) -> pd.DataFrame:
+        """Read and prepare exactly the given partitions as one periodo-sorted frame."""
+        dataset = self.dataset()
+        names = dataset.schema.names
+        columns = [c for c in (self._columns or names) if c in names]
+        if "periodo" not in columns:
+            columns += [c for c in ("year", "trimestre") if c in names and c not in columns]
+
+        table = dataset.to_table(columns=columns, filter=partitions_expression(partitions))
+        return self._prepare(table.to_pandas(split_blocks=True, self_destruct=True))
+
+
+def partitions_expression(partitions: Tuple[Partition, ...]) -> ds.Expression:
+    """Partition filter selecting exactly the given (year, trimestre) partitions."""
+    by_year: Dict[int, List[int]] = {}
+    for year, trimestre in partitions:
+        by_year.setdefault(year, []).append(trimestre)
+
+    expression = ds.scalar(False)
+    for year, trimestres in sorted(by_year.items()):
+        expression = expression | ((ds.field("year") == year) & ds.field("trimestre").isin(trimestres))
+    return expression
+
+
+def fiscal_year_start(periodo: int) -> int:
+    """First period of the fiscal year a period belongs to."""
+    year, trimestre = divmod(int(periodo), 100)
+    start = config.FISCAL_YEAR_START_TRIMESTRE
+    return (year if trimestre >= start else year - 1) * 100 + start
+
+
+def without_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame with the categories no row uses dropped from its dimensions."""
+    for col in config.DIMENSION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
@@ -1,6 +1,10 @@
+import numpy as np
 import pandas as pd
 from typing import List, Optional, Union, Literal
 
+from app.logic.grouping import count_distinct, group_sum
+from app.logic.indexes import InvertedIndex, clip_positions
+
 ViewMode = Literal["accumulated", "current"]
 
 
@@ -14,29 +18,64 @@ def get_metric_columns(view_mode: ViewMode = "accumulated") -> List[str]:
     return base_cols
 
 
+def dimension_mask(series: pd.Series, values: List[str]) -> np.ndarray:
+    """Boolean mask of rows whose dimension value is in values.
+
+    Categorical columns are matched on their integer codes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.categories.get_indexer(values)
+        return np.isin(series.cat.codes.to_numpy(), codes[codes >= 0])
+    return series.isin(values).to_numpy()
+
+
 def filter_data(
     df: pd.DataFrame,
     year: Optional[int] = None,
-    trimestre: Optional[str] = None,  # 01, 02, 03, 04
+    trimestre: Optional[Union[str, int]] = None,  # 01, 02, 03, 04
     ramo: Optional[str] = None,  # Single value now
     companies: Optional[List[str]] = None,
+    from_period: Optional[int] = None,  # YYYYTT, inclusive
+    to_period: Optional[int] = None,  # YYYYTT, inclusive
+    index: Optional[InvertedIndex] = None,
 ) -> pd.DataFrame:
-    """Apply filters to the dataframe."""
-    filtered = df.copy()
+    """Apply filters to the dataframe.
+
+    With an InvertedIndex the matching row positions are intersected from
+    the index and gathered with a single take, so the cost follows the size
+    of the result. A period range alone is a slice of the periodo-sorted
+    frame, taken without a mask or a copy. Without an index, all conditions
+    are combined into a single mask so only one filtered frame is
+    materialized.
+    """
+    if index is not None:
+        positions = index.positions(year=year, trimestre=trimestre, ramo=ramo, companies=companies)
+        rows = index.period_range(from_period, to_period)
+        if positions is None:
+            return df if rows == slice(0, len(df)) else df.iloc[rows]
+        return df.take(clip_positions(positions, rows))
+
+    mask = np.ones(len(df), dtype=bool)
 
     if year is not None:
-        filtered = filtered[filtered["year"] == year]
+        mask &= df["year"].to_numpy() == int(year)
 
     if trimestre is not None:
-        filtered = filtered[filtered["trimestre"] == trimestre]
+        mask &= df["trimestre"].to_numpy() == int(trimestre)
 
     if ramo:
-        filtered = filtered[filtered["ramo_nombre_corto"] == ramo]
+        mask &= dimension_mask(df["ramo_nombre_corto"], [ramo])
 
     if companies and len(companies) > 0:
-        filtered = filtered[filtered["nombre_corto"].isin(companies)]
+        mask &= dimension_mask(df["nombre_corto"], companies)
 
-    return filtered
+    if from_period is not None:
+        mask &= df["periodo"].to_numpy() >= from_period
+
+    if to_period is not None:
+        mask &= df["periodo"].to_numpy() <= to_period
+
+    return df[mask]
 
 
 def aggregate_by(
@@ -45,7 +84,11 @@ def aggregate_by(
     sum_cols: Optional[List[str]] = None,
     view_mode: ViewMode = "accumulated",
 ) -> pd.DataFrame:
-    """Aggregate data by specified columns."""
+    """Aggregate data by specified columns.
+
+    Integer-coded groups are summed with np.bincount (see group_sum), with
+    pandas groupby as the fallback.
+    """
     if sum_cols is None:
         sum_cols = get_metric_columns(view_mode)
 
@@ -56,16 +99,20 @@ def aggregate_by(
     if not group_cols or not sum_cols:
         return df
 
-    aggregated = df.groupby(group_cols, as_index=False)[sum_cols].sum()
+    aggregated = group_sum(df, group_cols, sum_cols)
 
-    # Rename columns back to standard names for consistent usage downstream
+    return standardize_metric_names(aggregated, view_mode)
+
+
+def standardize_metric_names(df: pd.DataFrame, view_mode: ViewMode = "accumulated") -> pd.DataFrame:
+    """Rename _current metric columns back to standard names for consistent usage downstream."""
     if view_mode == "current":
         rename_map = {f"{col}_current": col for col in
                      ["primas_emitidas", "primas_devengadas",
                       "siniestros_devengados", "gastos_devengados"]}
-        aggregated = aggregated.rename(columns=rename_map)
+        df = df.rename(columns=rename_map)
 
-    return aggregated
+    return df
 
 
 def aggregate_by_company(df: pd.DataFrame, view_mode: ViewMode = "accumulated") -> pd.DataFrame:
@@ -102,8 +149,22 @@ def get_totals(df: pd.DataFrame, view_mode: ViewMode = "accumulated") -> dict:
         "primas_devengadas": df[f"primas_devengadas{suffix}"].sum() if f"primas_devengadas{suffix}" in df.columns else 0,
         "siniestros_devengados": df[f"siniestros_devengados{suffix}"].sum() if f"siniestros_devengados{suffix}" in df.columns else 0,
         "gastos_devengados": df[f"gastos_devengados{suffix}"].sum() if f"gastos_devengados{suffix}" in df.columns else 0,
-        "entities_count": df["cod_cia"].nunique() if "cod_cia" in df.columns else 0,
+        "entities_count": count_distinct(df["cod_cia"]) if "cod_cia" in df.columns else 0,
+    }
+
+
+def get_aggregate_totals(df: pd.DataFrame) -> dict:
+    """Calculate total market metrics from data already aggregated by company.
+
+    Metric columns carry their standard names, as returned by aggregate_by.
+    """
+    totals = {
+        col: df[col].sum() if col in df.columns else 0
+        for col in ["primas_emitidas", "primas_devengadas",
+                    "siniestros_devengados", "gastos_devengados"]
     }
+    totals["entities_count"] = count_distinct(df["cod_cia"]) if "cod_cia" in df.columns else 0
+    return totals
 
 
 def format_currency(value: float, in_millions: bool = True) -> str:
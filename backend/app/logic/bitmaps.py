@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+WORD_BITS = 64
+
+
+def popcount(words: np.ndarray) -> int:
+    """Number of set bits in an array of uint64 words."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def pack_bits(present: np.ndarray) -> np.ndarray:
+    """Pack a boolean array (last axis a multiple of 64 long) into uint64 words."""
+    return np.packbits(present, axis=-1, bitorder="little").view("<u8")
+
+
+class CompanyBitmaps:
+    """Packed bitmap of the companies present in every (periodo, ramo) cell.
+
+    Each bit stands for a (cod_cia, nombre_corto) pair and is set when the
+    cell has a row for it. The distinct companies of any filter are the OR
+    of the matching cells, AND a mask of the requested names, followed by a
+    popcount: O(cells * companies / 64) word operations, independent of the
+    number of rows. Rows without a ramo go to an extra last slot. When a
+    cod_cia appears under more than one name, the set bits are mapped back
+    to cod_cia before counting.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.periods = np.unique(df["periodo"].to_numpy())
+        self.ramos = df["ramo_nombre_corto"].cat.categories
+        self.pairs = pd.MultiIndex.from_arrays([np.empty(0, dtype=np.int64), np.empty(0, dtype=object)])
+
+        pair_ids = self._add_pairs(df)
+        self.bits = self._cell_bits(df, self.periods, pair_ids)
+
+    def _add_pairs(self, df: pd.DataFrame) -> np.ndarray:
+        """Bit of every row of df, adding its new (cod_cia, nombre_corto) pairs.
+
+        Pairs are factorized on integer codes; new ones take the next free
+        bits, so existing bits keep their meaning.
+        """
+        names = df["nombre_corto"]
+        radix = len(names.cat.categories) + 1
+        keys = df["cod_cia"].to_numpy().astype(np.int64) * radix + (names.cat.codes.to_numpy() + 1)
+        uniques, inverse = np.unique(keys, return_inverse=True)
+
+        cias, name_codes = np.divmod(uniques, radix)
+        labels = np.append(names.cat.categories.to_numpy(dtype=object), None)[name_codes - 1]
+        found = pd.MultiIndex.from_arrays([cias, labels])
+
+        position = self.pairs.get_indexer(found)
+        new = position < 0
+        position[new] = len(self.pairs) + np.arange(int(new.sum()))
+        self.pairs = self.pairs.append(found[new])
+        self.cias = self.pairs.get_level_values(0).to_numpy()
+        self.unique_cias = len(np.unique(self.cias)) == len(self.cias)
+        return position[inverse]
+
+    def _cell_bits(self, df: pd.DataFrame, periods: np.ndarray, pair_ids: np.ndarray) -> np.ndarray:
+        """Packed bits (periods x ramo slots x words) of the rows of df."""
+        num_slots = len(self.ramos) + 1
+        ramo = pd.Categorical(df["ramo_nombre_corto"], categories=self.ramos).codes.astype(np.int64)
+        ramo[ramo < 0] = num_slots - 1
+        cells = np.searchsorted(periods, df["periodo"].to_numpy()) * num_slots + ramo
+
+        width = self.num_words * WORD_BITS
+        present = np.zeros((len(periods) * num_slots, width), dtype=bool)
+        present[cells, pair_ids] = True
+        # Explicit word count: an empty frame has zero periods and nothing to infer it from
+        return pack_bits(present).reshape(len(periods), num_slots, self.num_words)
+
+    @property
+    def num_words(self) -> int:
+        """Words per bitmap."""
+        return max(1, -(-len(self.pairs) // WORD_BITS))
+
+    def appended(self, df: pd.DataFrame, start: int) -> "CompanyBitmaps":
+        """Bitmaps with the cells of the later periods in df[start:] added.
+
+        Only the new periods' rows are scanned; earlier cells are copied into
+        the (possibly wider) new layout.
+        """
+        rows = df.iloc[start:]
+        old_ramos, old_bits = self.ramos, self.bits
+
+        bitmaps = CompanyBitmaps.__new__(CompanyBitmaps)
+        bitmaps.pairs = self.pairs
+        bitmaps.ramos = df["ramo_nombre_corto"].cat.categories
+        pair_ids = bitmaps._add_pairs(rows)
+
+        periods = np.unique(rows["periodo"].to_numpy())
+        bitmaps.periods = np.concatenate([self.periods, periods])
+        new_bits = bitmaps._cell_bits(rows, periods, pair_ids)
+
+        # Earlier cells move to their ramo's new slot; rows without a ramo stay last
+        slots = np.append(bitmaps.ramos.get_indexer(old_ramos), len(bitmaps.ramos))
+        moved = np.zeros((len(self.periods), len(bitmaps.ramos) + 1, bitmaps.num_words), dtype=np.uint64)
+        moved[:, slots, :old_bits.shape[2]] = old_bits
+        bitmaps.bits = np.concatenate([moved, new_bits])
+        return bitmaps
+
+    def count(
+        self,
+        year: Optional[int] = None,
+        trimestre=None,
+        ramo: Optional[str] = None,
+        companies: Optional[List[str]] = None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> int:
+        """Distinct cod_cia with rows matching the filters, like ``nunique``."""
+        keep = np.ones(len(self.periods), dtype=bool)
+        if year is not None:
+            keep &= self.periods // 100 == int(year)
+        if trimestre is not None:
+            keep &= self.periods % 100 == int(trimestre)
+        if from_period is not None:
+            keep &= self.periods >= int(from_period)
+        if to_period is not None:
+            keep &= self.periods <= int(to_period)
+
+        cells = self.bits[keep]
+        if ramo:
+            slot = self.ramos.get_indexer([ramo])[0]
+            if slot < 0:
+                return 0
+            cells = cells[:, slot]
+        words = np.bitwise_or.reduce(cells.reshape(-1, self.bits.shape[2]), axis=0)
+        if companies:
+            words &= self._name_mask(companies)
+
+        if self.unique_cias:
+            return popcount(words)
+        # A cod_cia with several names has several bits: count each cod_cia once
+        present = np.unpackbits(words.view(np.uint8), bitorder="little")[:len(self.cias)].astype(bool)
+        return len(np.unique(self.cias[present]))
+
+    def _name_mask(self, companies: List[str]) -> np.ndarray:
+        """Words with the bits of every pair named in companies set."""
+        selected = np.zeros(self.bits.shape[2] * WORD_BITS, dtype=bool)
+        selected[:len(self.pairs)] = self.pairs.get_level_values(1).isin(companies)
+        return pack_bits(selected)
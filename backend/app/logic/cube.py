@@ -0,0 +1,308 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core import config
+from app.core.dataset import append_rows
+from app.logic.aggregations import (
+    ViewMode,
+    filter_data,
+    get_metric_columns,
+    get_totals,
+    standardize_metric_names,
+)
+from app.logic.bitmaps import CompanyBitmaps
+from app.logic.grouping import group_sum
+from app.logic.indexes import InvertedIndex, PeriodIndex
+from app.logic.rankings import CellRankings
+from app.logic.ratios import RATIO_COLUMNS, add_ratios
+
+COMPANY = ["cod_cia", "nombre_corto"]
+RAMO = ["ramo_nombre_corto"]
+SUBRAMO = ["ramo_nombre_corto", "subramo_nombre_corto"]  # Subramos nest under a ramo
+CUBE_METRICS = [
+    *config.METRIC_COLUMNS,
+    *[f"{col}_current" for col in config.METRIC_COLUMNS],
+]
+RANKING_COLUMNS = [
+    f"{col}{suffix}" for suffix in ("", "_current") for col in [*config.METRIC_COLUMNS, *RATIO_COLUMNS]
+]
+
+
+class Rollup:
+    """Metrics summed to one grain per period, with its own filter index.
+
+    Rows with a missing dimension are summed into groups of their own, so
+    every rollup keeps all rows of the frame.
+    """
+
+    def __init__(self, df: pd.DataFrame, dims: List[str]):
+        self.dims = [c for c in dims if c in df.columns]
+        metrics = [c for c in df.columns if c in CUBE_METRICS]
+
+        self.df = self._summarize(df, self.dims, metrics)
+        self.index = InvertedIndex(self.df)
+
+    @classmethod
+    def from_summary(cls, summary: pd.DataFrame, dims: List[str]) -> "Rollup":
+        """Rollup over an already summarized frame (e.g. memory-mapped from the cache)."""
+        rollup = cls.__new__(cls)
+        rollup.dims = [c for c in dims if c in summary.columns]
+        rollup.df = summary
+        rollup.index = InvertedIndex(summary)
+        return rollup
+
+    @staticmethod
+    def _summarize(df: pd.DataFrame, dims: List[str], metrics: List[str]) -> pd.DataFrame:
+        """Metrics of df summed per period and dims, with the ratios of every cell, ordered by period."""
+        # Sorted by periodo first, so the frame keeps the serving layout
+        summary = group_sum(df, ["periodo", *dims], metrics, dropna=False)
+        periodo = summary["periodo"].to_numpy()
+        summary["year"] = (periodo // 100).astype(df["year"].dtype)
+        summary["trimestre"] = (periodo % 100).astype(df["trimestre"].dtype)
+        add_ratios(summary)
+        add_ratios(summary, suffix="_current")
+        return summary
+
+    def appended(self, rows: pd.DataFrame) -> "Rollup":
+        """Rollup with rows of later periods than any already summed added."""
+        metrics = [c for c in self.df.columns if c in CUBE_METRICS]
+        start = len(self.df)
+
+        rollup = copy.copy(self)
+        rollup.df = append_rows(self.df, self._summarize(rows, self.dims, metrics))
+        rollup.index = self.index.appended(rollup.df, start)
+        return rollup
+
+    def select(self, **filters) -> pd.DataFrame:
+        """Rows of this rollup matching the request filters."""
+        return filter_data(self.df, index=self.index, **filters)
+
+
+class RollupCube:
+    """Rollups of the subramos frame materialized when a snapshot is built.
+
+    Each grain sums both metric families per (year, trimestre) and is
+    ordered by period like the serving frame, and every cell carries its
+    loss, expense and combined ratios. A request is answered from
+    the smallest grain that holds its grouping and filter columns; within
+    a single period that is already the final answer, across periods the
+    few matching rows are summed again. Grains finer than every rollup
+    (companies by subramo) are summed from the serving frame itself, shared
+    with the snapshot rather than copied into a rollup of nearly its size:
+    the periods requested are a slice of it, and only that slice is
+    scanned for the other filters. The companies of every period,
+    and of every ramo within a period, are also ranked ahead by each metric
+    and ratio.
+
+    The rollup frames and ranking orders can be written out as ``tables``
+    and the cube rebuilt over them with ``from_tables``, so workers can
+    share them through memory-mapped cache files; only the small indexes
+    over them are built per process.
+    """
+
+    # Smallest first, so the first grain that covers a request is the cheapest
+    GRAINS = {
+        "ramo": RAMO,
+        "subramo": SUBRAMO,
+        "company": COMPANY,
+        "company_ramo": [*COMPANY, *RAMO],
+    }
+    # Ranking cells -> (cell columns besides periodo, rollup their companies are summed from)
+    CELLS = {
+        "period": ([], "company"),
+        "period_ramo": (RAMO, "company_ramo"),
+    }
+    TABLES = [*GRAINS, *(f"{cell}_{part}" for cell in CELLS for part in ("cells", "orders"))]
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.periods = PeriodIndex(df["periodo"])
+        self.rollups: Dict[str, Rollup] = {
+            name: Rollup(df, dims) for name, dims in self.GRAINS.items()
+        }
+        self.companies = CompanyBitmaps(df)
+        self.rankings = self._company_rankings()
+        self._derived: Dict[str, Any] = {}
+
+    def tables(self) -> Dict[str, pd.DataFrame]:
+        """The rollup frames and the ranking cells and orders, by name in ``TABLES``."""
+        tables = {name: rollup.df for name, rollup in self.rollups.items()}
+        for name, (cell_cols, _) in self.CELLS.items():
+            tables[f"{name}_cells"], tables[f"{name}_orders"] = self.rankings[name].to_frames(["periodo", *cell_cols])
+        return tables
+
+    @classmethod
+    def from_tables(cls, df: pd.DataFrame, tables: Dict[str, pd.DataFrame]) -> "RollupCube":
+        """Cube of df over the ``tables`` of a cube built from it, without summing or ranking again."""
+        cube = cls.__new__(cls)
+        cube.df = df
+        cube.periods = PeriodIndex(df["periodo"])
+        cube.rollups = {name: Rollup.from_summary(tables[name], dims) for name, dims in cls.GRAINS.items()}
+        cube.companies = CompanyBitmaps(df)
+        cube.rankings = {
+            name: CellRankings.from_frames(tables[f"{name}_cells"], tables[f"{name}_orders"]) for name in cls.CELLS
+        }
+        cube._derived = {}
+        return cube
+
+    def cached(self, name: str, build: Callable[[], Any]) -> Any:
+        """Cache a value derived from the cube; it lives as long as this snapshot."""
+        if name not in self._derived:
+            self._derived[name] = build()
+        return self._derived[name]
+
+    def appended(self, df: pd.DataFrame, start: int) -> "RollupCube":
+        """Cube of df, the summarized frame with rows from ``start`` on appended.
+
+        Only the appended rows are summarized; earlier periods are reused.
+        """
+        rows = df.iloc[start:]
+        cube = copy.copy(self)
+        cube.df = df
+        cube.periods = PeriodIndex(df["periodo"])
+        cube.rollups = {name: rollup.appended(rows) for name, rollup in self.rollups.items()}
+        cube.companies = self.companies.appended(df, start)
+        # New periods are new cells: rank only their rows
+        starts = {name: len(rollup.df) for name, rollup in self.rollups.items()}
+        cube.rankings = {
+            name: rankings.appended(later)
+            for (name, rankings), later in zip(self.rankings.items(), cube._company_rankings(starts).values())
+        }
+        cube._derived = {}
+        return cube
+
+    def _company_rankings(self, starts: Optional[Dict[str, int]] = None) -> Dict[str, CellRankings]:
+        """Company totals of every period, and of every ramo in every period, ranked by every column.
+
+        Totals are those the ranking aggregates by company: every row of the
+        cell counts, with or without a ramo or subramo to draw a bar for.
+        ``starts`` maps rollups to their first row to rank (default: all rows).
+        """
+        rankings = {}
+        for name, (cell_cols, source) in self.CELLS.items():
+            rows = self.rollups[source].df.iloc[(starts or {}).get(source, 0):]
+            if cell_cols:
+                # Regrouped by cell, then by company as in any aggregate by company
+                rows = rows[rows[cell_cols].notna().all(axis=1)]
+                metrics = [c for c in rows.columns if c in CUBE_METRICS]
+                rows = group_sum(rows, ["periodo", *cell_cols, *COMPANY], metrics)
+                add_ratios(rows)
+                add_ratios(rows, suffix="_current")
+            rankings[name] = CellRankings(rows, ["periodo", *cell_cols], RANKING_COLUMNS)
+        return rankings
+
+    def top_companies(
+        self,
+        column: str,
+        n: Optional[int] = None,
+        view_mode: ViewMode = "accumulated",
+        year: Optional[int] = None,
+        trimestre=None,
+        ramo: Optional[str] = None,
+        companies: Optional[List[str]] = None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> Optional[np.ndarray]:
+        """Rows of the filtered aggregate by company of the top n companies by column, from the rankings.
+
+        Only filters selecting one whole period (or one ramo in one period)
+        are ranked ahead; anything else gives None.
+        """
+        if year is None or trimestre is None or companies or from_period is not None or to_period is not None:
+            return None
+        periodo = int(year) * 100 + int(trimestre)
+        suffix = "_current" if view_mode == "current" else ""
+        if ramo:
+            return self.rankings["period_ramo"].top((periodo, ramo), f"{column}{suffix}", n)
+        return self.rankings["period"].top((periodo,), f"{column}{suffix}", n)
+
+    def rollup_for(
+        self,
+        columns: List[str],
+        ramo: Optional[str] = None,
+        companies: Optional[List[str]] = None,
+    ) -> Optional[Rollup]:
+        """Smallest rollup holding the columns plus those the filters need, or None if only the frame does.
+
+        Every rollup is per period, so period columns are always covered.
+        """
+        needed = set(columns) - {"periodo", "year", "trimestre"}
+        if ramo:
+            needed.update(RAMO)
+        if companies:
+            needed.add("nombre_corto")
+
+        for rollup in self.rollups.values():
+            if needed <= set(rollup.dims):
+                return rollup
+        return None
+
+    def select(
+        self,
+        year: Optional[int] = None,
+        trimestre=None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+        **filters,
+    ) -> pd.DataFrame:
+        """Rows of the serving frame matching the request filters.
+
+        The year and period range bound a slice of the periodo-sorted frame;
+        only that slice is masked for the remaining filters.
+        """
+        low, high = from_period, to_period
+        if year is not None:
+            first = int(year) * 100 + (int(trimestre) if trimestre is not None else 1)
+            last = int(year) * 100 + (int(trimestre) if trimestre is not None else 4)
+            low = first if low is None else max(low, first)
+            high = last if high is None else min(high, last)
+
+        rows = self.df.iloc[self.periods.range(low, high)]
+        return filter_data(
+            rows, year=year, trimestre=trimestre, from_period=from_period, to_period=to_period, **filters
+        )
+
+    def aggregate(
+        self, group_cols: List[str], view_mode: ViewMode = "accumulated", dropna: bool = True, **filters
+    ) -> pd.DataFrame:
+        """Same result as aggregate_by over the filtered frame, read from the cube.
+
+        The loss, expense and combined ratios of every group are added: read
+        from the rollup for an exact cell, otherwise from the summed metrics.
+        Groups with a missing key are left out, as groupby does, unless
+        ``dropna`` is False.
+        """
+        rollup = self.rollup_for(group_cols, filters.get("ramo"), filters.get("companies"))
+        rows = rollup.select(**filters) if rollup is not None else self.select(**filters)
+        sum_cols = [c for c in get_metric_columns(view_mode) if c in rows.columns]
+
+        periodo = rows["periodo"].to_numpy()
+        if rollup is not None and rollup.dims == group_cols and len(periodo) and periodo[0] == periodo[-1]:
+            # One period at exactly this grain: the rows, ratios included, are the answer
+            suffix = "_current" if view_mode == "current" else ""
+            ratio_cols = [f"{col}{suffix}" for col in RATIO_COLUMNS if f"{col}{suffix}" in rows.columns]
+            result = rows[group_cols + sum_cols + ratio_cols]
+            if dropna:
+                result = result.dropna(subset=group_cols)
+            result = result.reset_index(drop=True).rename(columns={f"{col}{suffix}": col for col in RATIO_COLUMNS})
+            return standardize_metric_names(result, view_mode)
+
+        result = standardize_metric_names(group_sum(rows, group_cols, sum_cols, dropna=dropna), view_mode)
+        return add_ratios(result)
+
+    def totals(self, view_mode: ViewMode = "accumulated", **filters) -> dict:
+        """Same result as get_totals over the filtered frame, read from the cube.
+
+        Sums come from the smallest rollup covering the filters, which keeps
+        rows without a ramo or subramo in groups of their own. The distinct
+        company count comes from the company bitmaps.
+        """
+        rollup = self.rollup_for([], filters.get("ramo"), filters.get("companies"))
+        rows = rollup.select(**filters)
+        totals = get_totals(rows[[c for c in rows.columns if c in CUBE_METRICS]], view_mode=view_mode)
+        totals["entities_count"] = self.companies.count(**filters)
+        return totals
+
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Largest key space compacted through a dense bincount table (sorted beyond it)
+MAX_BINS = 1 << 20
+# Integer keys spanning more values than this are left to pandas
+MAX_INT_RANGE = 1 << 16
+
+
+@dataclass
+class GroupIds:
+    """Dense group id of every row, numbered in sorted key order.
+
+    Ids follow the lexicographic order of the group keys, like a sorted
+    ``groupby``; ``keys`` holds the key values of every group. Rows with a
+    missing key have id -1 and belong to no group, unless missing keys are
+    kept, when they form groups of their own sorted after every value.
+    """
+
+    ids: np.ndarray
+    keys: Dict[str, Any]
+    ngroups: int
+
+
+def key_codes(series: pd.Series) -> Optional[Tuple[np.ndarray, int, Callable[[np.ndarray], Any]]]:
+    """Integer codes, key-space size and decoder of a grouping column, or None if unsupported.
+
+    Categoricals use their codes (-1 for missing); integer columns are
+    offset by their minimum when their range is small.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        dtype = series.dtype
+        return (
+            series.cat.codes.to_numpy(),
+            len(dtype.categories),
+            lambda codes: pd.Categorical.from_codes(codes, dtype=dtype),
+        )
+
+    if pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+        values = series.to_numpy()
+        if len(values) == 0:
+            return None
+        low, high = int(values.min()), int(values.max())
+        if high - low >= MAX_INT_RANGE:
+            return None
+        dtype = series.dtype
+        return values.astype(np.int64) - low, high - low + 1, lambda codes: (codes + low).astype(dtype)
+
+    return None
+
+
+def keep_missing(coded: Tuple[np.ndarray, int, Callable[[np.ndarray], Any]]) -> Tuple[np.ndarray, int, Callable[[np.ndarray], Any]]:
+    """Key codes with missing keys coded as one extra value after every other, decoded back to missing."""
+    codes, cardinality, decode = coded
+    if codes.min() >= 0:
+        return coded
+    return (
+        np.where(codes < 0, cardinality, codes),
+        cardinality + 1,
+        lambda group_codes: decode(np.where(group_codes == cardinality, -1, group_codes)),
+    )
+
+
+def group_ids(df: pd.DataFrame, group_cols: List[str], dropna: bool = True) -> Optional[GroupIds]:
+    """Integer group ids for group_cols without hashing, or None if unsupported.
+
+    Keys are combined one column at a time in mixed radix. After each step
+    the combined key space is compacted to the combinations present with an
+    order-preserving remap through ``np.bincount`` (or a sort when the key
+    space exceeds MAX_BINS), so several columns never multiply out into
+    a huge key space. The key codes of every group fall out of the same
+    compaction, with no lookup back into the rows. With ``dropna=False``
+    missing keys are grouped like ``groupby(dropna=False)``.
+    """
+    if len(df) == 0 or not group_cols:
+        return None
+
+    coded = [key_codes(df[col]) for col in group_cols]
+    if any(c is None for c in coded):
+        return None
+    if not dropna:
+        coded = [keep_missing(c) for c in coded]
+
+    combined = None
+    missing = None
+    group_codes: List[np.ndarray] = []  # Per column, the key code of every group
+
+    for codes, cardinality, _ in coded:
+        if codes.min() < 0:
+            missing = codes < 0 if missing is None else missing | (codes < 0)
+            codes = np.maximum(codes, 0)
+
+        if combined is None:
+            combined, size = codes.astype(np.int64), cardinality
+        else:
+            combined = combined * cardinality + codes
+            size = len(group_codes[0]) * cardinality
+
+        # Compact to the combinations present, keeping their order
+        observed = combined if missing is None else combined[~missing]
+        if len(observed) == 0:
+            return None  # Every row has a missing key
+        if size <= MAX_BINS:
+            present = np.bincount(observed, minlength=size) > 0
+            combos = np.flatnonzero(present)
+            combined = (np.cumsum(present) - 1)[combined]
+        else:
+            # Key space too large for a dense table: sort-based compaction instead
+            ordered = np.sort(observed)
+            combos = ordered[np.concatenate(([True], ordered[1:] != ordered[:-1]))]
+            combined = np.minimum(np.searchsorted(combos, combined), len(combos) - 1)
+
+        if missing is not None:
+            combined = np.maximum(combined, 0)  # Keep ids of rows with missing keys in range
+
+        parents, own = np.divmod(combos, cardinality)
+        group_codes = [previous[parents] for previous in group_codes] + [own]
+
+    ids = combined if missing is None else np.where(missing, -1, combined)
+    keys = {
+        col: decode(codes)
+        for col, (_, _, decode), codes in zip(group_cols, coded, group_codes)
+    }
+    return GroupIds(ids=ids, keys=keys, ngroups=len(group_codes[0]))
+
+
+def group_sum(df: pd.DataFrame, group_cols: List[str], sum_cols: List[str], dropna: bool = True) -> pd.DataFrame:
+    """Sum sum_cols by group_cols, like ``groupby(observed=True, as_index=False, dropna=dropna).sum()``.
+
+    Integer-coded keys (categoricals, small-range ints) with float metrics
+    go through ``np.bincount`` on combined group ids, one weighted pass per
+    metric. Anything else falls back to pandas.
+    """
+    groups = None
+    if all(pd.api.types.is_float_dtype(df[col].dtype) for col in sum_cols):
+        groups = group_ids(df, group_cols, dropna=dropna)
+
+    if groups is None:
+        # observed=True keeps categorical groupbys to the combinations present
+        return df.groupby(group_cols, as_index=False, observed=True, dropna=dropna)[sum_cols].sum()
+
+    ids = groups.ids
+    valid = ids >= 0
+    partial = not valid.all()
+    if partial:
+        ids = ids[valid]
+
+    result = dict(groups.keys)
+    for col in sum_cols:
+        weights = df[col].to_numpy()
+        if partial:
+            weights = weights[valid]
+        if np.isnan(weights).any():
+            weights = np.nan_to_num(weights, nan=0.0)  # groupby sums skip NaN
+        result[col] = np.bincount(ids, weights=weights, minlength=groups.ngroups)
+
+    return pd.DataFrame(result)
+
+
+def count_distinct(series: pd.Series) -> int:
+    """Number of distinct non-missing values, like ``Series.nunique``."""
+    coded = key_codes(series)
+    if coded is None:
+        return series.nunique()
+
+    codes, size, _ = coded
+    codes = codes[codes >= 0]
+    return int(np.count_nonzero(np.bincount(codes, minlength=size))) if len(codes) else 0
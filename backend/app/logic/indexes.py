@@ -0,0 +1,199 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+
+class Postings:
+    """Sorted row positions for every value of one dimension.
+
+    Rows are grouped by value with a single stable argsort, so the positions
+    of each value are a contiguous, ascending slice of ``order``.
+    """
+
+    def __init__(self, keys: pd.Index, codes: np.ndarray):
+        self.keys = keys
+        self.codes = {key: code for code, key in enumerate(keys.tolist())}
+        codes = codes.astype(np.int64, copy=False)
+        self.order = np.argsort(codes, kind="stable").astype(np.int32)
+
+        valid = codes[codes >= 0]
+        counts = np.bincount(valid, minlength=len(keys))
+        missing = len(codes) - len(valid)  # -1 codes sort first
+        self.offsets = missing + np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_column(cls, series: pd.Series) -> "Postings":
+        """Build postings from a categorical or small-int column."""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return cls(series.cat.categories, series.cat.codes.to_numpy())
+        keys, codes = np.unique(series.to_numpy(), return_inverse=True)
+        return cls(pd.Index(keys), codes)
+
+    def appended(self, series: pd.Series, start: int) -> "Postings":
+        """Postings with the rows of series (positions from ``start`` on) appended.
+
+        Appended rows come after every indexed row, so each value's slice is
+        its old positions followed by its new ones. The old entries are moved
+        to their new offsets with one shifted copy instead of a re-sort; only
+        the appended rows are sorted.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            keys = series.cat.categories  # A sorted superset of self.keys
+            codes = series.cat.codes.to_numpy().astype(np.int64)
+        else:
+            keys = self.keys.union(pd.Index(np.unique(series.to_numpy())))
+            codes = keys.get_indexer(series.to_numpy())
+
+        old_counts = np.zeros(len(keys), dtype=np.int64)
+        old_counts[keys.get_indexer(self.keys)] = np.diff(self.offsets)
+        new_order = np.argsort(codes, kind="stable")
+        new_counts = np.bincount(codes[codes >= 0], minlength=len(keys))
+        old_missing, new_missing = self.offsets[0], len(codes) - int(new_counts.sum())
+
+        offsets = old_missing + new_missing + np.concatenate([[0], np.cumsum(old_counts + new_counts)])
+        order = np.empty(offsets[-1], dtype=np.int32)
+
+        # Missing values first, in row order
+        order[:old_missing] = self.order[:old_missing]
+        order[old_missing:offsets[0]] = start + new_order[:new_missing]
+
+        # Old entries keep their relative order, shifted to each value's new offset
+        shift = np.repeat(offsets[:-1][keys.get_indexer(self.keys)] - self.offsets[:-1], np.diff(self.offsets))
+        order[np.arange(old_missing, len(self.order)) + shift] = self.order[old_missing:]
+
+        # New entries follow the old ones of the same value
+        local = np.concatenate([[0], np.cumsum(new_counts)])
+        shift = np.repeat(offsets[:-1] + old_counts - local[:-1], new_counts)
+        order[np.arange(len(shift)) + shift] = start + new_order[new_missing:]
+
+        postings = copy.copy(self)
+        postings.keys = keys
+        postings.codes = {key: code for code, key in enumerate(keys.tolist())}
+        postings.order = order
+        postings.offsets = offsets
+        return postings
+
+    def lookup(self, values: Sequence) -> np.ndarray:
+        """Sorted row positions holding any of the given values."""
+        codes = sorted({self.codes[v] for v in values if v in self.codes})
+        parts = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in codes]
+
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+
+def intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersection of two sorted, duplicate-free position arrays.
+
+    Binary-searches the smaller array into the larger one, so the cost is
+    O(small * log(large)) rather than a merge of both.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+
+    idx = np.searchsorted(b, a)
+    idx[idx == len(b)] = 0
+    return a[b[idx] == a]
+
+
+def clip_positions(positions: np.ndarray, rows: slice) -> np.ndarray:
+    """Restrict sorted row positions to a contiguous row slice."""
+    start, stop = np.searchsorted(positions, [rows.start, rows.stop])
+    return positions[start:stop]
+
+
+class PeriodIndex:
+    """Binary search over the periodo column of a periodo-sorted frame.
+
+    The loader keeps the serving frame physically sorted by ``periodo``, so
+    the rows of any period range are one contiguous slice.
+    """
+
+    def __init__(self, periodo: pd.Series):
+        self.keys = periodo.to_numpy()
+        if len(self.keys) and not (self.keys[1:] >= self.keys[:-1]).all():
+            raise ValueError("PeriodIndex requires a frame sorted by periodo")
+
+    def range(self, from_period: Optional[int] = None, to_period: Optional[int] = None) -> slice:
+        """Row slice of the periods in [from_period, to_period]; open ends are unbounded."""
+        start = 0 if from_period is None else int(np.searchsorted(self.keys, from_period, side="left"))
+        stop = len(self.keys) if to_period is None else int(np.searchsorted(self.keys, to_period, side="right"))
+        return slice(start, max(start, stop))
+
+
+class InvertedIndex:
+    """Inverted indexes for the filterable dimensions of a subramos frame.
+
+    ``periodo``, ``year``, ``trimestre``, ``ramo_nombre_corto`` and
+    ``nombre_corto`` each map to sorted row-position arrays. A filter
+    intersects the arrays of the active dimensions (smallest first) and
+    returns positions for one ``take``; a year plus a quarter is a single
+    ``periodo`` lookup. Period ranges resolve to a row slice through the
+    sorted ``periodo`` keys.
+    """
+
+    COLUMNS = ["periodo", "year", "trimestre", "ramo_nombre_corto", "nombre_corto"]
+
+    def __init__(self, df: pd.DataFrame):
+        self.num_rows = len(df)
+        self.postings: Dict[str, Postings] = {
+            col: Postings.from_column(df[col]) for col in self.COLUMNS if col in df.columns
+        }
+        self.periods = PeriodIndex(df["periodo"]) if "periodo" in df.columns else None
+
+    def appended(self, df: pd.DataFrame, start: int) -> "InvertedIndex":
+        """Index of df, the indexed frame with rows from ``start`` on appended."""
+        index = copy.copy(self)
+        index.num_rows = len(df)
+        index.postings = {
+            col: postings.appended(df[col].iloc[start:], start) for col, postings in self.postings.items()
+        }
+        index.periods = PeriodIndex(df["periodo"]) if self.periods is not None else None
+        return index
+
+    def period_range(self, from_period: Optional[int] = None, to_period: Optional[int] = None) -> slice:
+        """Row slice of a period range (all rows when unbounded)."""
+        if self.periods is None or (from_period is None and to_period is None):
+            return slice(0, self.num_rows)
+        return self.periods.range(from_period, to_period)
+
+    def positions(
+        self,
+        year: Optional[int] = None,
+        trimestre=None,
+        ramo: Optional[str] = None,
+        companies: Optional[List[str]] = None,
+    ) -> Optional[np.ndarray]:
+        """Row positions matching the filters, or None when nothing is filtered."""
+        lookups = []
+        if year is not None and trimestre is not None and "periodo" in self.postings:
+            lookups.append(("periodo", [int(year) * 100 + int(trimestre)]))
+        else:
+            if year is not None:
+                lookups.append(("year", [int(year)]))
+            if trimestre is not None:
+                lookups.append(("trimestre", [int(trimestre)]))
+        if ramo:
+            lookups.append(("ramo_nombre_corto", [ramo]))
+        if companies:
+            lookups.append(("nombre_corto", companies))
+
+        if not lookups:
+            return None
+
+        arrays = sorted(
+            (self.postings[col].lookup(values) for col, values in lookups),
+            key=len,
+        )
+        result = arrays[0]
+        for other in arrays[1:]:
+            result = intersect_sorted(result, other)
+        return result
+
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from app.logic.aggregations import ViewMode, get_metric_columns
+from app.logic.cube import RollupCube
+from app.logic.grouping import group_ids, group_sum
+from app.logic.ratios import add_ratios
+
+# Canonical column order for the finest grain (coarse to fine within a company)
+GRAIN_ORDER = ["cod_cia", "nombre_corto", "ramo_nombre_corto", "subramo_nombre_corto"]
+
+
+@dataclass
+class PlanResult:
+    """Aggregates computed by a QueryPlan.
+
+    ``row_ids[name]`` maps every row of the finest aggregate to the row of
+    ``frames[name]`` it was rolled up into, so callers can select finest
+    rows by a coarser aggregate with an integer gather instead of a join.
+    """
+
+    finest: pd.DataFrame
+    frames: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    row_ids: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.frames[name]
+
+    def positions_in(self, name: str, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Finest-grain rows belonging to the given rows of aggregate ``name``, in the order given.
+
+        Returns the finest row positions, grouped by the row they belong to
+        in the order of ``positions`` (finest order within each), and for
+        every one of them the index into ``positions`` of that row.
+        """
+        owner = np.full(len(self.frames[name]), -1)
+        owner[positions] = np.arange(len(positions))
+        owners = owner[self.row_ids[name]]
+        rows = np.flatnonzero(owners >= 0)
+        rows = rows[np.argsort(owners[rows], kind="stable")]
+        return rows, owners[rows]
+
+
+class QueryPlan:
+    """Aggregates one request needs, computed from a single filtered pass.
+
+    Declare each aggregate with ``add``; ``execute`` reads the finest grain
+    covering all of them once from the engine (the rollup cube, or anything
+    with the same ``aggregate``, such as the DuckDB backend), then derives
+    every coarser aggregate by rolling that small result up (with its
+    ratios recomputed from the rolled-up metrics).
+    """
+
+    def __init__(self, engine: RollupCube, view_mode: ViewMode = "accumulated", **filters):
+        self.engine = engine
+        self.view_mode = view_mode
+        self.filters = filters
+        self.aggregates: Dict[str, List[str]] = {}
+
+    def add(self, name: str, group_cols: List[str]) -> "QueryPlan":
+        """Declare an aggregate by group_cols, returned under name."""
+        self.aggregates[name] = list(group_cols)
+        return self
+
+    def finest_columns(self) -> List[str]:
+        """Union of all declared group columns, in canonical order."""
+        needed = {col for cols in self.aggregates.values() for col in cols}
+        ordered = [col for col in GRAIN_ORDER if col in needed]
+        return ordered + sorted(needed - set(ordered))
+
+    def execute(self) -> PlanResult:
+        """Compute the finest aggregate once and roll the others up from it.
+
+        The finest aggregate keeps rows with a missing key, so every filtered
+        row counts toward each coarser aggregate (a company total includes
+        rows without a ramo to draw a bar for). Each aggregate then leaves
+        out the groups missing one of its own keys, as groupby does.
+        """
+        finest_cols = self.finest_columns()
+        full = self.engine.aggregate(finest_cols, view_mode=self.view_mode, dropna=False, **self.filters)
+        sum_cols = [c for c in get_metric_columns("accumulated") if c in full.columns]
+
+        complete = full[finest_cols].notna().all(axis=1).to_numpy()
+        finest = full if complete.all() else full[complete].reset_index(drop=True)
+
+        result = PlanResult(finest=finest)
+        for name, group_cols in self.aggregates.items():
+            if group_cols == finest_cols:
+                result.frames[name] = finest
+                result.row_ids[name] = np.arange(len(finest))
+                continue
+
+            if len(full) and group_cols == finest_cols[:len(group_cols)]:
+                frame, ids = rollup_prefix(full, group_cols, sum_cols)
+            else:
+                frame, ids = rollup_grouped(full, group_cols, sum_cols)
+            frame, ids = drop_missing(frame, ids, group_cols)
+            result.frames[name] = add_ratios(frame)
+            # Finest rows with every key fall in groups with every key
+            result.row_ids[name] = ids[complete]
+
+        return result
+
+
+def drop_missing(frame: pd.DataFrame, ids: np.ndarray, group_cols: List[str]):
+    """Drop the groups of a rolled-up frame missing a key, renumbering row group ids (-1 once dropped)."""
+    missing = frame[group_cols].isna().any(axis=1).to_numpy()
+    if not missing.any():
+        return frame, ids
+    renumbered = np.where(missing, -1, np.cumsum(~missing) - 1)
+    return frame[~missing].reset_index(drop=True), np.where(ids >= 0, renumbered[ids], -1)
+
+
+def rollup_grouped(df: pd.DataFrame, group_cols: List[str], sum_cols: List[str]):
+    """Roll a frame up to any subset of its columns. Returns the frame and row group ids."""
+    groups = group_ids(df, group_cols)
+    if groups is None:
+        grouped = df.groupby(group_cols, observed=True, sort=True)
+        return grouped[sum_cols].sum().reset_index(), grouped.ngroup().to_numpy()
+    return group_sum(df, group_cols, sum_cols), groups.ids
+
+
+def rollup_prefix(df: pd.DataFrame, group_cols: List[str], sum_cols: List[str]):
+    """Roll a frame sorted by group_cols (and finer columns) up to group_cols.
+
+    Every group is a contiguous run of rows, so the rollup is a boundary
+    scan plus ``np.add.reduceat`` with no hashing or re-sorting. Returns
+    the rolled-up frame and the group id of every input row.
+    """
+    starts = np.zeros(len(df), dtype=bool)
+    starts[0] = True
+    for col in group_cols:
+        values = df[col]
+        keys = values.cat.codes.to_numpy() if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+        starts[1:] |= keys[1:] != keys[:-1]
+
+    positions = np.flatnonzero(starts)
+    frame = pd.DataFrame({
+        **{col: df[col].array.take(positions) for col in group_cols},
+        **{col: np.add.reduceat(df[col].to_numpy(), positions) for col in sum_cols},
+    })
+    return frame, np.cumsum(starts) - 1
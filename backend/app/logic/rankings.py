@@ -1,5 +1,35 @@
+import copy
+
+import numpy as np
 import pandas as pd
-from typing import Optional
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.logic.grouping import group_ids
+
+
+def descending_keys(values) -> np.ndarray:
+    """Keys that sort values largest first in ascending order, with NaN last."""
+    return -np.nan_to_num(np.asarray(values, dtype=np.float64), nan=-np.inf)
+
+
+def top_positions(values, n: Optional[int] = None) -> np.ndarray:
+    """Positions of the n largest values (all if n is None), largest first.
+
+    Ties keep row order and NaN goes last. For n below the number of
+    values, ``np.argpartition`` finds the n-th largest value in O(len), and
+    only the n selected values are sorted.
+    """
+    keys = descending_keys(values)
+    if n is None or n <= 0 or n >= len(keys):
+        return np.argsort(keys, kind="stable")
+
+    kth = np.partition(keys, n - 1)[n - 1]
+    above = np.flatnonzero(keys < kth)
+    # Ties with the n-th value are taken in row order
+    ties = np.flatnonzero(keys == kth)[:n - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.argsort(keys[selected], kind="stable")]
 
 
 def get_top_n(
@@ -21,19 +51,13 @@ def get_top_n(
         group_col: Column used for grouping/identification
 
     Returns:
-        DataFrame with top N records sorted by metric descending
+        DataFrame with top N records sorted by metric descending (ties in row order)
     """
     if metric not in df.columns:
         return df
 
-    # Sort by metric descending
-    sorted_df = df.sort_values(metric, ascending=False)
-
-    # Apply top-N limit if specified
-    if n is not None and n > 0:
-        sorted_df = sorted_df.head(n)
-
-    return sorted_df
+    # Partial selection of the top N, sorted by metric descending
+    return df.iloc[top_positions(df[metric].to_numpy(), n)]
 
 
 def get_top_n_with_others(
@@ -95,3 +119,288 @@ def calculate_market_share(
         df["market_share"] = 0.0
 
     return df
+
+
+def grouped_ranks(
+    df: pd.DataFrame,
+    market_cols: List[str],
+    metric: str = "primas_emitidas",
+) -> Dict[str, np.ndarray]:
+    """Min and dense ranks (1 = largest) of every row within its market, in one grouped pass.
+
+    Equivalent to ``groupby(market_cols)[metric].rank(ascending=False,
+    method=...)`` for both methods at once: rows are sorted once by market
+    and metric descending, and each rank is the distance to the start of
+    its run of equal values (min) or the number of distinct values before
+    it (dense) within the market. NaN values rank last; rows with a
+    missing market key get rank 0.
+    """
+    groups = group_ids(df, market_cols)
+    if groups is None:
+        codes = df.groupby(market_cols, observed=True, sort=True).ngroup().to_numpy()
+    else:
+        codes = groups.ids
+
+    # Largest first within each market; lexsort sorts by its last key first
+    keys = descending_keys(df[metric].to_numpy())
+    order = np.lexsort([keys, codes])
+    codes, keys = codes[order], keys[order]
+
+    positions = np.arange(len(order))
+    market_start = np.ones(len(order), dtype=bool)
+    market_start[1:] = codes[1:] != codes[:-1]
+    value_start = market_start.copy()
+    value_start[1:] |= keys[1:] != keys[:-1]
+
+    first_in_market = np.maximum.accumulate(np.where(market_start, positions, 0))
+    first_of_value = np.maximum.accumulate(np.where(value_start, positions, 0))
+    distinct_values = np.cumsum(value_start)
+
+    valid = codes >= 0
+    ranks = {
+        "min": first_of_value - first_in_market + 1,
+        "dense": distinct_values - distinct_values[first_in_market] + 1,
+    }
+    result = {}
+    for method, sorted_ranks in ranks.items():
+        rank = np.zeros(len(order), dtype=np.int64)
+        rank[order] = np.where(valid, sorted_ranks, 0)
+        result[method] = rank
+    return result
+
+
+@dataclass
+class RankTrajectories:
+    """Rank of every company in every period, in the whole market and in each ramo.
+
+    Ranks are stored per method as compact (market x company x period)
+    integer arrays, 0 where a company has no rows in a market and period;
+    market 0 is the whole market, then one per ramo. A company's
+    trajectory is one row of them.
+    """
+
+    periods: np.ndarray
+    companies: pd.Index
+    ramos: pd.Index
+    ranks: Dict[str, np.ndarray]
+    sizes: np.ndarray
+
+    @classmethod
+    def build(
+        cls,
+        total: pd.DataFrame,
+        by_ramo: pd.DataFrame,
+        metric: str,
+        periods: np.ndarray,
+    ) -> "RankTrajectories":
+        """Rank aggregates by (periodo, nombre_corto) and by (periodo, ramo, nombre_corto).
+
+        ``periods`` is the time axis; ranks of all (periodo, ramo) markets
+        come from one grouped pass over by_ramo.
+        """
+        companies = pd.Index(np.sort(total["nombre_corto"].astype(object).unique()))
+        ramos = pd.Index(np.sort(by_ramo["ramo_nombre_corto"].dropna().astype(object).unique()))
+        shape = (len(ramos) + 1, len(companies), len(periods))
+        dtype = np.int16 if len(companies) < np.iinfo(np.int16).max else np.int32
+
+        ranks = {method: np.zeros(shape, dtype=dtype) for method in ("min", "dense")}
+        sizes = np.zeros((len(ramos) + 1, len(periods)), dtype=np.int64)
+        markets = [
+            (total, ["periodo"], np.zeros(len(total), dtype=np.int64)),
+            (by_ramo, ["periodo", "ramo_nombre_corto"], ramos.get_indexer(by_ramo["ramo_nombre_corto"]) + 1),
+        ]
+        for df, market_cols, market in markets:
+            ranked = grouped_ranks(df, market_cols, metric)
+            valid = ranked["min"] > 0
+            column = np.searchsorted(periods, df["periodo"].to_numpy()[valid])
+            rows = companies.get_indexer(df["nombre_corto"].astype(object)[valid])
+            market = market[valid]
+            for method, rank in ranked.items():
+                ranks[method][market, rows, column] = rank[valid]
+            np.add.at(sizes, (market, column), 1)
+        return cls(periods, companies, ramos, ranks, sizes)
+
+    def select(
+        self,
+        ramo: Optional[str] = None,
+        companies: Optional[List[str]] = None,
+        year: Optional[int] = None,
+        trimestre=None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> "RankTrajectories":
+        """Trajectories in the market of ramo (the whole market if None) alone.
+
+        The result's only market, 0, is the selected one, over the selected
+        periods and companies. Without a companies filter, every company
+        ranked in the market in one of the selected periods is kept.
+        """
+        keep = np.ones(len(self.periods), dtype=bool)
+        if year is not None:
+            keep &= self.periods // 100 == int(year)
+        if trimestre is not None:
+            keep &= self.periods % 100 == int(trimestre)
+        if from_period is not None:
+            keep &= self.periods >= int(from_period)
+        if to_period is not None:
+            keep &= self.periods <= int(to_period)
+
+        market = self.ramos.get_indexer([ramo])[0] + 1 if ramo else 0
+        ranks = {method: r[[market]][:, :, keep] for method, r in self.ranks.items()}
+        sizes = self.sizes[[market]][:, keep]
+        if ramo and market == 0:
+            # Unknown ramo: nobody is ranked in it
+            ranks = {method: np.zeros_like(r) for method, r in ranks.items()}
+            sizes = np.zeros_like(sizes)
+
+        if companies is not None:
+            rows = self.companies.isin(companies)
+        else:
+            rows = (ranks["min"][0] > 0).any(axis=1)
+        return RankTrajectories(
+            periods=self.periods[keep],
+            companies=self.companies[rows],
+            ramos=pd.Index([], dtype=object),
+            ranks={method: r[:, rows] for method, r in ranks.items()},
+            sizes=sizes,
+        )
+
+
+def market_concentration(
+    df: pd.DataFrame,
+    market_cols: List[str],
+    metric: str = "primas_emitidas",
+    top: Sequence[int] = (4, 10),
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Market shares and concentration of every market in one grouped pass.
+
+    ``df`` holds one row per company and market (e.g. per periodo and ramo).
+    Rows are sorted once by market and metric descending, so shares, the
+    Herfindahl-Hirschman index (sum of squared percentage shares, 0-10000)
+    and the CR-n ratios (share of the n largest companies) of all markets
+    are bincounts over the same arrays, with no per-market loop. Shares are
+    percentages rounded like calculate_market_share, and 0 in markets whose
+    total is not positive.
+
+    Returns (markets, companies): one row per market with ``total``,
+    ``companies``, ``hhi``, ``cr{n}`` and the ``start``/``stop`` rows of its
+    companies; and the companies sorted by market and share descending,
+    with ``market_share``.
+    """
+    groups = group_ids(df, market_cols)
+    if groups is None:
+        grouped = df.groupby(market_cols, observed=True, sort=True)
+        codes, keys = grouped.ngroup().to_numpy(), grouped.size().reset_index()[market_cols]
+        num_markets = len(keys)
+    else:
+        codes, keys, num_markets = groups.ids, pd.DataFrame(groups.keys), groups.ngroups
+
+    valid = codes >= 0
+    df, codes = df[valid], codes[valid]
+    values = df[metric].to_numpy()
+
+    # Largest first within each market; lexsort sorts by its last key first
+    order = np.lexsort([-values, codes])
+    codes, values = codes[order], values[order]
+    companies = df.iloc[order].reset_index(drop=True)
+
+    totals = np.bincount(codes, weights=values, minlength=num_markets)
+    counts = np.bincount(codes, minlength=num_markets)
+    stops = np.cumsum(counts)
+    starts = stops - counts
+
+    positive = totals[codes] > 0
+    shares = np.divide(values, totals[codes], out=np.zeros(len(values)), where=positive) * 100
+    rank = np.arange(len(codes)) - starts[codes]
+
+    markets = keys.reset_index(drop=True)
+    markets["total"] = totals
+    markets["companies"] = counts
+    markets["hhi"] = np.bincount(codes, weights=shares ** 2, minlength=num_markets)
+    for n in top:
+        markets[f"cr{n}"] = np.bincount(codes, weights=np.where(rank < n, shares, 0), minlength=num_markets)
+    markets["start"] = starts
+    markets["stop"] = stops
+
+    companies["market_share"] = shares.round(2)
+    return markets, companies
+
+
+class CellRankings:
+    """Rows of every cell of a frame ordered by each ranking column.
+
+    ``df`` is sorted by its cell columns, so every cell is a contiguous run
+    of rows. One lexsort per column orders the rows of all cells at once,
+    by cell and then value descending (ties in row order, as in
+    top_positions), so the top N of a cell by any column is a slice.
+    """
+
+    def __init__(self, df: pd.DataFrame, cell_cols: List[str], columns: List[str]):
+        self.size = len(df)
+        starts = np.zeros(len(df), dtype=bool)
+        starts[:1] = True
+        for col in cell_cols:
+            values = df[col]
+            keys = values.cat.codes.to_numpy() if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+            starts[1:] |= keys[1:] != keys[:-1]
+
+        bounds = np.append(np.flatnonzero(starts), len(df))
+        keys = df[cell_cols].iloc[bounds[:-1]].itertuples(index=False, name=None)
+        self.cells: Dict[Tuple[Hashable, ...], Tuple[int, int]] = {
+            key: (int(start), int(stop)) for key, start, stop in zip(keys, bounds[:-1], bounds[1:])
+        }
+
+        cell_ids = np.cumsum(starts) - 1
+        self.orders: Dict[str, np.ndarray] = {
+            col: np.lexsort([descending_keys(df[col].to_numpy()), cell_ids]).astype(np.int32)
+            for col in columns if col in df.columns
+        }
+
+    def to_frames(self, cell_cols: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """The cells (their keys and row bounds) and the orders, as frames to cache."""
+        keys = list(self.cells)
+        cells = pd.DataFrame(keys or None, columns=cell_cols)
+        bounds = np.array(list(self.cells.values()), dtype=np.int64).reshape(-1, 2)
+        cells["start"], cells["stop"] = bounds[:, 0], bounds[:, 1]
+        return cells, pd.DataFrame(self.orders)
+
+    @classmethod
+    def from_frames(cls, cells: pd.DataFrame, orders: pd.DataFrame) -> "CellRankings":
+        """Rankings read back from the frames of ``to_frames``; the orders are used as is."""
+        rankings = cls.__new__(cls)
+        rankings.size = len(orders)
+        cell_cols = [c for c in cells.columns if c not in ("start", "stop")]
+        keys = cells[cell_cols].itertuples(index=False, name=None)
+        rankings.cells = {
+            key: (int(start), int(stop))
+            for key, start, stop in zip(keys, cells["start"].to_numpy(), cells["stop"].to_numpy())
+        }
+        rankings.orders = {col: orders[col].to_numpy() for col in orders.columns}
+        return rankings
+
+    def appended(self, later: "CellRankings") -> "CellRankings":
+        """Rankings with the cells of ``later``, built on the rows following these, added."""
+        offset = self.size
+        rankings = copy.copy(self)
+        rankings.size = self.size + later.size
+        rankings.cells = {
+            **self.cells,
+            **{key: (start + offset, stop + offset) for key, (start, stop) in later.cells.items()},
+        }
+        rankings.orders = {
+            col: np.concatenate([order, later.orders[col] + offset])
+            for col, order in self.orders.items() if col in later.orders
+        }
+        return rankings
+
+    def top(self, cell: Tuple[Hashable, ...], column: str, n: Optional[int] = None) -> Optional[np.ndarray]:
+        """Positions within the cell of its n highest rows by column, highest first.
+
+        None if the cell or column is not ranked.
+        """
+        if cell not in self.cells or column not in self.orders:
+            return None
+        start, stop = self.cells[cell]
+        if n is not None and n > 0:
+            stop = min(stop, start + n)
+        return self.orders[column][start:stop] - start
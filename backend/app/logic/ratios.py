@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+# Ratio column -> (numerator, denominator) metrics
+RATIO_DEFINITIONS = {
+    "siniestralidad": ("siniestros_devengados", "primas_devengadas"),  # Loss ratio
+    "ratio_gastos": ("gastos_devengados", "primas_devengadas"),  # Expense ratio
+}
+RATIO_COLUMNS = [*RATIO_DEFINITIONS, "combined_ratio"]
+
+
+def safe_ratio(numerator, denominator) -> np.ndarray:
+    """numerator / denominator as a percentage rounded to 2 decimals.
+
+    Zero denominators (and missing values) give 0, like the ratios of
+    src/logic/ratios.py, but on plain arrays in one pass and without
+    copying any frame.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    result *= 100
+    return np.nan_to_num(result, nan=0.0).round(2)
+
+
+def ratio_values(metrics: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Loss, expense and combined ratios of metric arrays (or scalars)."""
+    ratios = {
+        name: safe_ratio(metrics[numerator], metrics[denominator])
+        for name, (numerator, denominator) in RATIO_DEFINITIONS.items()
+        if numerator in metrics and denominator in metrics
+    }
+    if len(ratios) == len(RATIO_DEFINITIONS):
+        ratios["combined_ratio"] = ratios["siniestralidad"] + ratios["ratio_gastos"]
+    return ratios
+
+
+def add_ratios(df: pd.DataFrame, suffix: str = "") -> pd.DataFrame:
+    """Add the ratio columns of every row of df in place, from its (suffixed) metric columns.
+
+    With a suffix ("_current") both the metrics read and the ratio columns
+    written carry it. Returns df.
+    """
+    metrics = {
+        col: df[f"{col}{suffix}"].to_numpy()
+        for pair in RATIO_DEFINITIONS.values() for col in pair
+        if f"{col}{suffix}" in df.columns
+    }
+    for name, values in ratio_values(metrics).items():
+        df[f"{name}{suffix}"] = values
+    return df
+
+
+def totals_ratios(totals: dict) -> dict:
+    """Ratios of a totals dict (as returned by get_totals)."""
+    return {name: float(value) for name, value in ratio_values(totals).items()}
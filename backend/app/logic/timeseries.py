@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.core import config
+
+
+def previous_quarter(periodo: np.ndarray) -> np.ndarray:
+    """Periodo of the quarter before each periodo."""
+    year, trimestre = np.divmod(periodo, 100)
+    return np.where(trimestre > 1, periodo - 1, (year - 1) * 100 + 4)
+
+
+def lag_positions(periods: np.ndarray, lagged: np.ndarray) -> np.ndarray:
+    """Row of every lagged periodo in the sorted periods axis, -1 where absent."""
+    positions = np.minimum(np.searchsorted(periods, lagged), len(periods) - 1)
+    return np.where(periods[positions] == lagged, positions, -1)
+
+
+def growth(values: np.ndarray, lag: np.ndarray) -> np.ndarray:
+    """Growth of every row over the row at ``lag`` (NaN when absent or zero), all columns at once."""
+    base = values[np.maximum(lag, 0)]
+    valid = (lag >= 0)[:, None] & (base != 0)
+    return np.divide(values, base, out=np.full(values.shape, np.nan), where=valid) - 1
+
+
+@dataclass
+class TimeSeries:
+    """Metrics pivoted to a (period x entity) matrix, with growth over the whole history.
+
+    Rows follow every period in the data and columns the entities, so QoQ
+    and YoY growth are one vectorized divide against the rows found by a
+    binary search of the lagged periods; a missing period gives no growth
+    rather than comparing against the wrong quarter. Accumulated values
+    restart every fiscal year, so their first quarter has no QoQ growth
+    either: the quarter before it closes the previous year. Requests then
+    only slice rows and columns.
+    """
+
+    periods: np.ndarray
+    entities: pd.Index
+    values: Dict[str, np.ndarray]
+    rates: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+    accumulated: bool = False  # Values accumulate within the fiscal year
+
+    @classmethod
+    def pivot(
+        cls, df: pd.DataFrame, entity_col: Optional[str], periods: np.ndarray, accumulated: bool = False
+    ) -> "TimeSeries":
+        """Pivot an aggregate by periodo (and entity_col) over the given periods axis."""
+        metrics = [c for c in config.METRIC_COLUMNS if c in df.columns]
+        rows = np.searchsorted(periods, df["periodo"].to_numpy())
+        if entity_col is None:
+            entities, columns = pd.Index(["Total"]), np.zeros(len(df), dtype=np.int64)
+        else:
+            columns, entities = pd.factorize(df[entity_col].astype(object), sort=True)
+            entities = pd.Index(entities)
+
+        values = {}
+        for col in metrics:
+            matrix = np.zeros((len(periods), len(entities)))
+            matrix[rows, columns] = df[col].to_numpy()
+            values[col] = matrix
+        return cls(periods, entities, values, accumulated=accumulated).with_growth()
+
+    def with_growth(self) -> "TimeSeries":
+        """Compute QoQ and YoY growth for every metric."""
+        qoq = lag_positions(self.periods, previous_quarter(self.periods))
+        if self.accumulated:
+            qoq = np.where(self.periods % 100 == config.FISCAL_YEAR_START_TRIMESTRE, -1, qoq)
+        lags = {
+            "qoq": qoq,
+            "yoy": lag_positions(self.periods, self.periods - 100),
+        }
+        self.rates = {
+            col: {name: growth(matrix, lag) for name, lag in lags.items()}
+            for col, matrix in self.values.items()
+        }
+        return self
+
+    def select(
+        self,
+        entities: Optional[List[str]] = None,
+        year: Optional[int] = None,
+        trimestre=None,
+        from_period: Optional[int] = None,
+        to_period: Optional[int] = None,
+    ) -> "TimeSeries":
+        """Rows of the selected periods and columns of the selected entities."""
+        keep = np.ones(len(self.periods), dtype=bool)
+        if year is not None:
+            keep &= self.periods // 100 == int(year)
+        if trimestre is not None:
+            keep &= self.periods % 100 == int(trimestre)
+        if from_period is not None:
+            keep &= self.periods >= int(from_period)
+        if to_period is not None:
+            keep &= self.periods <= int(to_period)
+
+        columns = np.arange(len(self.entities))
+        if entities is not None:
+            columns = columns[self.entities.isin(entities)]
+        grid = np.ix_(keep, columns)
+
+        return TimeSeries(
+            periods=self.periods[keep],
+            entities=self.entities[columns],
+            values={col: matrix[grid] for col, matrix in self.values.items()},
+            rates={
+                col: {name: rate[grid] for name, rate in rates.items()}
+                for col, rates in self.rates.items()
+            },
+            accumulated=self.accumulated,
+        )
+
+    def total(self, entities: List[str], name: str = "Total") -> "TimeSeries":
+        """Series of the sum over the given entities, with its own growth."""
+        columns = self.entities.isin(entities)
+        values = {col: matrix[:, columns].sum(axis=1, keepdims=True) for col, matrix in self.values.items()}
+        return TimeSeries(self.periods, pd.Index([name]), values, accumulated=self.accumulated).with_growth()
@@ -1,30 +1,38 @@
 from contextlib import asynccontextmanager
 import logging
+import threading
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import CORS_ORIGINS, DEBUG, DATA_SOURCE
-from app.core.loader import preload_data
+from app.core.loader import preload_data, get_data_loader
 from app.api.routes import filters, data
-from app.models.responses import HealthResponse
+from app.models.responses import HealthResponse, ReadyResponse, ResidentSelection
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Preload data into memory on startup for fast first requests."""
-    logger.info(f"Starting up with DATA_SOURCE={DATA_SOURCE}")
+def run_preload() -> None:
+    """Preload data, logging instead of raising on failure."""
     try:
         preload_data()
-        logger.info("Data preload completed successfully")
     except Exception as e:
         logger.error(f"Data preload failed: {e}")
         # Don't crash - data will be loaded on first request
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Preload data in the background on startup and watch the source for new versions."""
+    logger.info(f"Starting up with DATA_SOURCE={DATA_SOURCE}")
+    # Serve health/readiness checks while the dataset loads
+    threading.Thread(target=run_preload, name="data-preload", daemon=True).start()
+    get_data_loader().start_watcher()
     yield
     logger.info("Shutting down...")
+    get_data_loader().stop_watcher()
 
 
 # Initialize FastAPI app
@@ -58,6 +66,52 @@ async def health():
     return HealthResponse(status="ok", version="1.0.0")
 
 
+@app.get("/api/ready", response_model=ReadyResponse)
+async def ready(response: Response):
+    """Readiness check: 200 once the dataset is loaded, 503 while loading or failed."""
+    loader = get_data_loader()
+    status = loader.status
+
+    if not loader.is_loaded:
+        response.status_code = 503
+        return ReadyResponse(status=status.state, stage=status.stage, error=status.error)
+
+    if loader.uses_duckdb:
+        return ReadyResponse(status="ready", version=loader.get_duckdb().version, error=status.error)
+
+    if loader.partitioned:
+        # Fingerprint of the partition files; rows are those of the resident partitions
+        partitions = loader.get_partitions()
+        return ReadyResponse(
+            status="ready",
+            version=partitions.version,
+            rows=partitions.rows,
+            resident_partitions=[f"{year}{trimestre:02d}" for year, trimestre in partitions.resident],
+            selections=[
+                ResidentSelection(
+                    partitions=[f"{year}{trimestre:02d}" for year, trimestre in key],
+                    version=snapshot.version,
+                    rows=len(snapshot.df),
+                    loaded_at=snapshot.loaded_at,
+                    warm_caches=snapshot.cached_names,
+                )
+                for key, snapshot in partitions.selections.items()
+            ],
+            error=status.error,
+        )
+
+    snapshot = loader.get_snapshot()
+    return ReadyResponse(
+        status="ready",
+        version=snapshot.version,
+        rows=len(snapshot.df),
+        loaded_at=snapshot.loaded_at,
+        warm_start=snapshot.warm_start,
+        warm_caches=snapshot.cached_names,
+        error=status.error,
+    )
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API info."""
@@ -65,6 +119,7 @@ async def root():
         "message": "Insurance Market Dashboard API",
         "docs": "/docs",
         "health": "/api/health",
+        "ready": "/api/ready",
     }
 
 
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 
@@ -25,6 +26,9 @@ class KPIResponse(BaseModel):
     siniestros_devengados: float = Field(description="Total incurred claims")
     gastos_devengados: float = Field(description="Total incurred expenses")
     entities_count: int = Field(description="Number of entities with emissions")
+    siniestralidad: float = Field(0, description="Loss ratio (% of earned premiums)")
+    ratio_gastos: float = Field(0, description="Expense ratio (% of earned premiums)")
+    combined_ratio: float = Field(0, description="Loss plus expense ratio")
 
 
 # Company ranking response
@@ -34,10 +38,15 @@ class CompanyRankingItem(BaseModel):
     ramo_nombre_corto: Optional[str] = Field(None, description="Ramo name (if applicable)")
     subramo_nombre_corto: Optional[str] = Field(None, description="Subramo name (if applicable)")
     primas_emitidas: float = Field(description="Issued premiums")
+    siniestralidad: Optional[float] = Field(None, description="Loss ratio (% of earned premiums)")
+    ratio_gastos: Optional[float] = Field(None, description="Expense ratio (% of earned premiums)")
+    combined_ratio: Optional[float] = Field(None, description="Loss plus expense ratio")
+    rank: int = Field(description="Company position in the ranking, from 1")
+    value: float = Field(description="Company total of the sort_by metric or ratio it is ranked by")
 
 
 class CompanyRankingResponse(BaseModel):
-    """Top N companies ranking."""
+    """Top N companies ranking, grouped by company in rank order."""
     companies: List[CompanyRankingItem]
     total: int = Field(description="Total number of companies before TOP-N filter")
 
@@ -56,8 +65,108 @@ class DistributionResponse(BaseModel):
     total: float = Field(description="Total value")
 
 
+# Dashboard bundle response
+class DashboardResponse(BaseModel):
+    """All dashboard widgets computed from one filtered view."""
+    kpis: KPIResponse
+    ranking: CompanyRankingResponse
+    distribution: DistributionResponse
+    distribution_type: str = Field(description="'ramos', or 'subramos' when a ramo is selected")
+
+
+# Time series response
+class TimeSeriesItem(BaseModel):
+    """One entity's metric over the selected periods."""
+    name: str = Field(description="Entity name (company, ramo, subramo or 'Total')")
+    values: List[float] = Field(description="Metric value per period")
+    qoq: List[Optional[float]] = Field(
+        description="Growth over the previous quarter (null if unavailable, and at the fiscal year start "
+        "for accumulated values)"
+    )
+    yoy: List[Optional[float]] = Field(description="Growth over the same quarter a year earlier (null if unavailable)")
+
+
+class TimeSeriesResponse(BaseModel):
+    """Metric per period for a set of entities."""
+    periods: List[str] = Field(description="Periods (YYYYTT), ascending")
+    metric: str = Field(description="Metric of the series")
+    by: str = Field(description="Entity the series are split by")
+    series: List[TimeSeriesItem]
+
+
+# Concentration response
+class MarketShareItem(BaseModel):
+    """One company's share of a market."""
+    nombre_corto: str = Field(description="Company short name")
+    value: float = Field(description="Metric value")
+    market_share: float = Field(description="Share of the market (%)")
+
+
+class ConcentrationItem(BaseModel):
+    """Concentration of one ramo in one period."""
+    period: str = Field(description="Period (YYYYTT)")
+    ramo_nombre_corto: str = Field(description="Ramo name")
+    total: float = Field(description="Market total of the metric")
+    companies: int = Field(description="Companies in the market")
+    hhi: float = Field(description="Herfindahl-Hirschman index (0-10000)")
+    cr4: float = Field(description="Share of the 4 largest companies (%)")
+    cr10: float = Field(description="Share of the 10 largest companies (%)")
+    shares: List[MarketShareItem] = Field(description="Largest companies by share, descending")
+
+
+class ConcentrationResponse(BaseModel):
+    """Market concentration per ramo and period."""
+    metric: str = Field(description="Metric the shares are computed on")
+    items: List[ConcentrationItem]
+
+
+# Rank trajectory response
+class RankTrajectoryItem(BaseModel):
+    """One company's rank over the selected periods."""
+    nombre_corto: str = Field(description="Company short name")
+    ranks: List[Optional[int]] = Field(description="Rank per period, 1 = largest (null if not in the market)")
+
+
+class RankTrajectoryResponse(BaseModel):
+    """Company ranks per period in one market."""
+    periods: List[str] = Field(description="Periods (YYYYTT), ascending")
+    metric: str = Field(description="Metric companies are ranked by")
+    method: str = Field(description="Tie handling: 'min' or 'dense'")
+    ramo_nombre_corto: Optional[str] = Field(None, description="Ramo of the market (null: the whole market)")
+    companies: List[int] = Field(description="Companies ranked per period")
+    series: List[RankTrajectoryItem]
+
+
 # Health check
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str = "ok"
     version: str = "1.0.0"
+
+
+# Readiness check
+class ResidentSelection(BaseModel):
+    """A period selection kept warm in the partitioned layout."""
+    partitions: List[str] = Field(description="Partitions (YYYYTT) the selection is stacked from")
+    version: str = Field(description="Version of the selection's snapshot")
+    rows: int = Field(description="Rows in the selection")
+    loaded_at: datetime = Field(description="When the selection was built")
+    warm_caches: List[str] = Field(default_factory=list, description="Derived structures already built")
+
+
+class ReadyResponse(BaseModel):
+    """Readiness check response (dataset load state)."""
+    status: str = Field(description="idle, loading, ready or error")
+    stage: Optional[str] = Field(None, description="Current load stage while loading")
+    version: Optional[str] = Field(None, description="Version of the dataset being served")
+    rows: Optional[int] = Field(None, description="Rows in the dataset being served")
+    loaded_at: Optional[datetime] = Field(None, description="When the served dataset was loaded")
+    warm_start: bool = Field(False, description="Dataset was memory-mapped from the local cache")
+    warm_caches: List[str] = Field(default_factory=list, description="Derived structures already built")
+    resident_partitions: List[str] = Field(
+        default_factory=list, description="Partitions (YYYYTT) in memory, partitioned layout only"
+    )
+    selections: List[ResidentSelection] = Field(
+        default_factory=list, description="Selections kept warm, partitioned layout only"
+    )
+    error: Optional[str] = Field(None, description="Last load error")
@@ -0,0 +1,61 @@
+"""Benchmark the bincount aggregation engine against pandas groupby.
+
+Runs every grouping the API uses over the configured subramos dataset
+(see app.core.config) and prints the median time of each engine.
+
+Usage (from backend/):
+    python -m benchmarks.bench_aggregations [--repeat 50]
+"""
+import argparse
+import logging
+import time
+
+from app.core import config
+from app.core.loader import DataLoader
+from app.logic.grouping import count_distinct, group_sum
+
+GROUPINGS = {
+    "ramo": ["ramo_nombre_corto"],
+    "subramo": ["subramo_nombre_corto"],
+    "company": ["cod_cia", "nombre_corto"],
+    "company x ramo": ["cod_cia", "nombre_corto", "ramo_nombre_corto"],
+    "company x subramo": ["cod_cia", "nombre_corto", "subramo_nombre_corto"],
+    "period x company x subramo": ["periodo", "cod_cia", "nombre_corto", "ramo_nombre_corto", "subramo_nombre_corto"],
+}
+
+
+def median_ms(fn, repeat: int) -> float:
+    """Median wall time of fn in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bincount vs pandas aggregation")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measurement")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    df = DataLoader().get_snapshot().df
+    sum_cols = [c for c in config.METRIC_COLUMNS if c in df.columns]
+    print(f"{len(df)} rows, {len(sum_cols)} metrics\n")
+    print(f"{'grouping':<28}{'pandas ms':>12}{'bincount ms':>14}{'speedup':>10}")
+
+    for name, group_cols in GROUPINGS.items():
+        pandas_ms = median_ms(
+            lambda: df.groupby(group_cols, as_index=False, observed=True)[sum_cols].sum(), args.repeat
+        )
+        bincount_ms = median_ms(lambda: group_sum(df, group_cols, sum_cols), args.repeat)
+        print(f"{name:<28}{pandas_ms:>12.2f}{bincount_ms:>14.2f}{pandas_ms / bincount_ms:>9.1f}x")
+
+    pandas_ms = median_ms(lambda: df["cod_cia"].nunique(), args.repeat)
+    bincount_ms = median_ms(lambda: count_distinct(df["cod_cia"]), args.repeat)
+    print(f"{'nunique(cod_cia)':<28}{pandas_ms:>12.2f}{bincount_ms:>14.2f}{pandas_ms / bincount_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core import config
+from app.core.loader import DataLoader
+
+# Two fiscal years (starting at trimestre 03), then the period to append
+HISTORY_PERIODS = [202301, 202302, 202303, 202304, 202401, 202402]
+NEW_PERIOD = 202403
+
+COMPANIES = {1: "Cia Alfa", 3: "Cia Gamma", 4: "Cia Delta"}
+SUBRAMOS = {"Autos": ["Casco", "Responsabilidad"], "Vida": ["Colectivo", "Individual"]}
+# New in NEW_PERIOD; each sorts between existing values, so categories are remapped
+NEW_COMPANY = (2, "Cia Beta")
+NEW_RAMO = ("Caucion", ["Judicial"])
+NEW_SUBRAMO = ("Autos", "Granizo")
+# A company renamed from a period on: one cod_cia listed under two names
+RENAMED = (3, "Cia Gamma SA", 202401)
+
+
+def raw_period(periodo: int, rng: np.random.Generator, new: bool = False) -> pd.DataFrame:
+    """Raw subramos rows of one period, with accumulated metrics only and some missing dimensions."""
+    companies = {**COMPANIES, NEW_COMPANY[0]: NEW_COMPANY[1]} if new else COMPANIES
+    subramos = {ramo: list(names) for ramo, names in SUBRAMOS.items()}
+    if new:
+        subramos[NEW_RAMO[0]] = NEW_RAMO[1]
+        subramos[NEW_SUBRAMO[0]].append(NEW_SUBRAMO[1])
+
+    cells = [
+        (cod_cia, name, ramo, subramo)
+        for cod_cia, name in companies.items()
+        for ramo, names in subramos.items()
+        for subramo in names
+    ]
+    # Rows without a subramo, and without a ramo either
+    cells += [(cod_cia, name, "Vida", None) for cod_cia, name in companies.items()]
+    cells += [(cod_cia, name, None, None) for cod_cia, name in list(companies.items())[:2]]
+
+    df = pd.DataFrame(cells, columns=["cod_cia", "nombre_corto", "ramo_nombre_corto", "subramo_nombre_corto"])
+    # Companies report in only some cells, always including the new values
+    is_new = (
+        (df["cod_cia"] == NEW_COMPANY[0])
+        | (df["ramo_nombre_corto"] == NEW_RAMO[0])
+        | (df["subramo_nombre_corto"] == NEW_SUBRAMO[1])
+    )
+    df = df[is_new | (rng.random(len(df)) < 0.6)].reset_index(drop=True)
+    df.insert(0, "periodo", periodo)
+    for col in config.METRIC_COLUMNS:
+        df[col] = rng.uniform(0, 1000, len(df)).round(2)
+    return df
+
+
+@pytest.fixture(scope="session")
+def raw_frames():
+    """Raw history and the raw rows of the appended period."""
+    rng = np.random.default_rng(7)
+    history = pd.concat([raw_period(p, rng) for p in HISTORY_PERIODS], ignore_index=True)
+    return history, raw_period(NEW_PERIOD, rng, new=True)
+
+
+@pytest.fixture(scope="session")
+def prepared(raw_frames):
+    """Prepared history, the prepared new period (as ingest_period prepares it) and the full rebuild."""
+    raw_history, raw_new = raw_frames
+    loader = DataLoader()
+    history = loader._prepare_subramos(raw_history.copy())
+    rows = loader._prepare_subramos(raw_new.copy(), history=loader._fiscal_year_rows(history, raw_new))
+    full = loader._prepare_subramos(pd.concat([raw_history, raw_new], ignore_index=True))
+    return history, rows, full
+
+
+@pytest.fixture(scope="session")
+def renamed(raw_frames):
+    """Prepared history with RENAMED's company under its new name from its period on."""
+    raw_history, _ = raw_frames
+    raw = raw_history.copy()
+    cod_cia, name, periodo = RENAMED
+    raw.loc[(raw["cod_cia"] == cod_cia) & (raw["periodo"] >= periodo), "nombre_corto"] = name
+    return DataLoader()._prepare_subramos(raw)
+
+
+def random_filters(seed: int, count: int = 60) -> list:
+    """Random combinations of the request filters over the history, exact cells and ranges alike."""
+    rng = np.random.default_rng(seed)
+    names = [*COMPANIES.values(), RENAMED[1], "Cia Unknown"]
+    ramos = [*SUBRAMOS, NEW_RAMO[0]]  # NEW_RAMO is not in the history: an empty selection
+    periods = sorted(HISTORY_PERIODS)
+    filters = [{}, {"year": 2024, "trimestre": 2}]
+    for _ in range(count):
+        f = {}
+        if rng.random() < 0.5:
+            f["year"] = int(rng.choice([2023, 2024]))
+            if rng.random() < 0.6:
+                f["trimestre"] = int(rng.integers(1, 5))
+        elif rng.random() < 0.5:
+            low, high = sorted(rng.choice(periods, 2))
+            if rng.random() < 0.8:
+                f["from_period"] = int(low)
+            if rng.random() < 0.8:
+                f["to_period"] = int(high)
+        if rng.random() < 0.5:
+            f["ramo"] = str(rng.choice(ramos))
+        if rng.random() < 0.4:
+            f["companies"] = [str(c) for c in rng.choice(names, int(rng.integers(1, 3)), replace=False)]
+        filters.append(f)
+    return filters
@@ -0,0 +1,163 @@
+"""Appending a period must give the same structures as rebuilding from the full frame."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core import config
+from app.core.dataset import DatasetSnapshot, append_rows
+from app.core.loader import DataLoader
+from app.logic.aggregations import filter_data
+from app.logic.bitmaps import CompanyBitmaps
+from app.logic.cube import RANKING_COLUMNS
+from app.logic.indexes import InvertedIndex, Postings
+
+from tests.conftest import NEW_COMPANY, NEW_PERIOD, NEW_RAMO, NEW_SUBRAMO
+
+FILTERS = [
+    {},
+    {"year": 2024},
+    {"year": 2023, "ramo": "Vida"},
+    {"year": 2024, "trimestre": 1, "ramo": "Autos"},
+    {"trimestre": 2, "companies": ["Cia Gamma"]},
+    {"year": 2024, "trimestre": 3},
+    {"year": 2024, "trimestre": 3, "ramo": NEW_RAMO[0]},
+    {"year": 2024, "trimestre": 3, "ramo": "Autos"},
+    {"ramo": "Vida", "companies": [NEW_COMPANY[1], "Cia Alfa"]},
+    {"from_period": 202304, "to_period": NEW_PERIOD},
+]
+GROUPINGS = [
+    ["ramo_nombre_corto"],
+    ["subramo_nombre_corto"],
+    ["cod_cia", "nombre_corto"],
+    ["cod_cia", "nombre_corto", "ramo_nombre_corto"],
+    ["cod_cia", "nombre_corto", "subramo_nombre_corto"],
+    ["periodo", "ramo_nombre_corto", "nombre_corto"],
+]
+
+
+@pytest.fixture(scope="module")
+def appended(prepared):
+    """The appended frame and the row its new period starts at."""
+    history, rows, _ = prepared
+    return append_rows(history, rows), len(history)
+
+
+@pytest.fixture(scope="module")
+def cubes(prepared, appended):
+    """Rollup cube extended for the new period, and the cube rebuilt from the full frame."""
+    history, _, full = prepared
+    df, start = appended
+    snapshot = DatasetSnapshot(df=history, version="v1", source_stamp="s")
+    snapshot.derived("rollup_cube")
+    extended = snapshot.appended(df, start, version="v1+1")
+    assert "rollup_cube" in extended.cached_names  # Extended, not left to rebuild
+    rebuilt = DatasetSnapshot(df=full, version="v2", source_stamp="s")
+    return extended.derived("rollup_cube"), rebuilt.derived("rollup_cube")
+
+
+def test_new_period_brings_new_dimension_values(prepared):
+    history, rows, _ = prepared
+    assert NEW_COMPANY[1] not in history["nombre_corto"].cat.categories
+    assert NEW_RAMO[0] not in history["ramo_nombre_corto"].cat.categories
+    assert NEW_SUBRAMO[1] not in history["subramo_nombre_corto"].cat.categories
+    assert {NEW_COMPANY[1], NEW_RAMO[0], NEW_SUBRAMO[1]} <= {
+        *rows["nombre_corto"], *rows["ramo_nombre_corto"], *rows["subramo_nombre_corto"]
+    }
+
+
+def test_append_rows_matches_full_frame(prepared, appended):
+    _, _, full = prepared
+    df, _ = appended
+    pd.testing.assert_frame_equal(df, full)
+
+
+@pytest.mark.parametrize("column", InvertedIndex.COLUMNS)
+def test_postings_appended_match_rebuild(prepared, appended, column):
+    history, _, full = prepared
+    df, start = appended
+    extended = Postings.from_column(history[column]).appended(df[column].iloc[start:], start)
+    rebuilt = Postings.from_column(full[column])
+
+    assert extended.keys.equals(rebuilt.keys)
+    assert extended.codes == rebuilt.codes
+    np.testing.assert_array_equal(extended.offsets, rebuilt.offsets)
+    np.testing.assert_array_equal(extended.order, rebuilt.order)
+
+
+def test_company_bitmaps_appended_match_rebuild(prepared, appended):
+    history, _, full = prepared
+    df, start = appended
+    extended = CompanyBitmaps(history).appended(df, start)
+    rebuilt = CompanyBitmaps(full)
+
+    # New companies take the next free bits, so only the counts must agree
+    for filters in FILTERS:
+        expected = filter_data(full, **filters)["cod_cia"].nunique()
+        assert extended.count(**filters) == rebuilt.count(**filters) == expected, filters
+
+
+def test_rollups_appended_match_rebuild(cubes):
+    extended, rebuilt = cubes
+    assert extended.rollups.keys() == rebuilt.rollups.keys()
+    for name, rollup in rebuilt.rollups.items():
+        pd.testing.assert_frame_equal(extended.rollups[name].df, rollup.df, obj=name)
+
+
+def test_cell_rankings_appended_match_rebuild(cubes):
+    extended, rebuilt = cubes
+    for name, rankings in rebuilt.rankings.items():
+        assert extended.rankings[name].cells == rankings.cells, name
+        for column in RANKING_COLUMNS:
+            np.testing.assert_array_equal(extended.rankings[name].orders[column], rankings.orders[column])
+
+
+@pytest.mark.parametrize("view_mode", ["accumulated", "current"])
+def test_cube_answers_match_rebuild(cubes, view_mode):
+    extended, rebuilt = cubes
+    for filters in FILTERS:
+        for group_cols in GROUPINGS:
+            pd.testing.assert_frame_equal(
+                extended.aggregate(group_cols, view_mode=view_mode, **filters),
+                rebuilt.aggregate(group_cols, view_mode=view_mode, **filters),
+                obj=f"{group_cols} {filters}",
+            )
+        assert extended.totals(view_mode=view_mode, **filters) == rebuilt.totals(view_mode=view_mode, **filters)
+
+    for ramo in [None, "Autos", NEW_RAMO[0]]:
+        for column in ["primas_emitidas", "siniestralidad", "combined_ratio"]:
+            np.testing.assert_array_equal(
+                extended.top_companies(column, 3, view_mode=view_mode, year=2024, trimestre=3, ramo=ramo),
+                rebuilt.top_companies(column, 3, view_mode=view_mode, year=2024, trimestre=3, ramo=ramo),
+            )
+
+
+def test_ingest_period_matches_full_load(raw_frames, tmp_path, monkeypatch):
+    raw_history, raw_new = raw_frames
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "QUERY_BACKEND", "pandas")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "file")
+    monkeypatch.setattr(config, "SNAPSHOT_CACHE", False)
+
+    history_dir, full_dir = tmp_path / "history", tmp_path / "full"
+    history_dir.mkdir()
+    full_dir.mkdir()
+    raw_history.to_parquet(history_dir / config.SUBRAMOS_FILE)
+    pd.concat([raw_history, raw_new], ignore_index=True).to_parquet(full_dir / config.SUBRAMOS_FILE)
+    raw_new.to_parquet(tmp_path / "new_period.parquet")
+
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", history_dir)
+    loader = DataLoader()
+    loader.get_snapshot().warm()
+    ingested = loader.ingest_period(str(tmp_path / "new_period.parquet"))
+
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", full_dir)
+    loaded = DataLoader().get_snapshot()
+
+    pd.testing.assert_frame_equal(ingested.df, loaded.df)
+    extended, rebuilt = ingested.derived("rollup_cube"), loaded.derived("rollup_cube")
+    for filters in FILTERS:
+        assert extended.totals(**filters) == rebuilt.totals(**filters)
+        pd.testing.assert_frame_equal(
+            extended.aggregate(["cod_cia", "nombre_corto", "ramo_nombre_corto"], **filters),
+            rebuilt.aggregate(["cod_cia", "nombre_corto", "ramo_nombre_corto"], **filters),
+        )
@@ -0,0 +1,28 @@
+"""Company bitmaps must count the distinct companies nunique counts."""
+import pytest
+
+from app.logic.aggregations import filter_data
+from app.logic.bitmaps import CompanyBitmaps
+
+from tests.conftest import RENAMED, random_filters
+
+
+@pytest.fixture(scope="module")
+def bitmaps(renamed):
+    return CompanyBitmaps(renamed)
+
+
+@pytest.mark.parametrize("filters", random_filters(seed=20), ids=str)
+def test_count_matches_nunique(renamed, bitmaps, filters):
+    assert bitmaps.count(**filters) == filter_data(renamed, **filters)["cod_cia"].nunique()
+
+
+def test_renamed_company_counts_once(renamed, bitmaps):
+    cod_cia, name, _ = RENAMED
+    assert not bitmaps.unique_cias  # Two names for one cod_cia: counted through the cod_cia
+    assert bitmaps.count(companies=["Cia Gamma", name]) == 1
+    assert bitmaps.count() == renamed["cod_cia"].nunique()
+
+
+def test_empty_frame(renamed):
+    assert CompanyBitmaps(renamed.iloc[:0]).count() == 0
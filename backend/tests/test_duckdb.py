@@ -0,0 +1,113 @@
+"""DuckDB backend: SQL over the files must answer as the rollup cube does."""
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.build_artifact import build_artifact
+from app.core import config, loader
+from app.core.loader import DataLoader
+from app.main import app
+
+from tests.conftest import NEW_COMPANY, NEW_PERIOD, NEW_RAMO
+
+pytest.importorskip("duckdb")
+
+FILTERS = [
+    {},
+    {"year": "2024", "quarter": "03"},
+    {"year": "2023", "ramo": "Vida"},
+    {"ramo": NEW_RAMO[0]},
+    {"companies": f"Cia Alfa,{NEW_COMPANY[1]}"},
+    {"from_period": "202304", "to_period": "202403", "ramo": "Autos"},
+]
+REQUESTS = [
+    *(("kpis", f) for f in FILTERS),
+    *(("companies/ranking", {**f, "top_n": 3}) for f in FILTERS),
+    *(("distribution/ramos", f) for f in FILTERS),
+    *(("distribution/subramos", f) for f in FILTERS),
+    *(("timeseries", {"by": by, **f}) for by in ["total", "ramo", "subramo", "company"] for f in FILTERS),
+    ("concentration", {}),
+    ("concentration", {"ramo": "Autos", "metric": "primas_devengadas", "top_n": 2}),
+    ("companies/rank-trajectory", {}),
+    ("companies/rank-trajectory", {"ramo": "Vida", "metric": "siniestralidad", "method": "dense"}),
+    ("companies/rank-trajectory", {"from_period": "202303", "metric": "combined_ratio"}),
+]
+
+
+@pytest.fixture
+def duckdb_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "QUERY_BACKEND", "duckdb")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "file")
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", tmp_path)
+    monkeypatch.setattr(config, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path
+
+
+def test_refresh_moves_off_a_stale_artifact(raw_frames, duckdb_config):
+    raw_history, raw_new = raw_frames
+    raw_history.to_parquet(duckdb_config / config.SUBRAMOS_FILE)
+    build_artifact(str(duckdb_config / config.SUBRAMOS_ARTIFACT_FILE))
+
+    duckdb = DataLoader().get_duckdb()
+    assert duckdb.location.endswith(config.SUBRAMOS_ARTIFACT_FILE)
+    assert not duckdb.refresh()
+
+    # A new quarter published to the source leaves the artifact stale
+    pd.concat([raw_history, raw_new], ignore_index=True).to_parquet(duckdb_config / config.SUBRAMOS_FILE)
+    assert duckdb.refresh()
+    assert duckdb.location.endswith(config.SUBRAMOS_FILE)
+    assert duckdb.periods()[-1] == divmod(NEW_PERIOD, 100)
+    assert duckdb.row_count() == len(raw_history) + len(raw_new)
+
+
+def responses(raw: pd.DataFrame, backend: str, data_dir, monkeypatch) -> dict:
+    """Every request of REQUESTS, in both view modes, answered by a fresh loader over raw."""
+    raw.to_parquet(data_dir / config.SUBRAMOS_FILE)
+    monkeypatch.setattr(config, "QUERY_BACKEND", backend)
+    monkeypatch.setattr(config, "SNAPSHOT_CACHE", False)
+    monkeypatch.setattr(loader, "_data_loader", DataLoader())
+
+    client = TestClient(app)  # No lifespan: no preload or watcher thread
+    answers = {}
+    for endpoint, params in REQUESTS:
+        for view_mode in ["accumulated", "current"]:
+            response = client.get(f"/api/data/{endpoint}", params={**params, "view_mode": view_mode})
+            assert response.status_code == 200, (endpoint, params, response.text)
+            answers[endpoint, str(params), view_mode] = response.json()
+    return answers
+
+
+def approx_floats(value):
+    """value with every float compared approximately (sums may differ in the last bits)."""
+    if isinstance(value, float):
+        return pytest.approx(value, rel=1e-9, abs=1e-9)
+    if isinstance(value, list):
+        return [approx_floats(item) for item in value]
+    if isinstance(value, dict):
+        return {key: approx_floats(item) for key, item in value.items()}
+    return value
+
+
+@pytest.fixture(scope="module")
+def raw_full(raw_frames):
+    raw_history, raw_new = raw_frames
+    return pd.concat([raw_history, raw_new], ignore_index=True)
+
+
+@pytest.mark.parametrize("stored_current", [True, False], ids=["stored_current", "derived_current"])
+@pytest.mark.parametrize("backend", ["pandas", "duckdb"])
+def test_backends_answer_alike(raw_full, prepared, duckdb_config, monkeypatch, backend, stored_current):
+    _, _, full = prepared
+    # Stored _current columns, as the loader derives them, or accumulated metrics only;
+    # the raw rows are already in period order, so preparing keeps them in place
+    assert (full["periodo"].to_numpy() == raw_full["periodo"].to_numpy()).all()
+    with_current = raw_full.assign(
+        **{f"{col}_current": full[f"{col}_current"].to_numpy() for col in config.METRIC_COLUMNS}
+    )
+    expected = responses(with_current, "pandas", duckdb_config, monkeypatch)
+
+    answers = responses(with_current if stored_current else raw_full, backend, duckdb_config, monkeypatch)
+    assert answers.keys() == expected.keys()
+    for key, answer in answers.items():
+        assert answer == approx_floats(expected[key]), key
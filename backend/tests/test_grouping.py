@@ -0,0 +1,116 @@
+"""Integer-coded grouping must give what the matching pandas groupby gives."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.logic import grouping
+from app.logic.grouping import count_distinct, group_ids, group_sum
+
+GROUPINGS = [
+    ["ramo"],
+    ["ramo", "subramo"],
+    ["periodo", "ramo", "company"],
+    ["company", "subramo", "periodo"],
+    ["company", "wide"],  # Key space beyond MAX_BINS: sort-based compaction
+]
+METRICS = ["primas", "siniestros"]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    """Categorical keys with missing values, small- and wide-range int keys and metrics with NaN."""
+    rng = np.random.default_rng(11)
+    n = 5000
+
+    def categorical(values, missing):
+        codes = rng.integers(0, len(values), n)
+        codes[rng.random(n) < missing] = -1
+        return pd.Categorical.from_codes(codes, categories=sorted(values))
+
+    df = pd.DataFrame({
+        "periodo": rng.choice([202301, 202302, 202303, 202304], n),
+        "ramo": categorical(["Autos", "Caucion", "Vida"], 0.1),
+        "subramo": categorical(["Casco", "Colectivo", "Individual", "Judicial", "Unused"], 0.2),
+        "company": categorical([f"Cia {i:03d}" for i in range(40)], 0.05),
+        "wide": rng.integers(0, grouping.MAX_INT_RANGE - 1, n),
+        "primas": rng.uniform(0, 1000, n),
+        "siniestros": rng.uniform(0, 1000, n),
+    })
+    df.loc[rng.random(n) < 0.05, "primas"] = np.nan
+    return df
+
+
+def expected_sum(df: pd.DataFrame, cols, dropna: bool) -> pd.DataFrame:
+    return df.groupby(cols, as_index=False, observed=True, dropna=dropna)[METRICS].sum()
+
+
+@pytest.mark.parametrize("dropna", [True, False])
+@pytest.mark.parametrize("cols", GROUPINGS, ids="-".join)
+def test_group_sum_matches_groupby(frame, cols, dropna):
+    result = group_sum(frame, cols, METRICS, dropna=dropna)
+    pd.testing.assert_frame_equal(result, expected_sum(frame, cols, dropna), check_dtype=False)
+
+
+@pytest.mark.parametrize("dropna", [True, False])
+@pytest.mark.parametrize("cols", GROUPINGS, ids="-".join)
+def test_group_ids_match_ngroup(frame, cols, dropna):
+    groups = group_ids(frame, cols, dropna=dropna)
+    expected = frame.groupby(cols, observed=True, dropna=dropna).ngroup()
+    np.testing.assert_array_equal(groups.ids, expected.fillna(-1).astype(np.int64).to_numpy())
+    assert groups.ngroups == expected.max() + 1
+
+    keys = expected_sum(frame, cols, dropna)[cols]
+    for col in cols:
+        pd.testing.assert_series_equal(pd.Series(groups.keys[col], name=col), keys[col])
+
+
+def test_sort_path_is_taken_for_wide_keys(frame, monkeypatch):
+    # Forcing the sort path on keys that would fit a bincount table gives the same groups
+    expected = group_sum(frame, ["periodo", "ramo", "company"], METRICS, dropna=False)
+    monkeypatch.setattr(grouping, "MAX_BINS", 4)
+    result = group_sum(frame, ["periodo", "ramo", "company"], METRICS, dropna=False)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_every_key_missing(frame):
+    df = frame.assign(ramo=pd.Categorical([None] * len(frame), categories=["Autos"]))
+    assert group_ids(df, ["ramo"]) is None
+    pd.testing.assert_frame_equal(
+        group_sum(df, ["ramo"], METRICS), expected_sum(df, ["ramo"], True), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(
+        group_sum(df, ["ramo"], METRICS, dropna=False), expected_sum(df, ["ramo"], False), check_dtype=False
+    )
+
+
+def test_empty_frame(frame):
+    df = frame.iloc[:0]
+    assert group_ids(df, ["ramo", "company"]) is None
+    result = group_sum(df, ["ramo", "company"], METRICS)
+    assert len(result) == 0 and list(result.columns) == ["ramo", "company", *METRICS]
+    assert count_distinct(df["company"]) == 0
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"ramo": lambda df: df["ramo"].astype(object)},  # Strings: hashed by pandas
+        {"periodo": lambda df: df["periodo"] * 10 ** 6},  # Integer range beyond MAX_INT_RANGE
+        {"primas": lambda df: df["primas"].fillna(0).astype(np.int64)},  # Integer metric
+    ],
+    ids=["object_key", "wide_int_key", "int_metric"],
+)
+@pytest.mark.parametrize("dropna", [True, False])
+def test_pandas_fallback(frame, change, dropna):
+    df = frame.assign(**{col: build(frame) for col, build in change.items()})
+    cols = ["periodo", "ramo"]
+    if list(change) != ["primas"]:
+        assert group_ids(df, cols) is None
+    pd.testing.assert_frame_equal(group_sum(df, cols, METRICS, dropna=dropna), expected_sum(df, cols, dropna))
+
+
+@pytest.mark.parametrize("col", ["ramo", "subramo", "company", "periodo", "wide"])
+def test_count_distinct_matches_nunique(frame, col):
+    assert count_distinct(frame[col]) == frame[col].nunique()
+    assert count_distinct(frame[col].iloc[::97]) == frame[col].iloc[::97].nunique()
+    assert count_distinct(frame[col].astype(object)) == frame[col].nunique()
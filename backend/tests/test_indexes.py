@@ -0,0 +1,58 @@
+"""Inverted indexes must select the rows the copy-and-mask filter selects."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.logic.aggregations import filter_data
+from app.logic.indexes import InvertedIndex, Postings, clip_positions, intersect_sorted
+
+from tests.conftest import RENAMED, random_filters
+
+
+@pytest.mark.parametrize("column", InvertedIndex.COLUMNS)
+def test_postings_lookup_matches_isin(renamed, column):
+    postings = Postings.from_column(renamed[column])
+    values = renamed[column].dropna().unique().tolist()
+    for chosen in [values[:1], values[1:3], values, ["missing value"], []]:
+        expected = np.flatnonzero(renamed[column].isin(chosen).to_numpy())
+        np.testing.assert_array_equal(postings.lookup(chosen), expected, err_msg=str(chosen))
+
+
+def test_postings_skip_missing_values(renamed):
+    postings = Postings.from_column(renamed["ramo_nombre_corto"])
+    assert renamed["ramo_nombre_corto"].isna().any()
+    covered = np.concatenate([postings.lookup([key]) for key in postings.keys])
+    assert len(covered) == renamed["ramo_nombre_corto"].notna().sum()
+    assert postings.offsets[0] == renamed["ramo_nombre_corto"].isna().sum()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_intersect_sorted_matches_intersect1d(seed):
+    rng = np.random.default_rng(seed)
+    a = np.unique(rng.integers(0, 500, rng.integers(0, 200)))
+    b = np.unique(rng.integers(0, 500, rng.integers(0, 50)))
+    np.testing.assert_array_equal(intersect_sorted(a, b), np.intersect1d(a, b))
+    np.testing.assert_array_equal(intersect_sorted(b, a), np.intersect1d(a, b))
+
+
+def test_clip_positions_matches_mask():
+    positions = np.array([0, 3, 4, 9, 12, 20])
+    for rows in [slice(0, 21), slice(3, 12), slice(5, 9), slice(21, 30), slice(0, 0)]:
+        expected = positions[(positions >= rows.start) & (positions < rows.stop)]
+        np.testing.assert_array_equal(clip_positions(positions, rows), expected)
+
+
+@pytest.mark.parametrize("filters", random_filters(seed=11), ids=str)
+def test_indexed_filter_matches_mask(renamed, filters):
+    index = InvertedIndex(renamed)
+    expected = filter_data(renamed, **filters)
+    pd.testing.assert_frame_equal(filter_data(renamed, index=index, **filters), expected)
+
+
+def test_renamed_company_is_selected_by_either_name(renamed):
+    index = InvertedIndex(renamed)
+    cod_cia, name, periodo = RENAMED
+    rows = filter_data(renamed, index=index, companies=[name])
+    assert (rows["cod_cia"] == cod_cia).all() and (rows["periodo"] >= periodo).all()
+    both = filter_data(renamed, index=index, companies=[name, "Cia Gamma"])
+    assert set(both.index) == set(renamed.index[renamed["cod_cia"] == cod_cia])
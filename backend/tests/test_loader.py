@@ -0,0 +1,176 @@
+"""DataLoader: reading, preparing and snapshotting the subramos source."""
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.core import config
+from app.core.loader import DataLoader
+from app.logic.cube import RollupCube
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_snapshots_build_the_cube_without_importing_it(raw_frames, tmp_path):
+    raw_history, _ = raw_frames
+    raw_history.to_parquet(tmp_path / "subramos_historico.parquet")
+    # A fresh interpreter that imports only the loader, as a script would
+    script = (
+        "from app.core.loader import DataLoader\n"
+        "snapshot = DataLoader().get_snapshot()\n"
+        "snapshot.warm()\n"
+        "assert snapshot.cached_names == ['rollup_cube'], snapshot.cached_names\n"
+        "snapshot.derived('rollup_cube').totals()\n"
+    )
+    env = {"LOCAL_DATA_DIR": str(tmp_path), "SNAPSHOT_CACHE": "false", "QUERY_BACKEND": "pandas", "DATA_LAYOUT": "file"}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_cube_is_shared_through_the_cache(raw_frames, tmp_path, monkeypatch):
+    raw_history, _ = raw_frames
+    raw_history.to_parquet(tmp_path / config.SUBRAMOS_FILE)
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "QUERY_BACKEND", "pandas")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "file")
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", tmp_path)
+    monkeypatch.setattr(config, "SNAPSHOT_CACHE", True)
+    monkeypatch.setattr(config, "CACHE_DIR", tmp_path / "cache")
+
+    first = DataLoader().get_snapshot()  # Builds and writes the cube
+    second = DataLoader().get_snapshot()  # Another worker: maps it
+    assert second.warm_start
+    assert sorted(path.name.split("-")[0] for path in (tmp_path / "cache").glob("rollup_cube_*.arrow")) == sorted(
+        f"rollup_cube_{name}" for name in RollupCube.TABLES
+    )
+
+    built = RollupCube(second.df)
+    for cube in (first.derived("rollup_cube"), second.derived("rollup_cube")):
+        for name, rollup in built.rollups.items():
+            pd.testing.assert_frame_equal(cube.rollups[name].df, rollup.df, obj=name)
+        for name, rankings in built.rankings.items():
+            assert cube.rankings[name].cells == rankings.cells
+            for column, order in rankings.orders.items():
+                np.testing.assert_array_equal(cube.rankings[name].orders[column], order)
+        for filters in [{}, {"year": 2024, "trimestre": 2}, {"ramo": "Vida", "companies": ["Cia Alfa"]}]:
+            assert cube.totals(**filters) == built.totals(**filters)
+            pd.testing.assert_frame_equal(
+                cube.aggregate(["cod_cia", "nombre_corto", "ramo_nombre_corto"], **filters),
+                built.aggregate(["cod_cia", "nombre_corto", "ramo_nombre_corto"], **filters),
+            )
+        np.testing.assert_array_equal(
+            cube.top_companies("primas_emitidas", 2, year=2024, trimestre=1, ramo="Autos"),
+            built.top_companies("primas_emitidas", 2, year=2024, trimestre=1, ramo="Autos"),
+        )
+
+
+def shift_reference(raw: pd.DataFrame) -> pd.DataFrame:
+    """Current metrics of raw rows (in period order) by a groupby shift within each fiscal year."""
+    periodo = raw["periodo"]
+    fiscal_year = periodo // 100 - (periodo % 100 < config.FISCAL_YEAR_START_TRIMESTRE)
+    keys = [raw["cod_cia"], raw["ramo_nombre_corto"], raw["subramo_nombre_corto"], fiscal_year]
+    grouped = raw.groupby(keys, dropna=False, sort=False)
+    return pd.DataFrame({
+        f"{col}_current": raw[col] - grouped[col].shift().fillna(0) for col in config.METRIC_COLUMNS
+    })
+
+
+def assert_current_matches(df: pd.DataFrame, raw: pd.DataFrame):
+    assert (df["periodo"].to_numpy() == raw["periodo"].to_numpy()).all()
+    expected = shift_reference(raw).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df[expected.columns].reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_derived_current_metrics_match_shift(raw_frames, prepared):
+    raw_history, raw_new = raw_frames
+    history, _, full = prepared
+    assert not any(col.endswith("_current") for col in raw_history.columns)
+    assert_current_matches(history, raw_history)
+    assert_current_matches(full, pd.concat([raw_history, raw_new], ignore_index=True))
+
+
+def test_derived_current_metrics_skip_a_missing_quarter(raw_frames):
+    raw_history, _ = raw_frames
+    # 202304 is the second quarter of the fiscal year starting at 202303
+    raw = raw_history[raw_history["periodo"] != 202304].reset_index(drop=True)
+    assert_current_matches(DataLoader()._prepare_subramos(raw.copy()), raw)
+
+
+def test_derived_current_metrics_in_the_file_layout(raw_frames, tmp_path, monkeypatch):
+    raw_history, _ = raw_frames
+    raw_history.to_parquet(tmp_path / config.SUBRAMOS_FILE)
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "QUERY_BACKEND", "pandas")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "file")
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", tmp_path)
+    monkeypatch.setattr(config, "SNAPSHOT_CACHE", False)
+    assert_current_matches(DataLoader().get_snapshot().df, raw_history)
+
+
+def test_derived_current_metrics_in_a_partitioned_range(raw_frames, tmp_path, monkeypatch):
+    raw_history, _ = raw_frames
+    raw = raw_history.assign(year=raw_history["periodo"] // 100, trimestre=raw_history["periodo"] % 100)
+    raw.drop(columns="periodo").to_parquet(tmp_path / config.SUBRAMOS_DATASET, partition_cols=["year", "trimestre"])
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "QUERY_BACKEND", "pandas")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "partitioned")
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", tmp_path)
+
+    # Starts at the second quarter of a fiscal year: differenced against its first
+    df = DataLoader().get_snapshot_for(from_period=202304, to_period=202401).df
+    expected = shift_reference(raw_history)[raw_history["periodo"].between(202304, 202401).to_numpy()]
+    pd.testing.assert_frame_equal(df[expected.columns], expected.reset_index(drop=True), check_dtype=False)
+
+
+def csv_source(raw: pd.DataFrame, path: Path) -> Path:
+    """raw as a csv with an extra column the loader does not know."""
+    raw.assign(notas="sin notas").to_csv(path, index=False)
+    return path
+
+
+def baseline_csv(path: Path, columns=None) -> pd.DataFrame:
+    """The csv read by pandas alone and prepared, as the loader read it before typed parsing."""
+    header = pd.read_csv(path, nrows=0).columns
+    return DataLoader()._prepare_subramos(pd.read_csv(path, usecols=[c for c in header if c in (columns or header)]))
+
+
+def test_typed_csv_read_matches_pandas(raw_frames, tmp_path, monkeypatch):
+    raw_history, _ = raw_frames
+    path = csv_source(raw_history, tmp_path / "subramos.csv")
+    monkeypatch.setattr(config, "CSV_BLOCK_SIZE", 4096)  # Several blocks, each encoded on its own
+    columns = ["periodo", "cod_cia", "nombre_corto", "ramo_nombre_corto", "primas_emitidas", "no_existe"]
+
+    for requested in [None, columns]:
+        df = DataLoader()._read_csv(str(path), requested)
+        header = [c for c in [*raw_history.columns, "notas"] if requested is None or c in requested]
+        assert list(df.columns) == header
+        assert isinstance(df["nombre_corto"].dtype, pd.CategoricalDtype)  # Typed: dictionary-encoded
+        assert df["primas_emitidas"].dtype == np.float64
+
+        result = DataLoader()._prepare_subramos(df)
+        pd.testing.assert_frame_equal(result, baseline_csv(path, requested))
+
+
+def test_csv_falls_back_to_pandas_on_a_bad_value(raw_frames, tmp_path, monkeypatch):
+    raw_history, _ = raw_frames
+    monkeypatch.setattr(config, "CSV_BLOCK_SIZE", 4096)
+    raw = raw_history.astype({"primas_emitidas": object})
+    raw.loc[len(raw) - 1, "primas_emitidas"] = "n/d"  # Past the first block: after some batches were read
+    path = csv_source(raw, tmp_path / "subramos.csv")
+
+    with path.open("rb") as f:
+        sources = [str(path), f]  # A path, or a file object (as from S3) rewound for pandas
+        frames = [DataLoader()._read_csv(source, config.SUBRAMOS_COLUMNS) for source in sources]
+
+    for df in frames:
+        # Read by pandas: untyped strings, every row
+        assert df["primas_emitidas"].dtype == object and df["nombre_corto"].dtype == object
+        assert len(df) == len(raw)
+
+        result = DataLoader()._prepare_subramos(df)
+        pd.testing.assert_frame_equal(result, baseline_csv(path, config.SUBRAMOS_COLUMNS))
+        assert result["primas_emitidas"].iloc[-1] == 0  # Coerced, then filled
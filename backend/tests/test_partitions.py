@@ -0,0 +1,135 @@
+"""Partitioned layout: selections stacked from resident partitions must match the file layout."""
+import asyncio
+
+import pandas as pd
+import pytest
+from fastapi import Response
+
+from app.core import config, loader
+from app.core.loader import DataLoader
+from app.core.partitions import PartitionedSubramos
+
+from tests.conftest import HISTORY_PERIODS
+
+SELECTIONS = [
+    {"year": 2023},
+    {"year": 2024, "trimestre": 2},
+    {"from_period": 202304, "to_period": 202402},  # Starts mid fiscal year
+    {"from_period": 202302},
+    {"to_period": 202302},
+    {},
+    {"year": 2030},
+]
+
+
+@pytest.fixture
+def write_partitions(raw_frames, tmp_path):
+    """Write the raw history as year=/trimestre= partitions, without periodo."""
+    raw_history, _ = raw_frames
+    df = raw_history.assign(year=raw_history["periodo"] // 100, trimestre=raw_history["periodo"] % 100)
+    location = tmp_path / config.SUBRAMOS_DATASET
+    df.drop(columns="periodo").to_parquet(location, partition_cols=["year", "trimestre"])
+    return location
+
+
+def partitions(location, max_resident: int = 8) -> PartitionedSubramos:
+    return PartitionedSubramos(str(location), DataLoader()._prepare_subramos, max_resident=max_resident)
+
+
+def expected_rows(history: pd.DataFrame, year=None, trimestre=None, from_period=None, to_period=None) -> pd.DataFrame:
+    """Rows of the file-layout frame in the selection, without unused categories."""
+    keep = pd.Series(True, index=history.index)
+    if year is not None:
+        keep &= history["year"] == year
+    if trimestre is not None:
+        keep &= history["trimestre"] == trimestre
+    if from_period is not None:
+        keep &= history["periodo"] >= from_period
+    if to_period is not None:
+        keep &= history["periodo"] <= to_period
+    df = history[keep].reset_index(drop=True)
+    for col in config.DIMENSION_COLUMNS:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+@pytest.mark.parametrize("max_resident", [8, 2])
+def test_selections_match_file_layout(prepared, write_partitions, max_resident):
+    history, _, _ = prepared
+    store = partitions(write_partitions, max_resident)
+    for selection in SELECTIONS:
+        expected = expected_rows(history, **selection)
+        df = store.get(**selection).df
+        pd.testing.assert_frame_equal(df[expected.columns], expected, obj=str(selection))
+
+
+def test_overlapping_selections_share_partitions(write_partitions, monkeypatch):
+    store = partitions(write_partitions)
+    scanned = []
+    scan = store._scan
+    monkeypatch.setattr(store, "_scan", lambda keys: scanned.append(keys) or scan(keys))
+
+    store.get(year=2023)
+    frame = store._resident[(2023, 3)]
+    store.get(from_period=202303, to_period=202402)
+
+    # Only the 2024 partitions are missing; 2023 frames are reused, not copied
+    assert [p for p in scanned[-1] if p[0] == 2024] == [(2024, 1), (2024, 2)]
+    assert store._resident[(2023, 3)] is frame
+    assert store.resident == [(2023, 1), (2023, 2), (2023, 3), (2023, 4), (2024, 1), (2024, 2)]
+
+    # A selection already kept is served without a scan
+    calls = len(scanned)
+    assert store.get(year=2023) is store.get(year=2023)
+    assert len(scanned) == calls
+
+
+def test_resident_partitions_are_capped(write_partitions):
+    store = partitions(write_partitions, max_resident=3)
+    store.get()
+    assert len(store.resident) == 3
+    assert store.selections == {}  # The whole archive is built, not kept
+
+    store.get(year=2024)
+    assert store.resident == [(2023, 4), (2024, 1), (2024, 2)]
+    assert list(store.selections) == [((2024, 1), (2024, 2))]
+
+    store.get(year=2023, trimestre=4)
+    store.get(year=2023, trimestre=3)
+    # Evicting 2024-01 drops the selection that needs it
+    assert store.resident == [(2024, 2), (2023, 4), (2023, 3)]
+    assert list(store.selections) == [((2023, 4),), ((2023, 3),)]
+
+
+def test_refresh_drops_resident_partitions(write_partitions):
+    store = partitions(write_partitions)
+    store.get(year=2024)
+    assert store.refresh(stamp="changed")
+    assert store.resident == [] and store.selections == {}
+    assert store.periods() == [(p // 100, p % 100) for p in HISTORY_PERIODS]
+
+
+def test_ready_reports_resident_partitions(write_partitions, monkeypatch):
+    from app.main import ready
+
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "QUERY_BACKEND", "pandas")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "partitioned")
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", write_partitions.parent)
+    monkeypatch.setattr(loader, "_data_loader", DataLoader())
+
+    data_loader = loader.get_data_loader()
+    data_loader.ensure_loaded()
+    snapshot = data_loader.get_snapshot_for(year=2024)
+
+    body = asyncio.run(ready(Response()))
+    partitions = data_loader.get_partitions()
+    assert body.status == "ready"
+    assert body.version == partitions.version == partitions.stamp()
+    assert body.resident_partitions == ["202401", "202402"]
+    assert body.rows == len(snapshot.df)
+    [selection] = body.selections
+    assert selection.partitions == ["202401", "202402"]
+    assert selection.version == snapshot.version
+    assert selection.rows == len(snapshot.df)
+    assert selection.warm_caches == snapshot.cached_names == ["rollup_cube"]
@@ -0,0 +1,82 @@
+"""A query plan must give every aggregate as if each were computed on its own."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.logic.aggregations import aggregate_by, filter_data
+from app.logic.cube import RollupCube
+from app.logic.plan import QueryPlan
+from app.logic.ratios import add_ratios
+
+from tests.conftest import COMPANIES, RENAMED, random_filters
+
+# (name, group columns) of the aggregates planned together, as the ranking and dashboard plan them
+AGGREGATES = [
+    ("bars", ["cod_cia", "nombre_corto", "ramo_nombre_corto"]),
+    ("subramo_bars", ["cod_cia", "nombre_corto", "subramo_nombre_corto"]),
+    ("companies", ["cod_cia", "nombre_corto"]),
+    ("ramos", ["ramo_nombre_corto"]),
+]
+
+
+@pytest.fixture(scope="module")
+def cube(renamed):
+    return RollupCube(renamed)
+
+
+def plan(cube: RollupCube, names, view_mode: str, **filters) -> QueryPlan:
+    query = QueryPlan(cube, view_mode=view_mode, **filters)
+    for name, group_cols in AGGREGATES:
+        if name in names:
+            query.add(name, group_cols)
+    return query
+
+
+@pytest.mark.parametrize("names", [["bars", "companies"], ["subramo_bars", "companies", "ramos"]], ids="+".join)
+@pytest.mark.parametrize("view_mode", ["accumulated", "current"])
+@pytest.mark.parametrize("filters", random_filters(seed=14, count=30), ids=str)
+def test_execute_matches_separate_aggregates(renamed, cube, filters, view_mode, names):
+    result = plan(cube, names, view_mode, **filters).execute()
+    rows = filter_data(renamed, **filters)
+    for name, group_cols in AGGREGATES:
+        if name in names:
+            expected = add_ratios(aggregate_by(rows, group_cols, view_mode=view_mode)).reset_index(drop=True)
+            pd.testing.assert_frame_equal(result[name][expected.columns], expected, obj=name)
+
+
+@pytest.mark.parametrize("filters", random_filters(seed=15, count=30), ids=str)
+def test_positions_in_selects_the_rows_of_each_group(cube, filters):
+    result = plan(cube, ["bars", "companies"], "accumulated", **filters).execute()
+    companies, finest = result["companies"], result.finest
+    if len(companies) == 0:
+        return
+
+    # Some companies, in an order of their own (as ranked)
+    positions = np.random.default_rng(len(companies)).permutation(len(companies))[: max(1, len(companies) // 2)]
+    rows, owners = result.positions_in("companies", positions)
+
+    expected_rows, expected_owners = [], []
+    for owner, position in enumerate(positions):
+        cod_cia, name = companies[["cod_cia", "nombre_corto"]].iloc[position]
+        matches = np.flatnonzero(((finest["cod_cia"] == cod_cia) & (finest["nombre_corto"] == name)).to_numpy())
+        expected_rows.extend(matches)
+        expected_owners.extend([owner] * len(matches))
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(owners, expected_owners)
+
+
+def test_company_totals_keep_rows_without_a_ramo(renamed, cube):
+    # Rows without a ramo have no bar, but count toward their company's total
+    filters = {"year": 2023}
+    assert filter_data(renamed, **filters)["ramo_nombre_corto"].isna().any()
+    result = plan(cube, ["bars", "companies"], "accumulated", **filters).execute()
+    bars_total = result["bars"]["primas_emitidas"].sum()
+    assert result["companies"]["primas_emitidas"].sum() > bars_total
+    assert result.finest["ramo_nombre_corto"].notna().all()
+
+
+def test_renamed_company_is_two_companies(renamed, cube):
+    cod_cia, name, _ = RENAMED
+    result = plan(cube, ["bars", "companies"], "accumulated").execute()
+    named = result["companies"][result["companies"]["cod_cia"] == cod_cia]
+    assert sorted(named["nombre_corto"]) == sorted([COMPANIES[cod_cia], name])
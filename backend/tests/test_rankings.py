@@ -0,0 +1,114 @@
+"""Grouped market shares and ranks must match computing them one market at a time."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.logic.aggregations import aggregate_by
+from app.logic.rankings import calculate_market_share, grouped_ranks, market_concentration
+
+MARKET = ["periodo", "ramo_nombre_corto"]
+
+
+@pytest.fixture(scope="module")
+def by_market(renamed):
+    """One row per company and (periodo, ramo) market, as the concentration endpoint aggregates."""
+    return aggregate_by(renamed, [*MARKET, "cod_cia", "nombre_corto"])
+
+
+@pytest.fixture(scope="module")
+def crowded():
+    """Markets of up to 30 companies, with tied and negative values and rows without a ramo."""
+    rng = np.random.default_rng(22)
+    n = 600
+    ramo = pd.Categorical.from_codes(rng.integers(-1, 4, n), categories=["Autos", "Caucion", "Incendio", "Vida"])
+    df = pd.DataFrame({
+        "periodo": rng.choice([202303, 202304, 202401], n),
+        "ramo_nombre_corto": ramo,
+        "cod_cia": rng.integers(1, 31, n),
+        "primas_emitidas": rng.integers(-5, 40, n).astype(float) * 100,
+    })
+    df = df.drop_duplicates([*MARKET, "cod_cia"]).reset_index(drop=True)
+    df["nombre_corto"] = "Cia " + df["cod_cia"].astype(str)
+    return df
+
+
+@pytest.fixture(scope="module", params=["by_market", "crowded"])
+def frame(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_concentration_matches_market_share(frame):
+    metric = "primas_emitidas"
+    markets, companies = market_concentration(frame, MARKET, metric=metric)
+    expected_keys = frame.groupby(MARKET, observed=True).size().reset_index()[MARKET]
+    pd.testing.assert_frame_equal(markets[MARKET], expected_keys)
+
+    for market in markets.itertuples(index=False):
+        rows = frame[(frame["periodo"] == market.periodo) & (frame["ramo_nombre_corto"] == market.ramo_nombre_corto)]
+        expected = calculate_market_share(rows, metric).sort_values(metric, ascending=False, kind="stable")
+        result = companies.iloc[market.start:market.stop]
+        np.testing.assert_array_equal(result["cod_cia"], expected["cod_cia"])
+        np.testing.assert_array_equal(result["market_share"], expected["market_share"])
+
+        total = expected[metric].sum()
+        shares = expected[metric] / total * 100 if total > 0 else expected[metric] * 0
+        assert market.total == pytest.approx(expected[metric].sum())
+        assert market.companies == len(rows)
+        assert market.hhi == pytest.approx((shares ** 2).sum())
+        assert market.cr4 == pytest.approx(shares.head(4).sum())
+        assert market.cr10 == pytest.approx(shares.head(10).sum())
+
+
+def test_rows_without_a_market_are_dropped(crowded):
+    markets, companies = market_concentration(crowded, MARKET)
+    assert crowded["ramo_nombre_corto"].isna().any()
+    assert len(companies) == crowded["ramo_nombre_corto"].notna().sum()
+    assert markets["stop"].iloc[-1] == len(companies)
+
+
+def test_non_positive_total_has_no_shares():
+    df = pd.DataFrame({
+        "periodo": [202401] * 5,
+        "ramo": ["Autos", "Autos", "Vida", "Vida", "Vida"],
+        "primas_emitidas": [300.0, 100.0, -50.0, 20.0, 0.0],
+    })
+    markets, companies = market_concentration(df, ["periodo", "ramo"])
+    vida = companies[companies["ramo"] == "Vida"]
+    assert (vida["market_share"] == 0).all()
+    assert (calculate_market_share(df[df["ramo"] == "Vida"])["market_share"] == 0).all()
+    np.testing.assert_array_equal(markets["hhi"], [75.0 ** 2 + 25.0 ** 2, 0.0])
+    np.testing.assert_array_equal(markets["cr4"], [100.0, 0.0])
+    np.testing.assert_array_equal(companies["primas_emitidas"], [300.0, 100.0, 20.0, 0.0, -50.0])
+
+
+@pytest.mark.parametrize("method", ["min", "dense"])
+@pytest.mark.parametrize("market_cols", [["periodo"], MARKET], ids="-".join)
+def test_grouped_ranks_match_groupby_rank(frame, market_cols, method):
+    ranks = grouped_ranks(frame, market_cols)[method]
+    expected = frame.groupby(market_cols, observed=True)["primas_emitidas"].rank(ascending=False, method=method)
+    np.testing.assert_array_equal(ranks, expected.fillna(0).astype(np.int64).to_numpy())
+
+
+def test_ties_share_a_rank(crowded):
+    ranks = grouped_ranks(crowded, MARKET)
+    df = crowded.assign(min=ranks["min"], dense=ranks["dense"])[crowded["ramo_nombre_corto"].notna()]
+    tied = df.groupby([*MARKET, "primas_emitidas"], observed=True)
+    assert (tied.size() > 1).any()
+    assert (tied["min"].nunique() == 1).all() and (tied["dense"].nunique() == 1).all()
+    # Dense ranks leave no gaps, min ranks skip past each tie
+    assert (df.groupby(MARKET, observed=True)["dense"].max() == tied.size().groupby(MARKET, observed=True).size()).all()
+
+
+def test_missing_values_rank_last(crowded):
+    df = crowded.assign(primas_emitidas=crowded["primas_emitidas"].where(crowded.index % 7 != 0))
+    ranks = grouped_ranks(df, MARKET)
+    valid = df["ramo_nombre_corto"].notna().to_numpy()
+    assert (ranks["min"][~valid] == 0).all() and (ranks["dense"][~valid] == 0).all()
+
+    expected = df.groupby(MARKET, observed=True)["primas_emitidas"].rank(ascending=False, method="min")
+    present = expected.notna().to_numpy()
+    np.testing.assert_array_equal(ranks["min"][present], expected[present].astype(np.int64))
+    missing = valid & ~present
+    counts = df.groupby(MARKET, observed=True)["primas_emitidas"].count()
+    markets = pd.MultiIndex.from_frame(df.loc[missing, MARKET])
+    np.testing.assert_array_equal(ranks["min"][missing], counts.reindex(markets).to_numpy() + 1)
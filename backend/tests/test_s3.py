@@ -0,0 +1,76 @@
+"""S3 reads, against a moto server, must give what reading the same file locally gives."""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.core import config
+from app.core.loader import DataLoader
+
+moto_server = pytest.importorskip("moto.server")
+boto3 = pytest.importorskip("boto3")
+pytest.importorskip("s3fs")
+
+BUCKET = "seguros"
+PREFIX = "data/"
+ROW_GROUP_SIZE = 6
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(endpoint, raw_frames, tmp_path, monkeypatch):
+    """The raw history as a multi-row-group parquet, locally and in the bucket."""
+    raw_history, _ = raw_frames
+    path = tmp_path / config.SUBRAMOS_FILE
+    pq.write_table(pa.Table.from_pandas(raw_history, preserve_index=False), path, row_group_size=ROW_GROUP_SIZE)
+    assert pq.ParquetFile(path).metadata.num_row_groups > 4
+
+    client = boto3.client(
+        "s3", endpoint_url=endpoint, region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    client.create_bucket(Bucket=BUCKET)
+    client.upload_file(str(path), BUCKET, PREFIX + config.SUBRAMOS_FILE)
+
+    monkeypatch.setattr(config, "DATA_SOURCE", "s3")
+    monkeypatch.setattr(config, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(config, "S3_PREFIX", PREFIX)
+    monkeypatch.setattr(config, "S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setattr(config, "AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setattr(config, "AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setattr(config, "S3_MAX_CONCURRENCY", 4)  # Fewer workers than row groups
+    yield path
+    client.delete_object(Bucket=BUCKET, Key=PREFIX + config.SUBRAMOS_FILE)
+    client.delete_bucket(Bucket=BUCKET)
+
+
+@pytest.mark.parametrize("columns", [None, ["periodo", "nombre_corto", "primas_emitidas", "no_existe"]], ids=str)
+def test_row_groups_are_read_in_file_order(s3, raw_frames, columns):
+    raw_history, _ = raw_frames
+    loader = DataLoader()
+    df = loader._read_parquet_s3(loader._s3_path(config.SUBRAMOS_FILE), columns)
+
+    pd.testing.assert_frame_equal(df, loader._read_parquet(str(s3), columns))
+    # Row group by row group, as written
+    for start in range(0, len(raw_history), ROW_GROUP_SIZE):
+        rows = slice(start, start + ROW_GROUP_SIZE)
+        assert (df["periodo"].iloc[rows].to_numpy() == raw_history["periodo"].iloc[rows].to_numpy()).all()
+        assert list(df["nombre_corto"].iloc[rows]) == list(raw_history["nombre_corto"].iloc[rows])
+
+
+def test_snapshot_matches_the_local_one(s3, monkeypatch):
+    monkeypatch.setattr(config, "QUERY_BACKEND", "pandas")
+    monkeypatch.setattr(config, "DATA_LAYOUT", "file")
+    monkeypatch.setattr(config, "SNAPSHOT_CACHE", False)
+    df = DataLoader().get_snapshot().df
+
+    monkeypatch.setattr(config, "DATA_SOURCE", "local")
+    monkeypatch.setattr(config, "LOCAL_DATA_DIR", s3.parent)
+    pd.testing.assert_frame_equal(df, DataLoader().get_snapshot().df)
@@ -0,0 +1,64 @@
+"""Time series growth rates, across missing periods and the fiscal year start."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core import config
+from app.logic.cube import RollupCube
+from app.logic.timeseries import TimeSeries
+
+from tests.conftest import HISTORY_PERIODS
+
+
+@pytest.fixture(scope="module")
+def cube(prepared):
+    history, _, _ = prepared
+    return RollupCube(history)
+
+
+def series(cube: RollupCube, view_mode: str) -> TimeSeries:
+    data = cube.aggregate(["periodo", "ramo_nombre_corto"], view_mode=view_mode)
+    return TimeSeries.pivot(
+        data, "ramo_nombre_corto", np.array(HISTORY_PERIODS), accumulated=view_mode == "accumulated"
+    )
+
+
+def test_accumulated_qoq_stops_at_the_fiscal_year_start(cube):
+    accumulated = series(cube, "accumulated")
+    values, qoq = accumulated.values["primas_emitidas"], accumulated.rates["primas_emitidas"]["qoq"]
+    periods = accumulated.periods
+
+    start = periods % 100 == config.FISCAL_YEAR_START_TRIMESTRE
+    assert start.any()
+    # The quarter before the fiscal year start closes the previous year: no growth against it
+    assert np.isnan(qoq[start]).all()
+    # Within the fiscal year, growth of the accumulated values over the quarter before
+    within = np.flatnonzero(~start)[1:]
+    np.testing.assert_allclose(qoq[within], values[within] / values[within - 1] - 1)
+
+
+def test_current_qoq_crosses_the_fiscal_year_start(cube):
+    current = series(cube, "current")
+    values, qoq = current.values["primas_emitidas"], current.rates["primas_emitidas"]["qoq"]
+    rows = np.arange(1, len(current.periods))
+    np.testing.assert_allclose(qoq[rows], values[rows] / values[rows - 1] - 1)
+
+
+def test_fiscal_year_start_survives_select_and_total(cube):
+    accumulated = series(cube, "accumulated")
+    start = accumulated.periods % 100 == config.FISCAL_YEAR_START_TRIMESTRE
+
+    total = accumulated.total(list(accumulated.entities))
+    assert total.accumulated and np.isnan(total.rates["primas_emitidas"]["qoq"][start]).all()
+
+    selected = accumulated.select(year=2024)
+    start = selected.periods % 100 == config.FISCAL_YEAR_START_TRIMESTRE
+    assert selected.accumulated and np.isnan(selected.rates["primas_emitidas"]["qoq"][start]).all()
+
+
+def test_missing_period_gives_no_growth():
+    data = pd.DataFrame({"periodo": [202301, 202303, 202304], "primas_emitidas": [1.0, 2.0, 3.0]})
+    result = TimeSeries.pivot(data, None, data["periodo"].to_numpy())
+    qoq = result.rates["primas_emitidas"]["qoq"][:, 0]
+    assert np.isnan(qoq[:2]).all()  # No 202212, no 202302
+    assert qoq[2] == pytest.approx(0.5)
@@ -6,9 +6,7 @@ import { KPIRow } from '@/components/kpis/KPIRow';
 import { MarketBarChart } from '@/components/charts/MarketBarChart';
 import { RamoDonutChart } from '@/components/charts/RamoDonutChart';
 import { useFilters } from '@/hooks/useFilters';
-import { useKPIs } from '@/hooks/useKPIs';
-import { useCompanyRanking } from '@/hooks/useCompanyRanking';
-import { useDistribution } from '@/hooks/useDistribution';
+import { useDashboard } from '@/hooks/useDashboard';
 import type { FilterParams } from '@/types/api';
 
 function App() {
@@ -40,17 +38,11 @@ function App() {
     view_mode: viewMode,
   };
 
-  // Fetch data
-  const { data: kpis, isLoading: kpisLoading } = useKPIs(queryParams);
-  const { data: ranking, isLoading: rankingLoading } = useCompanyRanking({
+  // Fetch KPIs, ranking and distribution in a single request
+  const { data: dashboard, isLoading: dashboardLoading } = useDashboard({
     ...queryParams,
     top_n: topN,
   });
-  const distributionType = ramo ? 'subramos' : 'ramos';
-  const { data: distribution, isLoading: distributionLoading } = useDistribution(
-    queryParams,
-    distributionType
-  );
 
   const hasRamoFilter = Boolean(ramo);
 
@@ -80,15 +72,15 @@ function App() {
           />
 
           {/* KPIs */}
-          <KPIRow data={kpis} isLoading={kpisLoading} />
+          <KPIRow data={dashboard?.kpis} isLoading={dashboardLoading} />
 
           {/* Charts */}
           <div className="grid grid-cols-1 lg:grid-cols-12 gap-6">
             {/* Bar Chart - 8 columns on large screens */}
             <div className="lg:col-span-8">
               <MarketBarChart
-                data={ranking?.companies}
-                isLoading={rankingLoading}
+                data={dashboard?.ranking.companies}
+                isLoading={dashboardLoading}
                 hasRamoFilter={hasRamoFilter}
                 topN={topN}
                 onTopNChange={setTopN}
@@ -98,8 +90,8 @@ function App() {
             {/* Donut Chart - 4 columns on large screens */}
             <div className="lg:col-span-4">
               <RamoDonutChart
-                data={distribution?.items}
-                isLoading={distributionLoading}
+                data={dashboard?.distribution.items}
+                isLoading={dashboardLoading}
                 hasRamoFilter={hasRamoFilter}
               />
             </div>
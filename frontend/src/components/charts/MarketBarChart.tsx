@@ -51,16 +51,12 @@ export function MarketBarChart({
       companyData.set(category, currentValue + item.primas_emitidas);
     });
 
-    // Calculate company totals for sorting
-    const companyTotals: Array<{ company: string; total: number }> = [];
-    companyMap.forEach((categories, company) => {
-      let total = 0;
-      categories.forEach((value) => (total += value));
-      companyTotals.push({ company, total });
-    });
-
-    // Sort by total descending
-    companyTotals.sort((a, b) => b.total - a.total);
+    // Keep the server's ranking order (by sort_by, not necessarily primas)
+    const companyRanks = new Map<string, number>();
+    data.forEach((item) => companyRanks.set(item.nombre_corto, item.rank));
+    const rankedCompanies = Array.from(companyMap.keys()).sort(
+      (a, b) => companyRanks.get(a)! - companyRanks.get(b)!
+    );
 
     // Get all categories sorted by total
     const categoryTotals = new Map<string, number>();
@@ -78,7 +74,7 @@ export function MarketBarChart({
       .map(([name]) => name);
 
     // Build chart data
-    const chartData: BarDataItem[] = companyTotals.map(({ company }) => {
+    const chartData: BarDataItem[] = rankedCompanies.map((company) => {
       const categories = companyMap.get(company)!;
       const item: BarDataItem = { company: truncate(company, 14) };
 
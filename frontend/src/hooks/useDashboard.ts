@@ -0,0 +1,12 @@
+import { useQuery } from '@tanstack/react-query';
+import { getDashboard } from '@/services/api';
+import type { FilterParams } from '@/types/api';
+
+// KPIs, ranking and distribution in one request, filtered once on the server
+export function useDashboard(params: FilterParams & { top_n?: number }) {
+  return useQuery({
+    queryKey: ['dashboard', params],
+    queryFn: () => getDashboard(params),
+    enabled: Boolean((params.year && params.quarter) || params.from_period || params.to_period),
+  });
+}
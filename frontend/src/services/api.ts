@@ -3,7 +3,15 @@ import type {
   FilterOptions,
   KPIResponse,
   CompanyRankingResponse,
+  RankingParams,
   DistributionResponse,
+  DashboardResponse,
+  TimeSeriesResponse,
+  TimeSeriesParams,
+  ConcentrationResponse,
+  ConcentrationParams,
+  RankTrajectoryResponse,
+  RankTrajectoryParams,
   FilterParams,
   HealthResponse,
 } from '@/types/api';
@@ -47,7 +55,7 @@ export async function getKPIs(params: FilterParams): Promise<KPIResponse> {
 }
 
 export async function getCompanyRanking(
-  params: FilterParams & { top_n?: number }
+  params: RankingParams
 ): Promise<CompanyRankingResponse> {
   const { data } = await api.get<CompanyRankingResponse>('/data/companies/ranking', { params });
   return data;
@@ -63,4 +71,26 @@ export async function getSubramosDistribution(params: FilterParams): Promise<Dis
   return data;
 }
 
+export async function getDashboard(
+  params: RankingParams
+): Promise<DashboardResponse> {
+  const { data } = await api.get<DashboardResponse>('/data/dashboard', { params });
+  return data;
+}
+
+export async function getTimeSeries(params: TimeSeriesParams): Promise<TimeSeriesResponse> {
+  const { data } = await api.get<TimeSeriesResponse>('/data/timeseries', { params });
+  return data;
+}
+
+export async function getConcentration(params: ConcentrationParams): Promise<ConcentrationResponse> {
+  const { data } = await api.get<ConcentrationResponse>('/data/concentration', { params });
+  return data;
+}
+
+export async function getRankTrajectory(params: RankTrajectoryParams): Promise<RankTrajectoryResponse> {
+  const { data } = await api.get<RankTrajectoryResponse>('/data/companies/rank-trajectory', { params });
+  return data;
+}
+
 export default api;
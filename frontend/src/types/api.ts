@@ -6,6 +6,9 @@ export interface KPIResponse {
   siniestros_devengados: number;
   gastos_devengados: number;
   entities_count: number;
+  siniestralidad: number;
+  ratio_gastos: number;
+  combined_ratio: number;
 }
 
 export interface CompanyRankingItem {
@@ -13,6 +16,11 @@ export interface CompanyRankingItem {
   ramo_nombre_corto: string | null;
   subramo_nombre_corto: string | null;
   primas_emitidas: number;
+  siniestralidad: number | null;
+  ratio_gastos: number | null;
+  combined_ratio: number | null;
+  rank: number;
+  value: number;
 }
 
 export interface CompanyRankingResponse {
@@ -20,6 +28,11 @@ export interface CompanyRankingResponse {
   total: number;
 }
 
+export interface RankingParams extends FilterParams {
+  top_n?: number;
+  sort_by?: string;
+}
+
 export interface DistributionItem {
   name: string;
   value: number;
@@ -31,6 +44,80 @@ export interface DistributionResponse {
   total: number;
 }
 
+export interface DashboardResponse {
+  kpis: KPIResponse;
+  ranking: CompanyRankingResponse;
+  distribution: DistributionResponse;
+  distribution_type: 'ramos' | 'subramos';
+}
+
+export interface TimeSeriesItem {
+  name: string;
+  values: number[];
+  qoq: (number | null)[];
+  yoy: (number | null)[];
+}
+
+export interface TimeSeriesResponse {
+  periods: string[];
+  metric: string;
+  by: 'total' | 'ramo' | 'subramo' | 'company';
+  series: TimeSeriesItem[];
+}
+
+export interface TimeSeriesParams extends FilterParams {
+  by?: TimeSeriesResponse['by'];
+  metric?: string;
+  companies?: string;
+}
+
+export interface MarketShareItem {
+  nombre_corto: string;
+  value: number;
+  market_share: number;
+}
+
+export interface ConcentrationItem {
+  period: string;
+  ramo_nombre_corto: string;
+  total: number;
+  companies: number;
+  hhi: number;
+  cr4: number;
+  cr10: number;
+  shares: MarketShareItem[];
+}
+
+export interface ConcentrationResponse {
+  metric: string;
+  items: ConcentrationItem[];
+}
+
+export interface ConcentrationParams extends FilterParams {
+  metric?: string;
+  companies?: string;
+}
+
+export interface RankTrajectoryItem {
+  nombre_corto: string;
+  ranks: (number | null)[];
+}
+
+export interface RankTrajectoryResponse {
+  periods: string[];
+  metric: string;
+  method: 'min' | 'dense';
+  ramo_nombre_corto: string | null;
+  companies: number[];
+  series: RankTrajectoryItem[];
+}
+
+export interface RankTrajectoryParams extends FilterParams {
+  metric?: string;
+  method?: RankTrajectoryResponse['method'];
+  companies?: string;
+}
+
 export interface FilterOptions {
   years: string[];
   quarters: string[];
@@ -57,5 +144,7 @@ export interface FilterParams {
   quarter?: string;
   ramo?: string;
   view_mode?: 'accumulated' | 'current';
+  from_period?: string; // YYYYTT, inclusive
+  to_period?: string; // YYYYTT, inclusive
   top_n?: number;
 }